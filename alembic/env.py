@@ -6,12 +6,12 @@ from sqlalchemy import pool
 from alembic import context
 
 from app.models import Base
-from app.config import settings
+from app.database import get_database_url
 
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
 config = context.config
-config.set_main_option("sqlalchemy.url",f'postgresql+psycopg2://{settings.database_username}:{settings.database_password}@{settings.database_hostname}:{settings.database_port}/{settings.database_name}')
+config.set_main_option("sqlalchemy.url", get_database_url().replace("%", "%%"))
 
 
 # Interpret the config file for Python logging.
@@ -49,6 +49,7 @@ def run_migrations_offline() -> None:
         target_metadata=target_metadata,
         literal_binds=True,
         dialect_opts={"paramstyle": "named"},
+        render_as_batch=url.startswith("sqlite"),
     )
 
     with context.begin_transaction():
@@ -69,8 +70,10 @@ def run_migrations_online() -> None:
     )
 
     with connectable.connect() as connection:
+        # SQLite can't ALTER most column properties; batch mode rebuilds the table
         context.configure(
-            connection=connection, target_metadata=target_metadata
+            connection=connection, target_metadata=target_metadata,
+            render_as_batch=connection.dialect.name == "sqlite"
         )
 
         with context.begin_transaction():
@@ -0,0 +1,58 @@
+"""add analytics rollups
+
+Revision ID: 1a6f3d9b2e75
+Revises: f05b6e2a9c48
+Create Date: 2026-10-19 16:52:09.337120
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '1a6f3d9b2e75'
+down_revision: Union[str, None] = 'f05b6e2a9c48'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _counter_columns():
+    return [
+        sa.Column('capacity', sa.Integer(), nullable=False),
+        sa.Column('seats_held', sa.Integer(), nullable=False),
+        sa.Column('seats_sold', sa.Integer(), nullable=False),
+        sa.Column('bookings_confirmed', sa.Integer(), nullable=False),
+        sa.Column('bookings_cancelled', sa.Integer(), nullable=False),
+        sa.Column('revenue', sa.Numeric(10, 2), nullable=False),
+    ]
+
+
+def upgrade() -> None:
+    op.create_table('showtime_rollups',
+    sa.Column('showtime_id', sa.Integer(), nullable=False),
+    sa.Column('movie_id', sa.Integer(), nullable=False),
+    sa.Column('theater_id', sa.Integer(), nullable=False),
+    sa.Column('start_time', sa.DateTime(), nullable=False),
+    *_counter_columns(),
+    sa.PrimaryKeyConstraint('showtime_id')
+    )
+    op.create_index(op.f('ix_showtime_rollups_movie_id'), 'showtime_rollups', ['movie_id'], unique=False)
+    op.create_index(op.f('ix_showtime_rollups_theater_id'), 'showtime_rollups', ['theater_id'], unique=False)
+    op.create_index(op.f('ix_showtime_rollups_start_time'), 'showtime_rollups', ['start_time'], unique=False)
+    op.create_table('hourly_rollups',
+    sa.Column('hour', sa.DateTime(), nullable=False),
+    sa.Column('movie_id', sa.Integer(), nullable=False),
+    sa.Column('theater_id', sa.Integer(), nullable=False),
+    *_counter_columns(),
+    sa.PrimaryKeyConstraint('hour', 'movie_id', 'theater_id')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('hourly_rollups')
+    op.drop_index(op.f('ix_showtime_rollups_start_time'), table_name='showtime_rollups')
+    op.drop_index(op.f('ix_showtime_rollups_theater_id'), table_name='showtime_rollups')
+    op.drop_index(op.f('ix_showtime_rollups_movie_id'), table_name='showtime_rollups')
+    op.drop_table('showtime_rollups')
@@ -0,0 +1,26 @@
+"""add showtime seat version
+
+Revision ID: 3f1a2b7c9d01
+Revises: 
+Create Date: 2026-10-19 09:12:44.118305
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f1a2b7c9d01'
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('showtimes', sa.Column('seat_version', sa.Integer(), server_default='0', nullable=False))
+
+
+def downgrade() -> None:
+    op.drop_column('showtimes', 'seat_version')
@@ -0,0 +1,32 @@
+"""add booking and payment created_at
+
+Revision ID: 5e8b1c4d7f20
+Revises: 1a6f3d9b2e75
+Create Date: 2026-10-19 18:20:46.071853
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5e8b1c4d7f20'
+down_revision: Union[str, None] = '1a6f3d9b2e75'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('bookings', sa.Column('created_at', sa.DateTime(), server_default=sa.text('now()'), nullable=False))
+    op.create_index(op.f('ix_bookings_created_at'), 'bookings', ['created_at'], unique=False)
+    op.add_column('payments', sa.Column('created_at', sa.DateTime(), server_default=sa.text('now()'), nullable=False))
+    op.create_index(op.f('ix_payments_created_at'), 'payments', ['created_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_payments_created_at'), table_name='payments')
+    op.drop_column('payments', 'created_at')
+    op.drop_index(op.f('ix_bookings_created_at'), table_name='bookings')
+    op.drop_column('bookings', 'created_at')
@@ -0,0 +1,27 @@
+"""widen ticket token
+
+Revision ID: 6a1e9c3f7b28
+Revises: 2c8f4a6e9d13
+Create Date: 2026-10-21 09:12:44.318205
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '6a1e9c3f7b28'
+down_revision: Union[str, None] = '2c8f4a6e9d13'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Ed25519 signatures are 64 bytes, four times the old HMAC tag
+    op.alter_column('tickets', 'token', existing_type=sa.String(length=255), type_=sa.String(length=512))
+
+
+def downgrade() -> None:
+    op.alter_column('tickets', 'token', existing_type=sa.String(length=512), type_=sa.String(length=255))
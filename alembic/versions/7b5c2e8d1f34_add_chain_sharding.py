@@ -0,0 +1,41 @@
+"""add chain sharding
+
+Revision ID: 7b5c2e8d1f34
+Revises: e4a1b7c2f953
+Create Date: 2026-10-20 16:12:48.309551
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7b5c2e8d1f34'
+down_revision: Union[str, None] = 'e4a1b7c2f953'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+CHAIN_TABLES = ['theaters', 'screens', 'showtimes', 'bookings']
+
+
+def upgrade() -> None:
+    # A constant server default fills existing rows without rewriting the tables
+    for table in CHAIN_TABLES:
+        op.add_column(table, sa.Column('chain', sa.String(length=50), server_default='default', nullable=False))
+        op.create_index(op.f(f'ix_{table}_chain'), table, ['chain'], unique=False)
+    op.create_table('chain_shards',
+    sa.Column('chain', sa.String(length=50), nullable=False),
+    sa.Column('shard', sa.String(length=50), nullable=False),
+    sa.Column('moving', sa.Boolean(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('chain')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('chain_shards')
+    for table in reversed(CHAIN_TABLES):
+        op.drop_index(op.f(f'ix_{table}_chain'), table_name=table)
+        op.drop_column(table, 'chain')
@@ -0,0 +1,38 @@
+"""add seat changes
+
+Revision ID: 8c4e0d5a7b12
+Revises: 3f1a2b7c9d01
+Create Date: 2026-10-19 10:03:17.542911
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8c4e0d5a7b12'
+down_revision: Union[str, None] = '3f1a2b7c9d01'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('seat_changes',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('showtime_id', sa.Integer(), nullable=False),
+    sa.Column('version', sa.Integer(), nullable=False),
+    sa.Column('seat', sa.String(length=20), nullable=False),
+    sa.Column('booked', sa.Boolean(), nullable=False),
+    sa.ForeignKeyConstraint(['showtime_id'], ['showtimes.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_seat_changes_id'), 'seat_changes', ['id'], unique=False)
+    op.create_index(op.f('ix_seat_changes_showtime_id'), 'seat_changes', ['showtime_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_seat_changes_showtime_id'), table_name='seat_changes')
+    op.drop_index(op.f('ix_seat_changes_id'), table_name='seat_changes')
+    op.drop_table('seat_changes')
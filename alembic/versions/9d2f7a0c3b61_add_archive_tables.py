@@ -0,0 +1,75 @@
+"""add archive tables
+
+Revision ID: 9d2f7a0c3b61
+Revises: 5e8b1c4d7f20
+Create Date: 2026-10-20 09:35:12.448019
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9d2f7a0c3b61'
+down_revision: Union[str, None] = '5e8b1c4d7f20'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # The archive reuses the enum types created for the hot tables
+    booking_status = postgresql.ENUM('PENDING', 'CONFIRMED', 'CANCELLED', name='bookingstatus', create_type=False)
+    payment_status = postgresql.ENUM('PENDING', 'SUCCESS', 'FAILED', name='paymentstatus', create_type=False)
+
+    op.create_index(op.f('ix_showtimes_start_time'), 'showtimes', ['start_time'], unique=False)
+    op.create_table('archived_showtimes',
+    sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('movie_id', sa.Integer(), nullable=False),
+    sa.Column('screen_id', sa.Integer(), nullable=False),
+    sa.Column('start_time', sa.DateTime(), nullable=False),
+    sa.Column('price_per_seat', sa.Numeric(10, 2), nullable=False),
+    sa.Column('seat_version', sa.Integer(), nullable=False),
+    sa.Column('archived_at', sa.DateTime(), server_default=sa.text('now()'), nullable=False),
+    sa.ForeignKeyConstraint(['movie_id'], ['movies.id'], ),
+    sa.ForeignKeyConstraint(['screen_id'], ['screens.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_archived_showtimes_start_time'), 'archived_showtimes', ['start_time'], unique=False)
+    op.create_table('archived_bookings',
+    sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('showtime_id', sa.Integer(), nullable=False),
+    sa.Column('seats_booked', sa.Text(), nullable=False),
+    sa.Column('total_price', sa.Numeric(10, 2), nullable=False),
+    sa.Column('status', booking_status, nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['showtime_id'], ['archived_showtimes.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_archived_bookings_showtime_id'), 'archived_bookings', ['showtime_id'], unique=False)
+    op.create_index(op.f('ix_archived_bookings_user_id'), 'archived_bookings', ['user_id'], unique=False)
+    op.create_table('archived_payments',
+    sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('booking_id', sa.Integer(), nullable=False),
+    sa.Column('amount', sa.Numeric(10, 2), nullable=False),
+    sa.Column('payment_status', payment_status, nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['booking_id'], ['archived_bookings.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_archived_payments_booking_id'), 'archived_payments', ['booking_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_archived_payments_booking_id'), table_name='archived_payments')
+    op.drop_table('archived_payments')
+    op.drop_index(op.f('ix_archived_bookings_user_id'), table_name='archived_bookings')
+    op.drop_index(op.f('ix_archived_bookings_showtime_id'), table_name='archived_bookings')
+    op.drop_table('archived_bookings')
+    op.drop_index(op.f('ix_archived_showtimes_start_time'), table_name='archived_showtimes')
+    op.drop_table('archived_showtimes')
+    op.drop_index(op.f('ix_showtimes_start_time'), table_name='showtimes')
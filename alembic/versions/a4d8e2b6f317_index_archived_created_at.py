@@ -0,0 +1,29 @@
+"""index archived created_at
+
+Revision ID: a4d8e2b6f317
+Revises: e6b2f8c4a913
+Create Date: 2026-10-23 10:12:44.318205
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a4d8e2b6f317'
+down_revision: Union[str, None] = 'e6b2f8c4a913'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Exports page through the archive in created_at order, like the hot tables
+    op.create_index(op.f('ix_archived_bookings_created_at'), 'archived_bookings', ['created_at'], unique=False)
+    op.create_index(op.f('ix_archived_payments_created_at'), 'archived_payments', ['created_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_archived_payments_created_at'), table_name='archived_payments')
+    op.drop_index(op.f('ix_archived_bookings_created_at'), table_name='archived_bookings')
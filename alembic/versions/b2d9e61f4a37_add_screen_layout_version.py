@@ -0,0 +1,26 @@
+"""add screen layout version
+
+Revision ID: b2d9e61f4a37
+Revises: 8c4e0d5a7b12
+Create Date: 2026-10-19 11:26:05.903214
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b2d9e61f4a37'
+down_revision: Union[str, None] = '8c4e0d5a7b12'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('screens', sa.Column('layout_version', sa.Integer(), server_default='1', nullable=False))
+
+
+def downgrade() -> None:
+    op.drop_column('screens', 'layout_version')
@@ -0,0 +1,32 @@
+"""index booking and payment foreign keys
+
+Revision ID: b8f2d4a6c019
+Revises: 6a1e9c3f7b28
+Create Date: 2026-10-21 14:37:02.905416
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b8f2d4a6c019'
+down_revision: Union[str, None] = '6a1e9c3f7b28'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Archiving deletes bookings and showtimes; without these every deleted
+    # row's foreign key check scans the referencing table
+    op.create_index(op.f('ix_bookings_showtime_id'), 'bookings', ['showtime_id'], unique=False)
+    op.create_index(op.f('ix_bookings_user_id'), 'bookings', ['user_id'], unique=False)
+    op.create_index(op.f('ix_payments_booking_id'), 'payments', ['booking_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_payments_booking_id'), table_name='payments')
+    op.drop_index(op.f('ix_bookings_user_id'), table_name='bookings')
+    op.drop_index(op.f('ix_bookings_showtime_id'), table_name='bookings')
@@ -0,0 +1,27 @@
+"""index lower theater location
+
+Revision ID: c5f1a7d3e820
+Revises: a4d8e2b6f317
+Create Date: 2026-10-23 11:40:19.527106
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c5f1a7d3e820'
+down_revision: Union[str, None] = 'a4d8e2b6f317'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # The now-showing feed looks theaters up by lower(location)
+    op.create_index('ix_theaters_lower_location', 'theaters', [sa.text('lower(location)')], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_theaters_lower_location', table_name='theaters')
@@ -0,0 +1,30 @@
+"""add gate role
+
+Revision ID: d1c7e3a9f542
+Revises: b8f2d4a6c019
+Create Date: 2026-10-19 11:02:17.418305
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd1c7e3a9f542'
+down_revision: Union[str, None] = 'b8f2d4a6c019'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Other backends store the role as a plain string
+    if op.get_bind().dialect.name == 'postgresql':
+        with op.get_context().autocommit_block():
+            op.execute("ALTER TYPE userrole ADD VALUE IF NOT EXISTS 'GATE'")
+
+
+def downgrade() -> None:
+    # Postgres can't drop an enum value; gate accounts become plain users
+    op.execute("UPDATE users SET role = 'USER' WHERE role = 'GATE'")
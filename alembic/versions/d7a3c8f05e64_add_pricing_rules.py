@@ -0,0 +1,39 @@
+"""add pricing rules
+
+Revision ID: d7a3c8f05e64
+Revises: b2d9e61f4a37
+Create Date: 2026-10-19 13:41:52.270148
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd7a3c8f05e64'
+down_revision: Union[str, None] = 'b2d9e61f4a37'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('pricing_rules',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(length=100), nullable=False),
+    sa.Column('kind', sa.Enum('TIME_OF_DAY', 'DEMAND', name='pricingrulekind'), nullable=False),
+    sa.Column('category', sa.String(length=50), nullable=True),
+    sa.Column('start_hour', sa.Integer(), nullable=True),
+    sa.Column('end_hour', sa.Integer(), nullable=True),
+    sa.Column('min_occupancy', sa.Float(), nullable=True),
+    sa.Column('multiplier', sa.Float(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_pricing_rules_id'), 'pricing_rules', ['id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_pricing_rules_id'), table_name='pricing_rules')
+    op.drop_table('pricing_rules')
+    sa.Enum(name='pricingrulekind').drop(op.get_bind(), checkfirst=True)
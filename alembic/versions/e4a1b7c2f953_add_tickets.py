@@ -0,0 +1,42 @@
+"""add tickets
+
+Revision ID: e4a1b7c2f953
+Revises: c3e9a5f1d826
+Create Date: 2026-10-20 13:47:21.604187
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e4a1b7c2f953'
+down_revision: Union[str, None] = 'c3e9a5f1d826'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('tickets',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('booking_id', sa.Integer(), nullable=False),
+    sa.Column('showtime_id', sa.Integer(), nullable=False),
+    sa.Column('token', sa.String(length=255), nullable=False),
+    sa.Column('issued_at', sa.DateTime(), nullable=False),
+    sa.Column('revoked', sa.Boolean(), nullable=False),
+    sa.Column('checked_in_at', sa.DateTime(), nullable=True),
+    sa.Column('checked_in_gate', sa.String(length=50), nullable=True),
+    sa.ForeignKeyConstraint(['booking_id'], ['bookings.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('booking_id')
+    )
+    op.create_index(op.f('ix_tickets_id'), 'tickets', ['id'], unique=False)
+    op.create_index(op.f('ix_tickets_showtime_id'), 'tickets', ['showtime_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_tickets_showtime_id'), table_name='tickets')
+    op.drop_index(op.f('ix_tickets_id'), table_name='tickets')
+    op.drop_table('tickets')
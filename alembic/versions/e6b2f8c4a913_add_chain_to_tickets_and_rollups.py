@@ -0,0 +1,38 @@
+"""add chain to tickets and rollups
+
+Revision ID: e6b2f8c4a913
+Revises: d1c7e3a9f542
+Create Date: 2026-10-19 13:26:41.730912
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e6b2f8c4a913'
+down_revision: Union[str, None] = 'd1c7e3a9f542'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# table -> the owning row's chain
+CHAIN_SOURCES = {
+    'tickets': 'SELECT chain FROM bookings WHERE bookings.id = tickets.booking_id',
+    'showtime_rollups': 'SELECT chain FROM theaters WHERE theaters.id = showtime_rollups.theater_id',
+    'hourly_rollups': 'SELECT chain FROM theaters WHERE theaters.id = hourly_rollups.theater_id',
+}
+
+
+def upgrade() -> None:
+    for table, source in CHAIN_SOURCES.items():
+        op.add_column(table, sa.Column('chain', sa.String(length=50), server_default='default', nullable=False))
+        op.execute(f"UPDATE {table} SET chain = ({source}) WHERE EXISTS ({source})")
+        op.create_index(op.f(f'ix_{table}_chain'), table, ['chain'], unique=False)
+
+
+def downgrade() -> None:
+    for table in reversed(list(CHAIN_SOURCES)):
+        op.drop_index(op.f(f'ix_{table}_chain'), table_name=table)
+        op.drop_column(table, 'chain')
@@ -0,0 +1,71 @@
+"""store money as numeric
+
+Revision ID: f05b6e2a9c48
+Revises: d7a3c8f05e64
+Create Date: 2026-10-19 15:08:31.660492
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f05b6e2a9c48'
+down_revision: Union[str, None] = 'd7a3c8f05e64'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+MONEY_COLUMNS = [
+    ('showtimes', 'price_per_seat'),
+    ('bookings', 'total_price'),
+    ('payments', 'amount'),
+]
+BATCH_SIZE = 10000
+
+
+def _convert_column(table: str, column: str, new_type, expression: str) -> None:
+    # ``expression`` converts ``{value}``. A trigger keeps a shadow column in
+    # sync with every write from the start, the existing rows are backfilled
+    # in id-range batches, each committed on its own, and a NOT VALID check
+    # is validated without blocking writes. That leaves nothing to scan under
+    # the exclusive lock that swaps the columns.
+    shadow = f'{column}_new'
+    sync = f'{table}_{shadow}_sync'
+    not_null = f'{table}_{shadow}_not_null'
+    op.add_column(table, sa.Column(shadow, new_type, nullable=True))
+    bind = op.get_bind()
+    with op.get_context().autocommit_block():
+        op.execute(
+            f'CREATE FUNCTION {sync}() RETURNS trigger AS $$ '
+            f'BEGIN NEW.{shadow} := {expression.format(value=f"NEW.{column}")}; RETURN NEW; END '
+            f'$$ LANGUAGE plpgsql'
+        )
+        op.execute(f'CREATE TRIGGER {sync} BEFORE INSERT OR UPDATE ON {table} FOR EACH ROW EXECUTE FUNCTION {sync}()')
+        # Rows past max_id were inserted after the trigger, so already have it
+        max_id = bind.execute(sa.text(f'SELECT MAX(id) FROM {table}')).scalar() or 0
+        for start in range(0, max_id + 1, BATCH_SIZE):
+            bind.execute(
+                sa.text(f'UPDATE {table} SET {shadow} = {expression.format(value=column)} WHERE id >= :start AND id < :end'),
+                {'start': start, 'end': start + BATCH_SIZE},
+            )
+        op.execute(f'ALTER TABLE {table} ADD CONSTRAINT {not_null} CHECK ({shadow} IS NOT NULL) NOT VALID')
+        op.execute(f'ALTER TABLE {table} VALIDATE CONSTRAINT {not_null}')
+    op.execute(f'LOCK TABLE {table} IN ACCESS EXCLUSIVE MODE')
+    op.execute(f'DROP TRIGGER {sync} ON {table}')
+    op.execute(f'DROP FUNCTION {sync}()')
+    op.drop_column(table, column)
+    # The validated check proves there are no NULLs, so SET NOT NULL skips its scan
+    op.alter_column(table, shadow, new_column_name=column, nullable=False)
+    op.drop_constraint(not_null, table, type_='check')
+
+
+def upgrade() -> None:
+    for table, column in MONEY_COLUMNS:
+        _convert_column(table, column, sa.Numeric(10, 2), 'ROUND(CAST({value} AS NUMERIC), 2)')
+
+
+def downgrade() -> None:
+    for table, column in MONEY_COLUMNS:
+        _convert_column(table, column, sa.Float(), 'CAST({value} AS DOUBLE PRECISION)')
@@ -0,0 +1,35 @@
+"""add chain to archived bookings
+
+Revision ID: f7c3b9e1d452
+Revises: c5f1a7d3e820
+Create Date: 2026-10-23 13:05:52.664310
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f7c3b9e1d452'
+down_revision: Union[str, None] = 'c5f1a7d3e820'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Bookings archived so far take the chain of their showtime's screen
+CHAIN_SOURCE = (
+    'SELECT screens.chain FROM archived_showtimes JOIN screens ON screens.id = archived_showtimes.screen_id '
+    'WHERE archived_showtimes.id = archived_bookings.showtime_id'
+)
+
+
+def upgrade() -> None:
+    op.add_column('archived_bookings', sa.Column('chain', sa.String(length=50), server_default='default', nullable=False))
+    op.execute(f"UPDATE archived_bookings SET chain = ({CHAIN_SOURCE}) WHERE EXISTS ({CHAIN_SOURCE})")
+    op.create_index(op.f('ix_archived_bookings_chain'), 'archived_bookings', ['chain'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_archived_bookings_chain'), table_name='archived_bookings')
+    op.drop_column('archived_bookings', 'chain')
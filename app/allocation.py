@@ -0,0 +1,83 @@
+from typing import List, Optional, Set
+from .seat_map import SeatMap
+
+# Moving one row away from the ideal row costs as much as this many seats sideways
+ROW_WEIGHT = 2.0
+
+
+def _seat_score(seat_map: SeatMap, row: int, position: float, prefer_center: bool) -> float:
+    if not prefer_center:
+        return 0.0
+    ideal_row = (len(seat_map.rows) - 1) / 2
+    row_center = (len(seat_map.rows[row]) - 1) / 2
+    return ROW_WEIGHT * abs(row - ideal_row) + abs(position - row_center)
+
+
+def find_best_seats(
+    seat_map: SeatMap,
+    booked: Set[int],
+    party_size: int,
+    together: bool = True,
+    prefer_center: bool = True,
+    category: Optional[str] = None,
+    accessible: bool = False,
+) -> Optional[List[int]]:
+    """Pick seat indexes for a party, or None if the request can't be met.
+
+    Scans every row once, sliding a window over each run of free seats
+    between aisles and keeping a running count of the accessible seats in
+    it, so the search is linear in the number of seats. A contiguous block
+    is always preferred; scattered seats are only returned when
+    ``together`` is False.
+    """
+    def eligible(index):
+        return (
+            index is not None
+            and index not in booked
+            and (category is None or seat_map.categories[index] == category)
+        )
+
+    best, best_score = None, None  # (row, start) of the best block so far
+    for row, positions in enumerate(seat_map.rows):
+        run_start = None
+        for position in range(len(positions) + 1):
+            if position < len(positions) and eligible(positions[position]):
+                if run_start is None:
+                    run_start = position
+                continue
+            if run_start is None:
+                continue
+            in_window = 0  # accessible seats in positions[start:end + 1]
+            for end in range(run_start, position):
+                in_window += positions[end] in seat_map.accessible
+                start = end - party_size + 1
+                if start > run_start:
+                    in_window -= positions[start - 1] in seat_map.accessible
+                if start < run_start or (accessible and not in_window):
+                    continue
+                score = _seat_score(seat_map, row, start + (party_size - 1) / 2, prefer_center)
+                if best_score is None or score < best_score:
+                    best, best_score = (row, start), score
+            run_start = None
+
+    if best is not None:
+        row, start = best
+        return list(seat_map.rows[row][start:start + party_size])
+    if together:
+        return None
+
+    candidates = []
+    for row, positions in enumerate(seat_map.rows):
+        for position, index in enumerate(positions):
+            if eligible(index):
+                candidates.append((_seat_score(seat_map, row, position, prefer_center), index))
+    candidates.sort()
+    seats = [index for _, index in candidates[:party_size]]
+    if len(seats) < party_size:
+        return None
+    if accessible and not any(index in seat_map.accessible for index in seats):
+        accessible_seats = [index for _, index in candidates if index in seat_map.accessible]
+        if not accessible_seats:
+            return None
+        seats[-1] = accessible_seats[0]
+    return seats
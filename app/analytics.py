@@ -0,0 +1,219 @@
+"""Incrementally maintained occupancy and revenue rollups.
+
+Booking and payment state changes call the ``record_*`` functions in the
+same transaction as the change itself, so the rollups stay consistent with
+the bookings table. ``python -m app.analytics backfill`` rebuilds them from
+scratch, e.g. after deploying. Rescheduling a showtime moves its counts along.
+"""
+import argparse
+import json
+from datetime import datetime
+from decimal import Decimal
+from sqlalchemy import update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, joinedload
+from . import models
+from .database import sessionLocal
+from .seat_map import get_seat_map
+
+COUNTERS = ("capacity", "seats_held", "seats_sold", "bookings_confirmed", "bookings_cancelled", "revenue")
+
+
+def _hour(start_time: datetime) -> datetime:
+    return start_time.replace(minute=0, second=0, microsecond=0)
+
+
+def _empty(model, **key):
+    return model(**key, **{name: 0 for name in COUNTERS})
+
+
+def _increment(db: Session, model, key: dict, deltas: dict, on_insert: dict = None) -> bool:
+    """Add ``deltas`` to the row at ``key``, creating it from ``on_insert`` if missing.
+
+    Returns True if this call created the row.
+    """
+    stmt = update(model).filter_by(**key).values(
+        {name: getattr(model, name) + delta for name, delta in deltas.items()}
+    ).execution_options(synchronize_session=False)
+    if db.execute(stmt).rowcount:
+        return False
+
+    row = _empty(model, **key)
+    for name, value in dict(on_insert or {}, **deltas).items():
+        setattr(row, name, value)
+    try:
+        with db.begin_nested():
+            db.add(row)
+    except IntegrityError:
+        # Lost the race to create it, so it exists now
+        db.execute(stmt)
+        return False
+    return True
+
+
+def _apply(db: Session, showtime: models.Showtime, **deltas):
+    screen = showtime.screen
+    capacity = get_seat_map(screen).total_seats
+    created = _increment(
+        db,
+        models.ShowtimeRollup,
+        {"showtime_id": showtime.id},
+        deltas,
+        on_insert={
+            "movie_id": showtime.movie_id,
+            "theater_id": screen.theater_id,
+            "start_time": showtime.start_time,
+            "capacity": capacity,
+            "chain": screen.chain,
+        }
+    )
+    # A showtime's capacity joins its hour only once, when it is first seen
+    hour_key = {"hour": _hour(showtime.start_time), "movie_id": showtime.movie_id, "theater_id": screen.theater_id}
+    _increment(
+        db, models.HourlyRollup, hour_key, dict(deltas, capacity=capacity) if created else deltas,
+        on_insert={"chain": screen.chain}
+    )
+
+
+def _seat_count(seats_booked: str) -> int:
+    try:
+        return len(json.loads(seats_booked))
+    except json.JSONDecodeError:
+        return 0
+
+
+def record_hold(db: Session, showtime: models.Showtime, seat_count: int):
+    _apply(db, showtime, seats_held=seat_count)
+
+
+def record_sale(db: Session, booking: models.Booking, amount: Decimal):
+    seat_count = _seat_count(booking.seats_booked)
+    _apply(
+        db,
+        booking.showtime,
+        seats_held=-seat_count,
+        seats_sold=seat_count,
+        bookings_confirmed=1,
+        revenue=amount
+    )
+
+
+def record_cancellation(db: Session, booking: models.Booking, refunded_amount: Decimal = None):
+    """Record cancelling ``booking``; call before its status changes."""
+    seat_count = _seat_count(booking.seats_booked)
+    if booking.status == models.BookingStatus.CONFIRMED:
+        _apply(
+            db,
+            booking.showtime,
+            seats_sold=-seat_count,
+            bookings_confirmed=-1,
+            bookings_cancelled=1,
+            revenue=-(refunded_amount or 0)
+        )
+    else:
+        _apply(db, booking.showtime, seats_held=-seat_count, bookings_cancelled=1)
+
+
+def record_showtime_change(db: Session, showtime: models.Showtime):
+    """Move the showtime's counts to its new movie, theater and hour.
+
+    Call after changing those, with the showtime row already locked
+    (``seating.bump_seat_version``) so no booking updates the rollups meanwhile.
+    """
+    rollup = db.query(models.ShowtimeRollup).filter(
+        models.ShowtimeRollup.showtime_id == showtime.id
+    ).with_for_update().first()
+    if rollup is None:
+        return  # nothing counted yet; the first booking creates it in the right place
+
+    screen = db.get(models.Screen, showtime.screen_id)
+    capacity = get_seat_map(screen).total_seats
+    old_key = {"hour": _hour(rollup.start_time), "movie_id": rollup.movie_id, "theater_id": rollup.theater_id}
+    new_key = {"hour": _hour(showtime.start_time), "movie_id": showtime.movie_id, "theater_id": screen.theater_id}
+    counts = {name: getattr(rollup, name) for name in COUNTERS}
+
+    _increment(db, models.HourlyRollup, old_key, {name: -value for name, value in counts.items()})
+    db.query(models.HourlyRollup).filter_by(**old_key).filter(
+        *[getattr(models.HourlyRollup, name) == 0 for name in COUNTERS]
+    ).delete(synchronize_session=False)
+    _increment(db, models.HourlyRollup, new_key, dict(counts, capacity=capacity), on_insert={"chain": screen.chain})
+
+    rollup.movie_id = showtime.movie_id
+    rollup.theater_id = screen.theater_id
+    rollup.start_time = showtime.start_time
+    rollup.capacity = capacity
+
+
+def backfill(db: Session):
+    """Rebuild every rollup from the hot and archived bookings and payments."""
+    db.query(models.HourlyRollup).delete()
+    db.query(models.ShowtimeRollup).delete()
+
+    rollups = {}
+    for showtime_model in (models.Showtime, models.ArchivedShowtime):
+        showtimes = db.query(showtime_model).options(joinedload(showtime_model.screen))
+        for showtime in showtimes.yield_per(500):
+            rollups[showtime.id] = _empty(
+                models.ShowtimeRollup,
+                showtime_id=showtime.id,
+                movie_id=showtime.movie_id,
+                theater_id=showtime.screen.theater_id,
+                start_time=showtime.start_time,
+                chain=showtime.screen.chain
+            )
+            rollups[showtime.id].capacity = get_seat_map(showtime.screen).total_seats
+
+    for booking_model, payment_model in (
+        (models.Booking, models.Payment),
+        (models.ArchivedBooking, models.ArchivedPayment),
+    ):
+        rows = db.query(
+            booking_model.showtime_id,
+            booking_model.seats_booked,
+            booking_model.status,
+            payment_model.amount,
+            payment_model.payment_status
+        ).outerjoin(payment_model, payment_model.booking_id == booking_model.id)
+        for showtime_id, seats_booked, status, amount, payment_status in rows.yield_per(5000):
+            rollup = rollups.get(showtime_id)
+            if rollup is None:
+                continue
+            if status == models.BookingStatus.CANCELLED:
+                rollup.bookings_cancelled += 1
+            elif status == models.BookingStatus.CONFIRMED:
+                rollup.seats_sold += _seat_count(seats_booked)
+                rollup.bookings_confirmed += 1
+            else:
+                rollup.seats_held += _seat_count(seats_booked)
+            if payment_status == models.PaymentStatus.SUCCESS:
+                rollup.revenue += amount
+
+    hourly = {}
+    for rollup in rollups.values():
+        key = (_hour(rollup.start_time), rollup.movie_id, rollup.theater_id)
+        if key not in hourly:
+            hourly[key] = _empty(models.HourlyRollup, hour=key[0], movie_id=key[1], theater_id=key[2], chain=rollup.chain)
+        for name in COUNTERS:
+            setattr(hourly[key], name, getattr(hourly[key], name) + getattr(rollup, name))
+
+    db.add_all(rollups.values())
+    db.add_all(hourly.values())
+    db.commit()
+    return len(rollups), len(hourly)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Maintain analytics rollups")
+    parser.add_argument("command", choices=["backfill"])
+    parser.parse_args()
+
+    db = sessionLocal(write=True)
+    try:
+        showtimes, hours = backfill(db)
+        print(f"Rebuilt rollups for {showtimes} showtimes across {hours} hourly buckets")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
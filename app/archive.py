@@ -0,0 +1,207 @@
+"""Move completed showtimes and their bookings and payments into archive tables.
+
+Each batch of showtimes is copied with INSERT ... SELECT and deleted from the
+hot tables in one transaction, so a batch is either fully archived or untouched.
+Run it periodically with ``python -m app.archive``.
+
+``python -m app.archive bench`` seeds a scratch database (in memory unless
+``--url`` names another empty one) and times the hot-path queries before and
+after archiving.
+"""
+import argparse
+import json
+import random
+import statistics
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.orm import Session, sessionmaker
+from . import models
+from .config import get_settings
+from .database import Base, build_engine
+from .seating import get_booked_seats
+from .sharding import DEFAULT_SHARD, get_shard_sessionmaker
+
+SHOWTIME_COLUMNS = ("id", "movie_id", "screen_id", "start_time", "price_per_seat", "seat_version")
+BOOKING_COLUMNS = ("id", "user_id", "showtime_id", "seats_booked", "total_price", "status", "created_at", "chain")
+PAYMENT_COLUMNS = ("id", "booking_id", "amount", "payment_status", "created_at")
+
+
+def _copy(target, source, columns, condition):
+    return insert(target).from_select(
+        list(columns),
+        select(*[getattr(source, column) for column in columns]).where(condition)
+    )
+
+
+def archive_batch(db: Session, showtime_ids: list):
+    booking_ids = select(models.Booking.id).where(models.Booking.showtime_id.in_(showtime_ids))
+
+    db.execute(_copy(
+        models.ArchivedShowtime, models.Showtime, SHOWTIME_COLUMNS, models.Showtime.id.in_(showtime_ids)
+    ))
+    db.execute(_copy(
+        models.ArchivedBooking, models.Booking, BOOKING_COLUMNS, models.Booking.showtime_id.in_(showtime_ids)
+    ))
+    db.execute(_copy(
+        models.ArchivedPayment, models.Payment, PAYMENT_COLUMNS, models.Payment.booking_id.in_(booking_ids)
+    ))
+
+    for statement in (
+        delete(models.Ticket).where(models.Ticket.booking_id.in_(booking_ids)),
+        delete(models.Payment).where(models.Payment.booking_id.in_(booking_ids)),
+        delete(models.SeatChange).where(models.SeatChange.showtime_id.in_(showtime_ids)),
+        delete(models.Booking).where(models.Booking.showtime_id.in_(showtime_ids)),
+        delete(models.Showtime).where(models.Showtime.id.in_(showtime_ids)),
+    ):
+        db.execute(statement.execution_options(synchronize_session=False))
+
+
+def archive_showtimes(db: Session, cutoff: datetime, batch_size: int) -> int:
+    """Archive every showtime that started before ``cutoff``; returns how many moved."""
+    archived = 0
+    while True:
+        showtime_ids = [
+            showtime_id for (showtime_id,) in db.query(models.Showtime.id).filter(
+                models.Showtime.start_time < cutoff
+            ).order_by(models.Showtime.id).limit(batch_size)
+        ]
+        if not showtime_ids:
+            return archived
+        archive_batch(db, showtime_ids)
+        db.commit()
+        archived += len(showtime_ids)
+
+
+def _seed(db: Session, showtimes: int, bookings_per_showtime: int, history_days: int):
+    now = datetime.utcnow()
+    db.execute(insert(models.User), [
+        {"id": i, "name": f"user{i}", "email": f"user{i}@example.com", "password_hash": "-", "role": models.UserRole.USER}
+        for i in range(1, 1001)
+    ])
+    db.execute(insert(models.Movie), [
+        {"id": i, "title": f"Movie {i}", "genre": "Drama", "language": "English", "duration": 120} for i in range(1, 51)
+    ])
+    db.execute(insert(models.Theater), [{"id": i, "name": f"Theater {i}", "location": "Leeds"} for i in range(1, 11)])
+    seats = [f"{row}{number}" for row in "ABCDEFGHIJ" for number in range(1, 11)]
+    db.execute(insert(models.Screen), [
+        {"id": i, "theater_id": (i - 1) // 5 + 1, "screen_number": (i - 1) % 5 + 1, "seat_layout": json.dumps(seats)}
+        for i in range(1, 51)
+    ])
+
+    # Spread evenly from history_days ago to a month ahead
+    step = timedelta(days=history_days + 30) / showtimes
+    booking_id = 0
+    for start in range(0, showtimes, 1000):
+        batch = range(start + 1, min(start + 1000, showtimes) + 1)
+        starts = {i: now - timedelta(days=history_days) + step * i for i in batch}
+        db.execute(insert(models.Showtime), [
+            {"id": i, "movie_id": i % 50 + 1, "screen_id": i % 50 + 1, "start_time": starts[i], "price_per_seat": Decimal("10.00")}
+            for i in batch
+        ])
+        bookings, payments = [], []
+        for i in batch:
+            for seat in seats[:bookings_per_showtime]:
+                booking_id += 1
+                created_at = starts[i] - timedelta(days=1)
+                bookings.append({
+                    "id": booking_id, "user_id": random.randint(1, 1000), "showtime_id": i,
+                    "seats_booked": f'["{seat}"]', "total_price": Decimal("10.00"),
+                    "status": models.BookingStatus.CONFIRMED, "created_at": created_at,
+                })
+                payments.append({
+                    "id": booking_id, "booking_id": booking_id, "amount": Decimal("10.00"),
+                    "payment_status": models.PaymentStatus.SUCCESS, "created_at": created_at,
+                })
+        db.execute(insert(models.Booking), bookings)
+        db.execute(insert(models.Payment), payments)
+    db.commit()
+
+
+def _hot_path(db: Session):
+    """The per-request queries of the busiest endpoints, as the routers run them."""
+    now = datetime.utcnow()
+    upcoming = db.query(models.Showtime.id).filter(models.Showtime.start_time >= now).order_by(
+        models.Showtime.start_time
+    ).first()[0]
+    return {
+        "showtimes for a movie": lambda: db.query(models.Showtime).join(models.Showtime.movie).join(
+            models.Showtime.screen
+        ).filter(models.Showtime.movie_id == 7).limit(100).all(),
+        "showtimes on a day": lambda: db.query(models.Showtime).filter(
+            func.date(models.Showtime.start_time) == (now + timedelta(days=1)).date()
+        ).limit(100).all(),
+        "booked seats": lambda: get_booked_seats(db, upcoming),
+        "a user's bookings": lambda: db.query(models.Booking).filter(
+            models.Booking.user_id == 42
+        ).order_by(models.Booking.id).limit(100).all(),
+    }
+
+
+def _time_queries(db: Session, repeat: int) -> dict:
+    timings = {}
+    for name, query in _hot_path(db).items():
+        samples = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            query()
+            samples.append(time.perf_counter() - started)
+            db.expunge_all()
+        timings[name] = statistics.median(samples)
+    return timings
+
+
+def bench(url: str, showtimes: int, bookings_per_showtime: int, horizon_days: int, repeat: int):
+    engine = build_engine(url, pool_size=1, max_overflow=0)
+    Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine)()
+    try:
+        history_days = 4 * horizon_days
+        started = time.perf_counter()
+        _seed(db, showtimes, bookings_per_showtime, history_days)
+        print(f"Seeded {showtimes} showtimes and {showtimes * bookings_per_showtime} bookings "
+              f"over {history_days} days in {time.perf_counter() - started:.1f}s")
+
+        before = _time_queries(db, repeat)
+        started = time.perf_counter()
+        archived = archive_showtimes(db, datetime.utcnow() - timedelta(days=horizon_days), get_settings().archive_batch_size)
+        print(f"Archived {archived} showtimes older than {horizon_days} days in {time.perf_counter() - started:.1f}s")
+        after = _time_queries(db, repeat)
+
+        print(f"{'query (median)':<22}{'before':>12}{'after':>12}")
+        for name in before:
+            print(f"{name:<22}{before[name] * 1e3:>10.2f}ms{after[name] * 1e3:>10.2f}ms")
+    finally:
+        db.close()
+        engine.dispose()
+
+
+def main():
+    settings = get_settings()
+    parser = argparse.ArgumentParser(description="Archive completed showtimes")
+    parser.add_argument("command", nargs="?", choices=["run", "bench"], default="run")
+    parser.add_argument("--horizon-days", type=int, default=settings.archive_horizon_days)
+    parser.add_argument("--batch-size", type=int, default=settings.archive_batch_size)
+    parser.add_argument("--shard", default=DEFAULT_SHARD)
+    parser.add_argument("--url", default="sqlite://", help="bench: an empty database to seed")
+    parser.add_argument("--showtimes", type=int, default=20000, help="bench: showtimes to seed")
+    parser.add_argument("--bookings-per-showtime", type=int, default=10, help="bench: bookings to seed per showtime")
+    parser.add_argument("--repeat", type=int, default=20, help="bench: runs of each query")
+    args = parser.parse_args()
+
+    if args.command == "bench":
+        bench(args.url, args.showtimes, args.bookings_per_showtime, args.horizon_days, args.repeat)
+        return
+
+    cutoff = datetime.utcnow() - timedelta(days=args.horizon_days)
+    db = get_shard_sessionmaker(args.shard, write=True)()
+    try:
+        archived = archive_showtimes(db, cutoff, args.batch_size)
+        print(f"Archived {archived} showtimes that started before {cutoff:%Y-%m-%d %H:%M}")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
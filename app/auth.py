@@ -1,27 +1,76 @@
 from datetime import datetime, timedelta
+from functools import lru_cache
+import uuid
 import jwt
-from passlib.context import CryptContext
-from .config import settings
+from sqlalchemy.orm import Session
+from . import models
+from .config import get_settings
+from .revocation import revocation_list
 
-# Password hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
-SECRET_KEY = settings.secret_key
-ALGORITHM = settings.algorithm
-ACCESS_TOKEN_EXPIRE_MINUTES = settings.access_token_expire_minutes
+# Password hashing. passlib and bcrypt are imported on first use; they are
+# slow to import and only the auth endpoints need them.
+@lru_cache
+def get_pwd_context():
+    from passlib.context import CryptContext
+    return CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
+    return get_pwd_context().verify(plain_password, hashed_password)
 
 def get_password_hash(password):
-    return pwd_context.hash(password)
+    return get_pwd_context().hash(password)
 
 def create_access_token(data: dict, expires_delta: timedelta = None):
+    settings = get_settings()
     to_encode = data.copy()
     if expires_delta:
         expire = datetime.utcnow() + expires_delta
     else:
         expire = datetime.utcnow() + timedelta(minutes=15)
-    to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
-    return encoded_jwt
\ No newline at end of file
+    to_encode.update({"exp": expire, "jti": uuid.uuid4().hex, "type": "access"})
+    encoded_jwt = jwt.encode(to_encode, settings.secret_key, algorithm=settings.algorithm)
+    return encoded_jwt
+
+def decode_token(token: str, token_type: str) -> dict:
+    """Decode a token issued here, raising ``jwt.InvalidTokenError`` if it isn't a valid ``token_type`` token."""
+    settings = get_settings()
+    payload = jwt.decode(token, settings.secret_key, algorithms=[settings.algorithm])
+    if payload.get("type") != token_type or not payload.get("sub") or not payload.get("jti"):
+        raise jwt.InvalidTokenError(f"Not a {token_type} token")
+    return payload
+
+def create_refresh_token(db: Session, user: models.User) -> str:
+    settings = get_settings()
+    jti = uuid.uuid4().hex
+    expire = datetime.utcnow() + timedelta(days=settings.refresh_token_expire_days)
+    db.add(models.RefreshToken(jti=jti, user_id=user.id, expires_at=expire))
+    return jwt.encode(
+        {"sub": user.email, "gen": user.token_generation, "exp": expire, "jti": jti, "type": "refresh"},
+        settings.secret_key,
+        algorithm=settings.algorithm
+    )
+
+def issue_tokens(db: Session, user: models.User) -> dict:
+    """A short-lived access token and a single-use refresh token; the caller commits."""
+    access_token = create_access_token(
+        data={"sub": user.email, "gen": user.token_generation},
+        expires_delta=timedelta(minutes=get_settings().access_token_expire_minutes)
+    )
+    return {
+        "access_token": access_token,
+        "refresh_token": create_refresh_token(db, user),
+        "token_type": "bearer"
+    }
+
+def revoke_access_token(db: Session, payload: dict):
+    """Revoke one access token until it would have expired anyway; the caller commits."""
+    db.add(models.RevokedToken(jti=payload["jti"], expires_at=datetime.utcfromtimestamp(payload["exp"])))
+    revocation_list.add(payload["jti"])
+
+def revoke_user_tokens(db: Session, user: models.User):
+    """Revoke every token issued to ``user`` so far, e.g. after a password change; the caller commits."""
+    user.token_generation += 1
+    db.query(models.RefreshToken).filter(
+        models.RefreshToken.user_id == user.id,
+        models.RefreshToken.revoked.is_(False)
+    ).update({"revoked": True}, synchronize_session=False)
\ No newline at end of file
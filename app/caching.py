@@ -0,0 +1,51 @@
+import hashlib
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+# Clients may keep the payload but must revalidate it with If-None-Match
+CACHE_CONTROL = "no-cache"
+
+
+def make_etag(*parts) -> str:
+    return '"' + "-".join(str(part) for part in parts) + '"'
+
+
+def _opaque_tag(tag: str) -> str:
+    tag = tag.strip()
+    return tag[2:] if tag.startswith("W/") else tag
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    # If-None-Match uses weak comparison, so W/ prefixes added by
+    # the compression middleware still match
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    target = _opaque_tag(etag)
+    return any(_opaque_tag(tag) == target for tag in header.split(","))
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": CACHE_CONTROL})
+
+
+def conditional_json(request: Request, content, etag: str = None) -> Response:
+    """Render ``content`` as JSON with an ETag, or a 304 if the client's copy is current.
+
+    Without an explicit ``etag`` one is derived from a digest of the rendered body.
+    """
+    if etag is not None and etag_matches(request, etag):
+        return not_modified(etag)
+
+    response = JSONResponse(content=jsonable_encoder(content))
+    if etag is None:
+        etag = make_etag(hashlib.sha1(response.body).hexdigest())
+        if etag_matches(request, etag):
+            return not_modified(etag)
+
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = CACHE_CONTROL
+    return response
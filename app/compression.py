@@ -0,0 +1,109 @@
+import gzip
+from functools import lru_cache
+from starlette.datastructures import Headers, MutableHeaders
+
+
+COMPRESSIBLE_TYPES = ("application/json", "application/x-ndjson", "text/")
+
+
+@lru_cache
+def get_encoders():
+    # Optional codecs are imported on the first request rather than at startup.
+    # Ordered by server preference when the client weights encodings equally.
+    encoders = {}
+    try:
+        import zstandard
+        encoders["zstd"] = zstandard.ZstdCompressor(level=3).compress
+    except ImportError:
+        pass
+    try:
+        import brotli
+        encoders["br"] = lambda body: brotli.compress(body, quality=4)
+    except ImportError:
+        pass
+    encoders["gzip"] = lambda body: gzip.compress(body, compresslevel=6)
+    return encoders
+
+
+def negotiate_encoding(accept_encoding: str):
+    """Pick the best supported encoding from an Accept-Encoding header, or None."""
+    weights = {}
+    for item in accept_encoding.split(","):
+        parts = item.strip().split(";")
+        name = parts[0].strip().lower()
+        if not name:
+            continue
+        q = 1.0
+        for param in parts[1:]:
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        weights[name] = q
+
+    best, best_q = None, 0.0
+    for name in get_encoders():
+        q = weights.get(name, weights.get("*", 0.0))
+        if q > best_q:
+            best, best_q = name, q
+    return best
+
+
+class CompressionMiddleware:
+    """Compress single-message responses above ``minimum_size`` with the
+    best encoding the client accepts. Streaming responses pass through."""
+
+    def __init__(self, app, minimum_size: int = 500):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = negotiate_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+
+        async def send_wrapper(message):
+            nonlocal start_message
+            if message["type"] == "http.response.start":
+                start_message = message
+                return
+
+            if message["type"] == "http.response.body" and start_message is not None:
+                start, start_message = start_message, None
+                body = message.get("body", b"")
+                headers = MutableHeaders(raw=start["headers"])
+                if message.get("more_body", False) or not self._should_compress(headers, body):
+                    await send(start)
+                    await send(message)
+                    return
+
+                compressed = get_encoders()[encoding](body)
+                headers["Content-Encoding"] = encoding
+                headers["Content-Length"] = str(len(compressed))
+                headers.add_vary_header("Accept-Encoding")
+                # The encoded representation is no longer byte-identical
+                etag = headers.get("etag")
+                if etag and not etag.startswith("W/"):
+                    headers["ETag"] = f"W/{etag}"
+                await send(start)
+                await send({"type": "http.response.body", "body": compressed})
+                return
+
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
+
+    def _should_compress(self, headers: MutableHeaders, body: bytes) -> bool:
+        if len(body) < self.minimum_size or "content-encoding" in headers:
+            return False
+        content_type = headers.get("content-type", "")
+        return content_type.startswith(COMPRESSIBLE_TYPES)
@@ -1,17 +1,54 @@
+from functools import lru_cache
+from typing import Dict, Optional
 from pydantic_settings import BaseSettings
 
 class Settings(BaseSettings):
-    database_hostname: str
-    database_port: str  
-    database_password: str
-    database_name: str
-    database_username: str
+    database_url: Optional[str] = None  # e.g. sqlite:///./dev.db or sqlite://; overrides the parts below
+    database_hostname: Optional[str] = None
+    database_port: Optional[str] = None
+    database_password: Optional[str] = None
+    database_name: Optional[str] = None
+    database_username: Optional[str] = None
+    database_create_all: bool = False  # create the schema from the models at startup instead of migrating
+    sqlite_busy_timeout_seconds: float = 30
+    shard_urls: Dict[str, str] = {}  # shard name -> database URL, as JSON; the "default" shard is the main database
+    shard_pool_size: int = 5
+    shard_max_overflow: int = 5
+    shard_map_ttl_seconds: float = 10
+    chain_max_sessions: int = 20  # concurrent sessions per chain, so one chain's spike can't take every connection
+    chain_session_limits: Dict[str, int] = {}  # per-chain overrides of chain_max_sessions, as JSON
+    chain_session_wait_seconds: float = 2
+    feed_refresh_seconds: float = 2  # how often a feed snapshot checks its showtimes for changes
+    feed_max_age_seconds: float = 300  # rebuilt in full after this, picking up movie and theater edits
+    feed_max_snapshots: int = 512
+    revocation_sync_seconds: float = 10  # how stale another worker's view of a logout may be
+    revocation_rebuild_seconds: float = 3600  # drop expired ids from the filter
+    revocation_filter_capacity: int = 100000
+    revocation_filter_error_rate: float = 0.001
     secret_key: str
     algorithm: str
-    access_token_expire_minutes: int
+    access_token_expire_minutes: int  # keep short: refresh tokens renew access
+    refresh_token_expire_days: int = 30
+    db_pool_size: int = 5
+    db_max_overflow: int = 10
+    web_concurrency: Optional[int] = None  # defaults to the CPUs available to the process
+    drain_seconds: float = 5  # time to keep serving after SIGTERM while readiness fails
+    graceful_timeout_seconds: int = 30
+    compression_minimum_size: int = 500
+    pricing_rules_ttl_seconds: float = 30
+    pricing_max_tables: int = 10000  # least recently quoted showtimes' price tables are dropped first
+    archive_horizon_days: int = 180
+    archive_batch_size: int = 500
+    job_lock_timeout_seconds: int = 300
+    job_retry_base_seconds: float = 5
+    job_retry_max_seconds: float = 3600
+    ticket_signing_key: Optional[str] = None  # master for the per-showtime key pairs; defaults to secret_key
 
     class Config:
         env_file=".env"
 
 
-settings=Settings()
\ No newline at end of file
+# Built on first use rather than at import, so importing the app needs no environment
+@lru_cache
+def get_settings() -> Settings:
+    return Settings()
\ No newline at end of file
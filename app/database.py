@@ -1,19 +1,144 @@
-from sqlalchemy import create_engine
-from .config import settings
+import threading
+from functools import lru_cache
+from typing import Optional
+from fastapi import Depends, Header, HTTPException, Request
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import TimeoutError as PoolTimeout
+from sqlalchemy.pool import StaticPool
+from .config import get_settings
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
 
-DATABASE_URL=f"postgresql://{settings.database_username}:{settings.database_password}@{settings.database_hostname}:{settings.database_port}/{settings.database_name}"
+Base= declarative_base()
 
-engine=create_engine(DATABASE_URL)
+# Sessions opened to write ask SQLite for its write lock when they begin;
+# other backends ignore the option
+WRITE_OPTIONS = {"sqlite_begin": "IMMEDIATE"}
+READ_ONLY_METHODS = ("GET", "HEAD", "OPTIONS")
 
-sessionLocal=sessionmaker(autocommit=False,autoflush=False,bind=engine)
 
-Base= declarative_base()
+def get_database_url() -> str:
+    settings = get_settings()
+    if settings.database_url:
+        return settings.database_url
+    return f"postgresql://{settings.database_username}:{settings.database_password}@{settings.database_hostname}:{settings.database_port}/{settings.database_name}"
+
+
+def is_sqlite_memory(url) -> bool:
+    url = make_url(url)
+    return url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:")
+
+
+class SharedMemoryPool(StaticPool):
+    """The one connection to an in-memory database, lent to one session at a time.
+
+    Every connection to :memory: is a new empty database, so all sessions
+    share this one and take turns on it, one transaction at a time.
+    """
+
+    timeout = 30.0
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.turn = threading.Lock()
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.timeout = self.timeout
+        return pool
+
+    def _do_get(self):
+        if not self.turn.acquire(timeout=self.timeout):
+            raise PoolTimeout("The in-memory database stayed busy; is a session left open?")
+        try:
+            return super()._do_get()
+        except Exception:
+            self.turn.release()
+            raise
+
+    def _do_return_conn(self, record):
+        self.turn.release()
+
+
+def _sqlite_engine(url):
+    settings = get_settings()
+    if is_sqlite_memory(url):
+        engine = create_engine(url, connect_args={"check_same_thread": False}, poolclass=SharedMemoryPool)
+        engine.pool.timeout = settings.sqlite_busy_timeout_seconds
+    else:
+        engine = create_engine(url, connect_args={"check_same_thread": False, "timeout": settings.sqlite_busy_timeout_seconds})
+
+    @event.listens_for(engine, "connect")
+    def configure_connection(dbapi_connection, connection_record):
+        # Let SQLAlchemy emit BEGIN itself so savepoints and locking behave
+        dbapi_connection.isolation_level = None
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA foreign_keys=ON")
+        if not is_sqlite_memory(url):
+            cursor.execute("PRAGMA journal_mode=WAL")
+            cursor.execute("PRAGMA synchronous=NORMAL")
+            cursor.execute(f"PRAGMA busy_timeout={int(settings.sqlite_busy_timeout_seconds * 1000)}")
+        cursor.close()
+
+    @event.listens_for(engine, "begin")
+    def begin(connection):
+        # Reads use a deferred BEGIN and never block in WAL mode. SQLite has
+        # no row locks and drops FOR UPDATE, so writing sessions take the
+        # write lock up front: writers queue on busy_timeout the way Postgres
+        # row locks serialise them, instead of failing when a transaction
+        # that has already read tries to write.
+        mode = connection.get_execution_options().get("sqlite_begin", "DEFERRED")
+        connection.exec_driver_sql(f"BEGIN {mode}")
+
+    return engine
+
+
+def build_engine(url: str, pool_size: int, max_overflow: int):
+    if make_url(url).get_backend_name() == "sqlite":
+        return _sqlite_engine(url)
+    return create_engine(url, pool_size=pool_size, max_overflow=max_overflow, pool_pre_ping=True)
+
+
+# The engine and session factory are created on first use, not at import
+@lru_cache
+def get_engine():
+    settings = get_settings()
+    return build_engine(get_database_url(), settings.db_pool_size, settings.db_max_overflow)
+
+@lru_cache
+def get_sessionmaker(write: bool = False):
+    engine = get_engine()
+    return sessionmaker(autocommit=False,autoflush=False,bind=engine.execution_options(**WRITE_OPTIONS) if write else engine)
+
+def sessionLocal(write: bool = False):
+    return get_sessionmaker(write)()
+
+def create_schema():
+    """Create any missing tables straight from the models, skipping migrations."""
+    from . import models  # noqa: F401 - registers the tables on Base.metadata
+    Base.metadata.create_all(bind=get_engine())
+
+def get_chain(x_chain: Optional[str] = Header(None, max_length=50)) -> Optional[str]:
+    return x_chain
+
+def require_chain(chain: Optional[str] = Depends(get_chain)) -> Optional[str]:
+    # With more than one shard, a chain's rows are only found through its header
+    if chain is None and get_settings().shard_urls:
+        raise HTTPException(status_code=400, detail="The X-Chain header is required")
+    return chain
 
-def get_db():
-    db= sessionLocal()
+def get_db(request: Request, chain: Optional[str] = Depends(get_chain)):
+    # Each request works on its chain's shard (see app.sharding)
+    from .sharding import ChainUnavailable, UnknownChain, open_chain_session
+    try:
+        db, release = open_chain_session(chain, write=request.method not in READ_ONLY_METHODS)
+    except ChainUnavailable as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+    except UnknownChain as e:
+        raise HTTPException(status_code=400, detail=str(e))
     try: 
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+        release()
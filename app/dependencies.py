@@ -4,39 +4,51 @@ from sqlalchemy.orm import Session
 import jwt
 from .database import get_db
 from . import models, auth
-from .config import settings
+from .revocation import revocation_list
 
 # OAuth2 scheme
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login")
 
-# JWT configuration
-SECRET_KEY = settings.secret_key
-ALGORITHM = settings.algorithm
-
-# Reusable dependencies
-async def get_current_user(
-    db: Session = Depends(get_db), 
-    token: str = Depends(oauth2_scheme)
-):
-    credentials_exception = HTTPException(
+def credentials_exception():
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
+
+# Reusable dependencies. The ones that query the database are plain functions,
+# so FastAPI runs them in its threadpool: a query waiting on a lock must not
+# stall the event loop that every other request needs.
+def get_token_payload(
+    db: Session = Depends(get_db),
+    token: str = Depends(oauth2_scheme)
+):
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        email: str = payload.get("sub")
-        if email is None:
-            raise credentials_exception
+        payload = auth.decode_token(token, "access")
     except jwt.InvalidTokenError:
-        raise credentials_exception
-    
-    user = db.query(models.User).filter(models.User.email == email).first()
-    if user is None:
-        raise credentials_exception
+        raise credentials_exception()
+    # The revocation filter keeps this free for tokens that were never revoked
+    if revocation_list.is_revoked(db, payload["jti"]):
+        raise credentials_exception()
+    return payload
+
+def get_current_user(
+    db: Session = Depends(get_db), 
+    payload: dict = Depends(get_token_payload)
+):
+    user = db.query(models.User).filter(models.User.email == payload["sub"]).first()
+    # Tokens from before the user's last revoke-all carry an older generation
+    if user is None or payload.get("gen") != user.token_generation:
+        raise credentials_exception()
     return user
 
 async def get_current_active_user(current_user: models.User = Depends(get_current_user)):
+    # A gate account is a device credential, not a customer
+    if current_user.role == models.UserRole.GATE:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Gate accounts can only use the gate endpoints"
+        )
     return current_user
 
 async def get_current_admin_user(current_user: models.User = Depends(get_current_user)):
@@ -45,4 +57,13 @@ async def get_current_admin_user(current_user: models.User = Depends(get_current
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Insufficient permissions"
         )
-    return current_user
\ No newline at end of file
+    return current_user
+
+async def get_current_gate_user(current_user: models.User = Depends(get_current_user)):
+    # Scanner devices log in as gate accounts rather than holding an admin token
+    if current_user.role not in (models.UserRole.GATE, models.UserRole.ADMIN):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Insufficient permissions"
+        )
+    return current_user
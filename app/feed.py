@@ -0,0 +1,171 @@
+"""Precomputed "now showing" feed for the home screen.
+
+One snapshot is kept per chain, city and day; a city is matched against
+theater locations exactly, ignoring case. A snapshot holds the
+rendered body, and requests are served straight from memory. At most every
+``feed_refresh_seconds`` one cheap query lists the day's upcoming showtimes
+with their seat versions. A booking or cancellation bumps a showtime's
+seat version, so only the showtimes that changed have their seats-left
+recounted. Everything else is reused from the previous snapshot.
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from sqlalchemy import func
+from sqlalchemy.orm import Session, joinedload
+from . import models, schemas
+from .caching import make_etag
+from .config import get_settings
+from .seat_map import get_seat_map
+
+# Per showtime: enough to notice any change that shows in the feed
+LISTING_COLUMNS = (
+    models.Showtime.id,
+    models.Showtime.seat_version,
+    models.Showtime.start_time,
+    models.Showtime.price_per_seat,
+    models.Showtime.movie_id,
+    models.Showtime.screen_id,
+)
+
+
+@dataclass
+class FeedSnapshot:
+    listing: tuple  # LISTING_COLUMNS rows, by showtime id
+    seats_left: dict  # showtime id -> seats left at the listed seat version
+    body: bytes
+    version: str
+    etag: str
+    built_at: float
+    checked_at: float
+
+
+def _listing(db: Session, city: str, day: date) -> tuple:
+    day_start = datetime.combine(day, datetime.min.time())
+    rows = db.query(*LISTING_COLUMNS).join(models.Showtime.screen).join(models.Screen.theater).filter(
+        func.lower(models.Theater.location) == city,
+        models.Showtime.start_time >= max(day_start, datetime.utcnow()),
+        models.Showtime.start_time < day_start + timedelta(days=1)
+    ).order_by(models.Showtime.id).all()
+    return tuple(tuple(row) for row in rows)
+
+
+def _count_seats_left(db: Session, listing, screens: dict) -> dict:
+    showtime_ids = [row[0] for row in listing]
+    taken = dict(db.query(
+        models.ShowtimeRollup.showtime_id,
+        models.ShowtimeRollup.seats_held + models.ShowtimeRollup.seats_sold
+    ).filter(models.ShowtimeRollup.showtime_id.in_(showtime_ids)))
+    return {
+        showtime_id: get_seat_map(screens[screen_id]).total_seats - taken.get(showtime_id, 0)
+        for showtime_id, _, _, _, _, screen_id in listing
+    }
+
+
+def _render(content: dict) -> bytes:
+    return JSONResponse(content=jsonable_encoder(content)).body
+
+
+def build_snapshot(db: Session, city: str, day: date, listing: tuple, previous: FeedSnapshot = None) -> FeedSnapshot:
+    screens = {
+        screen.id: screen
+        for screen in db.query(models.Screen).options(joinedload(models.Screen.theater)).filter(
+            models.Screen.id.in_({row[5] for row in listing})
+        )
+    }
+    movies = {
+        movie.id: movie
+        for movie in db.query(models.Movie).filter(models.Movie.id.in_({row[4] for row in listing}))
+    }
+
+    # Seats left only change with the seat version
+    previous_versions = {row[0]: row[1] for row in previous.listing} if previous else {}
+    unchanged = {
+        row[0]: previous.seats_left[row[0]]
+        for row in listing if previous_versions.get(row[0]) == row[1]
+    }
+    seats_left = dict(unchanged)
+    seats_left.update(_count_seats_left(db, [row for row in listing if row[0] not in unchanged], screens))
+
+    grouped = {}
+    for showtime_id, _, start_time, price_per_seat, movie_id, screen_id in listing:
+        screen = screens[screen_id]
+        grouped.setdefault(movie_id, {}).setdefault(screen.theater_id, []).append(schemas.FeedShowtime(
+            id=showtime_id,
+            start_time=start_time,
+            screen_number=screen.screen_number,
+            price_per_seat=price_per_seat,
+            seats_left=max(seats_left[showtime_id], 0),
+        ))
+
+    theaters = {screen.theater_id: screen.theater for screen in screens.values()}
+    feed_movies = []
+    for movie_id, by_theater in grouped.items():
+        feed_theaters = [
+            schemas.FeedTheater(
+                theater=schemas.Theater.model_validate(theaters[theater_id]),
+                showtimes=sorted(showtimes, key=lambda showtime: showtime.start_time)
+            )
+            for theater_id, showtimes in by_theater.items()
+        ]
+        feed_theaters.sort(key=lambda feed_theater: feed_theater.theater.name)
+        feed_movies.append(schemas.FeedMovie(movie=schemas.Movie.model_validate(movies[movie_id]), theaters=feed_theaters))
+    feed_movies.sort(key=lambda feed_movie: feed_movie.movie.title)
+
+    content = {"city": city, "date": day.isoformat(), "movies": feed_movies}
+    # The version is a digest of the content, so every worker agrees on it
+    version = hashlib.sha1(_render(content)).hexdigest()[:16]
+    body = _render(schemas.NowShowing(version=version, **content))
+    now = time.monotonic()
+    return FeedSnapshot(
+        listing=listing,
+        seats_left=seats_left,
+        body=body,
+        version=version,
+        etag=make_etag("feed", version),
+        built_at=now,
+        checked_at=now,
+    )
+
+
+class NowShowingCache:
+    """Keeps the most recently used feed snapshots, up to ``feed_max_snapshots``."""
+
+    def __init__(self):
+        self.snapshots = OrderedDict()
+        self.lock = threading.Lock()
+
+    def clear(self):
+        with self.lock:
+            self.snapshots.clear()
+
+    def get(self, db: Session, chain: str, city: str, day: date) -> FeedSnapshot:
+        settings = get_settings()
+        city = city.strip().lower()
+        key = (chain, city, day)
+        now = time.monotonic()
+        snapshot = self.snapshots.get(key)
+        if snapshot is not None and now - snapshot.checked_at < settings.feed_refresh_seconds:
+            return snapshot
+
+        listing = _listing(db, city, day)
+        fresh = snapshot is not None and now - snapshot.built_at < settings.feed_max_age_seconds
+        if fresh and listing == snapshot.listing:
+            snapshot.checked_at = now
+            return snapshot
+
+        snapshot = build_snapshot(db, city, day, listing, previous=snapshot if fresh else None)
+        with self.lock:
+            self.snapshots[key] = snapshot
+            self.snapshots.move_to_end(key)
+            while len(self.snapshots) > settings.feed_max_snapshots:
+                self.snapshots.popitem(last=False)
+        return snapshot
+
+
+now_showing = NowShowingCache()
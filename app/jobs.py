@@ -0,0 +1,167 @@
+"""Database-backed job queue for work that shouldn't delay a response.
+
+Routers call ``enqueue`` inside their own transaction, so a job exists exactly
+when the change that produced it was committed. Workers (``python -m app.worker``)
+claim due jobs in batches with ``SELECT ... FOR UPDATE SKIP LOCKED``, so any
+number of them can share the table without handing out a job twice.
+"""
+import json
+import logging
+import random
+from datetime import datetime, timedelta
+from typing import Callable, Dict, NamedTuple
+from sqlalchemy import and_, or_, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from . import models
+from .config import get_settings
+
+logger = logging.getLogger(__name__)
+
+# task name -> function(db, payload)
+TASKS: Dict[str, Callable] = {}
+
+
+class ClaimedJob(NamedTuple):
+    id: int
+    name: str
+    payload: dict
+    attempts: int
+    max_attempts: int
+    interval_seconds: int
+
+
+def task(name: str):
+    def register(func):
+        TASKS[name] = func
+        return func
+    return register
+
+
+def enqueue(
+    db: Session,
+    name: str,
+    payload: dict = None,
+    run_at: datetime = None,
+    max_attempts: int = 5
+) -> models.Job:
+    """Add a job to the caller's transaction; it becomes visible on commit."""
+    job = models.Job(
+        name=name,
+        payload=json.dumps(payload or {}),
+        status=models.JobStatus.QUEUED,
+        run_at=run_at or datetime.utcnow(),
+        max_attempts=max_attempts
+    )
+    db.add(job)
+    return job
+
+
+def schedule(db: Session, name: str, interval_seconds: int, payload: dict = None):
+    """Make sure a recurring job exists; safe to call from every worker at startup."""
+    job = models.Job(
+        name=name,
+        payload=json.dumps(payload or {}),
+        status=models.JobStatus.QUEUED,
+        run_at=datetime.utcnow(),
+        interval_seconds=interval_seconds,
+        unique_key=f"schedule:{name}"
+    )
+    try:
+        with db.begin_nested():
+            db.add(job)
+    except IntegrityError:
+        pass  # already scheduled
+    db.commit()
+
+
+def claim_batch(db: Session, worker_id: str, batch_size: int) -> list:
+    """Lock up to ``batch_size`` due jobs for this worker and commit the claim.
+
+    Jobs whose worker died mid-run are reclaimed once their lock times out,
+    unless that run was their last attempt: those are marked failed instead.
+    """
+    now = datetime.utcnow()
+    stale = now - timedelta(seconds=get_settings().job_lock_timeout_seconds)
+    jobs = db.query(models.Job).filter(or_(
+        and_(models.Job.status == models.JobStatus.QUEUED, models.Job.run_at <= now),
+        and_(models.Job.status == models.JobStatus.RUNNING, models.Job.locked_at < stale)
+    )).order_by(models.Job.run_at).limit(batch_size).with_for_update(skip_locked=True).all()
+
+    claimed = []
+    for job in jobs:
+        if job.status == models.JobStatus.RUNNING and job.attempts >= job.max_attempts and not job.interval_seconds:
+            job.status = models.JobStatus.FAILED
+            job.last_error = f"Worker {job.locked_by} stopped without finishing the job"
+            job.locked_by = None
+            job.locked_at = None
+            continue
+        job.status = models.JobStatus.RUNNING
+        job.locked_by = worker_id
+        job.locked_at = now
+        job.attempts += 1
+        claimed.append(ClaimedJob(
+            job.id, job.name, json.loads(job.payload), job.attempts, job.max_attempts, job.interval_seconds
+        ))
+    db.commit()
+    return claimed
+
+
+def release(db: Session, worker_id: str, jobs: list):
+    """Hand claimed jobs this worker won't run back to the queue, as if never claimed."""
+    if not jobs:
+        return
+    db.execute(
+        update(models.Job).where(
+            models.Job.id.in_([job.id for job in jobs]),
+            models.Job.locked_by == worker_id
+        ).values(
+            status=models.JobStatus.QUEUED, locked_by=None, locked_at=None, attempts=models.Job.attempts - 1
+        ).execution_options(synchronize_session=False)
+    )
+    db.commit()
+
+
+def retry_delay(attempts: int) -> float:
+    # Exponential backoff with jitter so failed jobs don't retry in lockstep
+    settings = get_settings()
+    delay = min(settings.job_retry_base_seconds * 2 ** (attempts - 1), settings.job_retry_max_seconds)
+    return delay + random.uniform(0, settings.job_retry_base_seconds)
+
+
+def _finish(db: Session, job_id: int, **values):
+    db.execute(
+        update(models.Job).where(models.Job.id == job_id).values(locked_by=None, locked_at=None, **values)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def run_job(db: Session, job: ClaimedJob) -> bool:
+    """Run one claimed job; its side effects and completion commit together."""
+    now = datetime.utcnow()
+    try:
+        func = TASKS.get(job.name)
+        if func is None:
+            raise LookupError(f"No task registered as {job.name}")
+        func(db, job.payload)
+        if job.interval_seconds:
+            _finish(
+                db, job.id, status=models.JobStatus.QUEUED, attempts=0, last_error=None,
+                run_at=now + timedelta(seconds=job.interval_seconds)
+            )
+        else:
+            _finish(db, job.id, status=models.JobStatus.DONE, last_error=None)
+        db.commit()
+        return True
+    except Exception as e:
+        db.rollback()
+        logger.exception("Job %s (%s) failed on attempt %s", job.id, job.name, job.attempts)
+        if job.attempts >= job.max_attempts and not job.interval_seconds:
+            _finish(db, job.id, status=models.JobStatus.FAILED, last_error=repr(e))
+        else:
+            _finish(
+                db, job.id, status=models.JobStatus.QUEUED, last_error=repr(e),
+                run_at=now + timedelta(seconds=retry_delay(job.attempts))
+            )
+        db.commit()
+        return False
@@ -0,0 +1,86 @@
+import logging
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime
+from fastapi import FastAPI
+from starlette.concurrency import run_in_threadpool
+from sqlalchemy import text
+from sqlalchemy.pool import QueuePool
+from . import models
+from .config import get_settings
+from .database import create_schema, get_database_url, get_engine, is_sqlite_memory, sessionLocal
+from .pricing import pricing_engine
+from .seat_map import get_seat_map
+
+logger = logging.getLogger(__name__)
+
+# Close enough to process start for measuring cold starts: this module is
+# imported while the app is being built
+PROCESS_STARTED = time.monotonic()
+
+
+class LifecycleState:
+    def __init__(self):
+        self.ready = False
+        self.draining = False
+        self.startup_ms = None
+
+
+state = LifecycleState()
+
+
+def warm_database_pool():
+    # Open the whole steady-state pool now rather than on the first requests.
+    # SQLite connections are cheap to open and share one file lock.
+    engine = get_engine()
+    if engine.dialect.name == "sqlite" or not isinstance(engine.pool, QueuePool):
+        return
+    connections = [engine.connect() for _ in range(get_settings().db_pool_size)]
+    try:
+        for connection in connections:
+            connection.execute(text("SELECT 1"))
+    finally:
+        for connection in connections:
+            connection.close()
+
+
+def warm_caches():
+    db = sessionLocal()
+    try:
+        screens = db.query(models.Screen).join(models.Screen.showtimes).filter(
+            models.Showtime.start_time >= datetime.utcnow()
+        ).distinct()
+        for screen in screens:
+            get_seat_map(screen)
+        pricing_engine.current_rules(db)
+    finally:
+        db.close()
+
+
+def database_ok() -> bool:
+    try:
+        with get_engine().connect() as connection:
+            connection.execute(text("SELECT 1"))
+        return True
+    except Exception:
+        logger.exception("Database health check failed")
+        return False
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # An in-memory database starts empty in every process
+    if get_settings().database_create_all or is_sqlite_memory(get_database_url()):
+        await run_in_threadpool(create_schema)
+    # A cold worker is better than none: readiness still checks the database
+    for warm in (warm_database_pool, warm_caches):
+        try:
+            await run_in_threadpool(warm)
+        except Exception:
+            logger.exception("Warm-up step %s failed", warm.__name__)
+    state.ready = True
+    state.startup_ms = (time.monotonic() - PROCESS_STARTED) * 1000
+    logger.info("Worker ready in %.0f ms", state.startup_ms)
+    yield
+    state.ready = False
+    get_engine().dispose()
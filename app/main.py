@@ -1,18 +1,61 @@
-from fastapi import FastAPI
-from .database import engine
-from . import models
-from .routers import auth, movies,theaters,showtimes, bookings, payments
-
-app=FastAPI()
-
-#models.Base.metadata.create_all(bind=engine)
-@app.get("/")
-def health_check():
-    return {"message":"check check"}
-
-app.include_router(auth.router, prefix="/auth", tags=["Authentication"])
-app.include_router(movies.router, prefix="/movies", tags=["Movies"])
-app.include_router(theaters.router, prefix="/theaters", tags=["Theaters"])
-app.include_router(showtimes.router, prefix="/showtimes", tags=["Showtimes"])
-app.include_router(bookings.router, prefix="/bookings", tags=["Bookings"])
-app.include_router(payments.router, prefix="/payments", tags=["Payments"])
\ No newline at end of file
+from fastapi import Depends, FastAPI, Response
+
+
+def create_app() -> FastAPI:
+    # Routers, schemas and settings load here rather than at import, so
+    # importing this module is cheap and needs no environment or database
+    from .config import get_settings
+    from .database import require_chain
+    from .compression import CompressionMiddleware
+    from .lifecycle import database_ok, lifespan, state
+    from .routers import auth, movies,theaters,showtimes, bookings, payments, pricing, reports, analytics, exports, tickets, feed
+
+    app=FastAPI(lifespan=lifespan)
+    app.add_middleware(CompressionMiddleware, minimum_size=get_settings().compression_minimum_size)
+
+    #models.Base.metadata.create_all(bind=get_engine())
+    @app.get("/")
+    def health_check():
+        return {"message":"check check"}
+
+    @app.get("/health/live")
+    def liveness():
+        return {"status": "alive"}
+
+    @app.get("/health/ready")
+    def readiness(response: Response):
+        if not state.ready or state.draining:
+            response.status_code = 503
+            return {"status": "draining" if state.draining else "starting"}
+        if not database_ok():
+            response.status_code = 503
+            return {"status": "database unavailable"}
+        return {"status": "ready", "startup_ms": state.startup_ms}
+
+    app.include_router(auth.router, prefix="/auth", tags=["Authentication"])
+    app.include_router(movies.router, prefix="/movies", tags=["Movies"])
+    # Everything else reads or writes a chain's rows on its shard
+    chained = [Depends(require_chain)]
+    app.include_router(theaters.router, prefix="/theaters", tags=["Theaters"], dependencies=chained)
+    app.include_router(showtimes.router, prefix="/showtimes", tags=["Showtimes"], dependencies=chained)
+    app.include_router(bookings.router, prefix="/bookings", tags=["Bookings"], dependencies=chained)
+    app.include_router(payments.router, prefix="/payments", tags=["Payments"], dependencies=chained)
+    app.include_router(pricing.router, prefix="/pricing", tags=["Pricing"], dependencies=chained)
+    app.include_router(reports.router, prefix="/reports", tags=["Reports"], dependencies=chained)
+    app.include_router(analytics.router, prefix="/analytics", tags=["Analytics"], dependencies=chained)
+    app.include_router(exports.router, prefix="/exports", tags=["Exports"], dependencies=chained)
+    app.include_router(tickets.router, prefix="/tickets", tags=["Tickets"], dependencies=chained)
+    app.include_router(feed.router, prefix="/feed", tags=["Feed"], dependencies=chained)
+    return app
+
+
+_app = None
+
+def __getattr__(name):
+    # Keeps "app.main:app" working for uvicorn and existing deployments
+    global _app
+    if name == "app":
+        if _app is None:
+            _app = create_app()
+        return _app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
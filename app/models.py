@@ -1,14 +1,24 @@
-from sqlalchemy import String, Integer, ForeignKey, Float, DateTime, Text, Enum
+from sqlalchemy import String, Integer, ForeignKey, Float, DateTime, Text, Enum, Boolean, Numeric, Index, func
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 import enum
 from datetime import datetime
+from decimal import Decimal
 from .database import Base
 
+# Money is stored exactly, in major units with two decimal places
+Money = Numeric(10, 2)
+
+# Tenant key: every theater belongs to a cinema chain, and its screens,
+# showtimes, bookings, tickets and rollups carry the same chain so they can be
+# routed to its shard
+DEFAULT_CHAIN = "default"
+
 
 
 class UserRole(enum.Enum):
     ADMIN = "admin"
     USER = "user"
+    GATE = "gate"  # a scanner device: may only fetch gate bundles and sync check-ins
 
 class BookingStatus(enum.Enum):
     PENDING = "pending"
@@ -20,6 +30,16 @@ class PaymentStatus(enum.Enum):
     SUCCESS = "success"
     FAILED = "failed"
 
+class JobStatus(enum.Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+
+class PricingRuleKind(enum.Enum):
+    TIME_OF_DAY = "time_of_day"
+    DEMAND = "demand"
+
 
 class User(Base):
     __tablename__ = "users"
@@ -29,6 +49,7 @@ class User(Base):
     email: Mapped[str] = mapped_column(String(120), unique=True, index=True)
     password_hash: Mapped[str] = mapped_column(String(255))
     role: Mapped[UserRole] = mapped_column(Enum(UserRole), default=UserRole.USER)
+    token_generation: Mapped[int] = mapped_column(Integer, default=0, server_default="0")  # bumped to revoke every token at once
 
     bookings: Mapped[list["Booking"]] = relationship(back_populates="user")
 
@@ -53,10 +74,15 @@ class Theater(Base):
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
     name: Mapped[str] = mapped_column(String(150))
     location: Mapped[str] = mapped_column(String(200))
+    chain: Mapped[str] = mapped_column(String(50), default=DEFAULT_CHAIN, server_default=DEFAULT_CHAIN, index=True)
 
     screens: Mapped[list["Screen"]] = relationship(back_populates="theater")
 
 
+# The now-showing feed matches a city case-insensitively, but exactly
+Index("ix_theaters_lower_location", func.lower(Theater.location))
+
+
 
 class Screen(Base):
     __tablename__ = "screens"
@@ -64,7 +90,9 @@ class Screen(Base):
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
     theater_id: Mapped[int] = mapped_column(ForeignKey("theaters.id"))
     screen_number: Mapped[int] = mapped_column(Integer)
-    seat_layout: Mapped[str] = mapped_column(Text)
+    seat_layout: Mapped[str] = mapped_column(Text, deferred=True)  # only loaded to (re)compile the seat map
+    layout_version: Mapped[int] = mapped_column(Integer, default=1, server_default="1")
+    chain: Mapped[str] = mapped_column(String(50), default=DEFAULT_CHAIN, server_default=DEFAULT_CHAIN, index=True)
 
     theater: Mapped["Theater"] = relationship(back_populates="screens")
     showtimes: Mapped[list["Showtime"]] = relationship(back_populates="screen")
@@ -77,8 +105,10 @@ class Showtime(Base):
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
     movie_id: Mapped[int] = mapped_column(ForeignKey("movies.id"))
     screen_id: Mapped[int] = mapped_column(ForeignKey("screens.id"))
-    start_time: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
-    price_per_seat: Mapped[float] = mapped_column(Float)
+    start_time: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, index=True)
+    price_per_seat: Mapped[Decimal] = mapped_column(Money)
+    seat_version: Mapped[int] = mapped_column(Integer, default=0, server_default="0")  # bumped on every seat change
+    chain: Mapped[str] = mapped_column(String(50), default=DEFAULT_CHAIN, server_default=DEFAULT_CHAIN, index=True)
 
     movie: Mapped["Movie"] = relationship(back_populates="showtimes")
     screen: Mapped["Screen"] = relationship(back_populates="showtimes")
@@ -89,15 +119,18 @@ class Booking(Base):
     __tablename__ = "bookings"
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
-    user_id: Mapped[int] = mapped_column(ForeignKey("users.id"))
-    showtime_id: Mapped[int] = mapped_column(ForeignKey("showtimes.id"))
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id"), index=True)
+    showtime_id: Mapped[int] = mapped_column(ForeignKey("showtimes.id"), index=True)
     seats_booked: Mapped[str] = mapped_column(Text)  # JSON string of booked seats
-    total_price: Mapped[float] = mapped_column(Float)
+    total_price: Mapped[Decimal] = mapped_column(Money)
     status: Mapped[BookingStatus] = mapped_column(Enum(BookingStatus), default=BookingStatus.PENDING)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, server_default=func.now(), index=True)
+    chain: Mapped[str] = mapped_column(String(50), default=DEFAULT_CHAIN, server_default=DEFAULT_CHAIN, index=True)
 
     user: Mapped["User"] = relationship(back_populates="bookings")
     showtime: Mapped["Showtime"] = relationship(back_populates="bookings")
     payment: Mapped["Payment"] = relationship(back_populates="booking", uselist=False)
+    ticket: Mapped["Ticket"] = relationship(back_populates="booking", uselist=False)
 
 
 
@@ -105,8 +138,179 @@ class Payment(Base):
     __tablename__ = "payments"
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
-    booking_id: Mapped[int] = mapped_column(ForeignKey("bookings.id"))
-    amount: Mapped[float] = mapped_column(Float)
+    booking_id: Mapped[int] = mapped_column(ForeignKey("bookings.id"), index=True)
+    amount: Mapped[Decimal] = mapped_column(Money)
     payment_status: Mapped[PaymentStatus] = mapped_column(Enum(PaymentStatus), default=PaymentStatus.PENDING)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, server_default=func.now(), index=True)
 
     booking: Mapped["Booking"] = relationship(back_populates="payment")
+
+
+class SeatChange(Base):
+    __tablename__ = "seat_changes"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
+    showtime_id: Mapped[int] = mapped_column(ForeignKey("showtimes.id"), index=True)
+    version: Mapped[int] = mapped_column(Integer)  # showtime seat_version that produced the change
+    seat: Mapped[str] = mapped_column(String(20))
+    booked: Mapped[bool] = mapped_column(Boolean)
+
+
+class PricingRule(Base):
+    __tablename__ = "pricing_rules"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
+    name: Mapped[str] = mapped_column(String(100))
+    kind: Mapped[PricingRuleKind] = mapped_column(Enum(PricingRuleKind))
+    category: Mapped[str] = mapped_column(String(50), nullable=True)  # null applies to every seat category
+    start_hour: Mapped[int] = mapped_column(Integer, nullable=True)  # time_of_day: [start_hour, end_hour)
+    end_hour: Mapped[int] = mapped_column(Integer, nullable=True)
+    min_occupancy: Mapped[float] = mapped_column(Float, nullable=True)  # demand: fraction of seats taken
+    multiplier: Mapped[float] = mapped_column(Float)
+
+
+# Analytics rollups. Keyed by plain ids (no foreign keys) so they can
+# outlive the rows they summarise.
+class ShowtimeRollup(Base):
+    __tablename__ = "showtime_rollups"
+
+    showtime_id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    chain: Mapped[str] = mapped_column(String(50), default=DEFAULT_CHAIN, server_default=DEFAULT_CHAIN, index=True)
+    movie_id: Mapped[int] = mapped_column(Integer, index=True)
+    theater_id: Mapped[int] = mapped_column(Integer, index=True)
+    start_time: Mapped[datetime] = mapped_column(DateTime, index=True)
+    capacity: Mapped[int] = mapped_column(Integer, default=0)
+    seats_held: Mapped[int] = mapped_column(Integer, default=0)  # seats in pending bookings
+    seats_sold: Mapped[int] = mapped_column(Integer, default=0)  # seats in confirmed bookings
+    bookings_confirmed: Mapped[int] = mapped_column(Integer, default=0)
+    bookings_cancelled: Mapped[int] = mapped_column(Integer, default=0)
+    revenue: Mapped[Decimal] = mapped_column(Money, default=0)
+
+
+class HourlyRollup(Base):
+    __tablename__ = "hourly_rollups"
+
+    hour: Mapped[datetime] = mapped_column(DateTime, primary_key=True)  # showtime start, truncated to the hour
+    movie_id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    theater_id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    chain: Mapped[str] = mapped_column(String(50), default=DEFAULT_CHAIN, server_default=DEFAULT_CHAIN, index=True)
+    capacity: Mapped[int] = mapped_column(Integer, default=0)
+    seats_held: Mapped[int] = mapped_column(Integer, default=0)
+    seats_sold: Mapped[int] = mapped_column(Integer, default=0)
+    bookings_confirmed: Mapped[int] = mapped_column(Integer, default=0)
+    bookings_cancelled: Mapped[int] = mapped_column(Integer, default=0)
+    revenue: Mapped[Decimal] = mapped_column(Money, default=0)
+
+
+# Archive of completed showtimes, moved out of the hot tables by app.archive.
+# Rows keep their original ids.
+class ArchivedShowtime(Base):
+    __tablename__ = "archived_showtimes"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=False)
+    movie_id: Mapped[int] = mapped_column(ForeignKey("movies.id"))
+    screen_id: Mapped[int] = mapped_column(ForeignKey("screens.id"))
+    start_time: Mapped[datetime] = mapped_column(DateTime, index=True)
+    price_per_seat: Mapped[Decimal] = mapped_column(Money)
+    seat_version: Mapped[int] = mapped_column(Integer, default=0)
+    archived_at: Mapped[datetime] = mapped_column(DateTime, server_default=func.now())
+
+    movie: Mapped["Movie"] = relationship()
+    screen: Mapped["Screen"] = relationship()
+    bookings: Mapped[list["ArchivedBooking"]] = relationship(back_populates="showtime")
+
+
+class ArchivedBooking(Base):
+    __tablename__ = "archived_bookings"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=False)
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id"), index=True)
+    showtime_id: Mapped[int] = mapped_column(ForeignKey("archived_showtimes.id"), index=True)
+    seats_booked: Mapped[str] = mapped_column(Text)
+    total_price: Mapped[Decimal] = mapped_column(Money)
+    status: Mapped[BookingStatus] = mapped_column(Enum(BookingStatus))
+    created_at: Mapped[datetime] = mapped_column(DateTime, index=True)
+    chain: Mapped[str] = mapped_column(String(50), default=DEFAULT_CHAIN, server_default=DEFAULT_CHAIN, index=True)
+
+    user: Mapped["User"] = relationship()
+    showtime: Mapped["ArchivedShowtime"] = relationship(back_populates="bookings")
+    payment: Mapped["ArchivedPayment"] = relationship(back_populates="booking", uselist=False)
+
+
+class ArchivedPayment(Base):
+    __tablename__ = "archived_payments"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=False)
+    booking_id: Mapped[int] = mapped_column(ForeignKey("archived_bookings.id"), index=True)
+    amount: Mapped[Decimal] = mapped_column(Money)
+    payment_status: Mapped[PaymentStatus] = mapped_column(Enum(PaymentStatus))
+    created_at: Mapped[datetime] = mapped_column(DateTime, index=True)
+
+    booking: Mapped["ArchivedBooking"] = relationship(back_populates="payment")
+
+
+class Job(Base):
+    __tablename__ = "jobs"
+    __table_args__ = (Index("ix_jobs_status_run_at", "status", "run_at"),)
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
+    name: Mapped[str] = mapped_column(String(100))
+    payload: Mapped[str] = mapped_column(Text, default="{}")  # JSON object passed to the task
+    status: Mapped[JobStatus] = mapped_column(Enum(JobStatus), default=JobStatus.QUEUED)
+    run_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+    attempts: Mapped[int] = mapped_column(Integer, default=0)
+    max_attempts: Mapped[int] = mapped_column(Integer, default=5)
+    interval_seconds: Mapped[int] = mapped_column(Integer, nullable=True)  # recurring jobs are requeued after each run
+    unique_key: Mapped[str] = mapped_column(String(200), unique=True, nullable=True)
+    locked_by: Mapped[str] = mapped_column(String(100), nullable=True)
+    locked_at: Mapped[datetime] = mapped_column(DateTime, nullable=True)
+    last_error: Mapped[str] = mapped_column(Text, nullable=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+
+
+class Ticket(Base):
+    __tablename__ = "tickets"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
+    booking_id: Mapped[int] = mapped_column(ForeignKey("bookings.id"), unique=True)
+    showtime_id: Mapped[int] = mapped_column(Integer, index=True)
+    chain: Mapped[str] = mapped_column(String(50), default=DEFAULT_CHAIN, server_default=DEFAULT_CHAIN, index=True)
+    token: Mapped[str] = mapped_column(String(512))
+    issued_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+    revoked: Mapped[bool] = mapped_column(Boolean, default=False)
+    checked_in_at: Mapped[datetime] = mapped_column(DateTime, nullable=True)
+    checked_in_gate: Mapped[str] = mapped_column(String(50), nullable=True)
+
+    booking: Mapped["Booking"] = relationship(back_populates="ticket")
+
+
+class ChainShard(Base):
+    """Which shard holds a chain's data; chains without a row use the default shard."""
+    __tablename__ = "chain_shards"
+
+    chain: Mapped[str] = mapped_column(String(50), primary_key=True)
+    shard: Mapped[str] = mapped_column(String(50))
+    moving: Mapped[bool] = mapped_column(Boolean, default=False)  # requests for the chain wait while a move finishes
+    updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+class RefreshToken(Base):
+    __tablename__ = "refresh_tokens"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
+    jti: Mapped[str] = mapped_column(String(32), unique=True, index=True)
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id"), index=True)
+    expires_at: Mapped[datetime] = mapped_column(DateTime, index=True)
+    revoked: Mapped[bool] = mapped_column(Boolean, default=False)  # set when used, so each refresh token works once
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+
+    user: Mapped["User"] = relationship()
+
+
+class RevokedToken(Base):
+    """Access tokens revoked before they expire; rows can go once they would have expired."""
+    __tablename__ = "revoked_tokens"
+
+    jti: Mapped[str] = mapped_column(String(32), primary_key=True)
+    expires_at: Mapped[datetime] = mapped_column(DateTime, index=True)
+    revoked_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, index=True)
@@ -0,0 +1,243 @@
+"""Per-showtime price tables built from the pricing rules.
+
+``python -m app.pricing bench`` measures quote latency under concurrency.
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from bisect import bisect_right
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime
+from decimal import ROUND_HALF_UP, Decimal
+from types import MappingProxyType
+from typing import List, Mapping, NamedTuple, Optional, Tuple
+from sqlalchemy.orm import Session
+from . import models
+from .config import get_settings
+from .seat_map import SeatMap, compile_layout
+
+
+CENT = Decimal("0.01")
+
+
+def to_money(value: Decimal) -> Decimal:
+    return value.quantize(CENT, rounding=ROUND_HALF_UP)
+
+
+class Rule(NamedTuple):
+    id: int
+    kind: models.PricingRuleKind
+    category: Optional[str]
+    start_hour: Optional[int]
+    end_hour: Optional[int]
+    min_occupancy: Optional[float]
+    multiplier: float
+
+
+RULE_COLUMNS = tuple(getattr(models.PricingRule, field) for field in Rule._fields)
+
+
+@dataclass(frozen=True)
+class PriceTable:
+    """Seat prices for one showtime, precomputed per demand tier and seat category."""
+    showtime_id: int
+    key: tuple
+    thresholds: Tuple[float, ...]                 # lower occupancy bound of each tier, ascending
+    prices: Tuple[Mapping[str, Decimal], ...]     # tier -> category -> seat price
+
+    def tier(self, occupancy: float) -> int:
+        return bisect_right(self.thresholds, occupancy) - 1
+
+    def price(self, category: str, occupancy: float) -> Decimal:
+        return self.prices[self.tier(occupancy)][category]
+
+
+def _in_hours(rule: Rule, hour: int) -> bool:
+    if rule.start_hour <= rule.end_hour:
+        return rule.start_hour <= hour < rule.end_hour
+    return hour >= rule.start_hour or hour < rule.end_hour  # window wraps midnight
+
+
+def _applies(rule: Rule, category: str) -> bool:
+    return rule.category is None or rule.category == category
+
+
+def build_price_table(showtime: models.Showtime, seat_map: SeatMap, rules, key: tuple) -> PriceTable:
+    hour = showtime.start_time.hour
+    time_rules = [
+        rule for rule in rules
+        if rule.kind == models.PricingRuleKind.TIME_OF_DAY and _in_hours(rule, hour)
+    ]
+    demand_rules = sorted(
+        (rule for rule in rules if rule.kind == models.PricingRuleKind.DEMAND),
+        key=lambda rule: rule.min_occupancy
+    )
+    thresholds = sorted({0.0} | {rule.min_occupancy for rule in demand_rules})
+
+    prices = []
+    for threshold in thresholds:
+        tier_prices = {}
+        for category, category_multiplier in seat_map.multipliers.items():
+            multiplier = category_multiplier
+            for rule in time_rules:
+                if _applies(rule, category):
+                    multiplier *= rule.multiplier
+            # Demand tiers don't compound: the highest tier reached wins
+            for rule in reversed(demand_rules):
+                if rule.min_occupancy <= threshold and _applies(rule, category):
+                    multiplier *= rule.multiplier
+                    break
+            tier_prices[category] = to_money(Decimal(showtime.price_per_seat) * Decimal(str(multiplier)))
+        prices.append(MappingProxyType(tier_prices))
+
+    return PriceTable(
+        showtime_id=showtime.id,
+        key=key,
+        thresholds=tuple(thresholds),
+        prices=tuple(prices),
+    )
+
+
+class PricingEngine:
+    """Caches pricing rules and per-showtime price tables in process.
+
+    Rules are reloaded at most every ``pricing_rules_ttl_seconds`` (or at once
+    after a local change), and a reload that changes them bumps ``generation``,
+    which retires every cached price table. At most ``pricing_max_tables``
+    tables are kept, dropping the least recently quoted showtime first.
+    """
+
+    def __init__(self):
+        self.rules = ()
+        self.generation = 0
+        self.loaded_at = None
+        self.tables = OrderedDict()
+        self.lock = threading.Lock()
+
+    def invalidate(self):
+        self.loaded_at = None
+
+    def current_rules(self, db: Session):
+        now = time.monotonic()
+        if self.loaded_at is not None and now - self.loaded_at < get_settings().pricing_rules_ttl_seconds:
+            return self.rules, self.generation
+
+        rows = db.query(*RULE_COLUMNS).order_by(models.PricingRule.id).all()
+        rules = tuple(Rule(*row) for row in rows)
+        with self.lock:
+            if rules != self.rules:
+                self.rules = rules
+                self.generation += 1
+                self.tables = OrderedDict()
+            self.loaded_at = now
+            return self.rules, self.generation
+
+    def price_table(self, db: Session, showtime: models.Showtime, seat_map: SeatMap) -> PriceTable:
+        rules, generation = self.current_rules(db)
+        key = (
+            generation, showtime.price_per_seat, showtime.start_time,
+            seat_map.screen_id, seat_map.layout_version
+        )
+        tables = self.tables
+        table = tables.get(showtime.id)
+        if table is not None and table.key == key:
+            try:
+                tables.move_to_end(showtime.id)
+            except KeyError:
+                pass  # evicted meanwhile; still valid for this quote
+            return table
+
+        table = build_price_table(showtime, seat_map, rules, key)
+        with self.lock:
+            if generation == self.generation:
+                self.tables[showtime.id] = table
+                self.tables.move_to_end(showtime.id)
+                while len(self.tables) > get_settings().pricing_max_tables:
+                    self.tables.popitem(last=False)
+        return table
+
+
+pricing_engine = PricingEngine()
+
+
+def quote_seats(
+    db: Session, showtime: models.Showtime, seat_map: SeatMap, seats: List[str], booked_count: int
+) -> Tuple[int, List[Tuple[str, str, Decimal]]]:
+    """Price ``seats`` at the showtime's current demand tier.
+
+    Returns the tier and a (seat, category, price) entry per seat.
+    """
+    table = pricing_engine.price_table(db, showtime, seat_map)
+    occupancy = booked_count / seat_map.total_seats if seat_map.total_seats else 0.0
+    tier = table.tier(occupancy)
+    quoted = []
+    for seat in seats:
+        category = seat_map.categories[seat_map.index[seat]]
+        quoted.append((seat, category, table.prices[tier][category]))
+    return tier, quoted
+
+
+def bench(showtimes: int, threads: int, quotes: int):
+    layout = {
+        "categories": {"standard": 1.0, "premium": 1.5},
+        "rows": [
+            {"label": row, "seats": [{"number": n, "category": "premium" if row in "GH" else "standard"} for n in range(1, 21)]}
+            for row in "ABCDEFGHIJ"
+        ],
+    }
+    seat_map = compile_layout(1, 1, json.dumps(layout))
+    rule = Rule._make
+    pricing_engine.rules = (
+        rule((1, models.PricingRuleKind.TIME_OF_DAY, None, 18, 23, None, 1.2)),
+        rule((2, models.PricingRuleKind.TIME_OF_DAY, "premium", 12, 15, None, 0.9)),
+        rule((3, models.PricingRuleKind.DEMAND, None, None, None, 0.5, 1.1)),
+        rule((4, models.PricingRuleKind.DEMAND, None, None, None, 0.8, 1.25)),
+    )
+    pricing_engine.generation = 1
+    pricing_engine.loaded_at = float("inf")  # keep the synthetic rules; there is no database
+    shows = [
+        models.Showtime(id=i, price_per_seat=Decimal("10.00"), start_time=datetime(2030, 1, 1, i % 24))
+        for i in range(showtimes)
+    ]
+
+    started = time.perf_counter()
+    for showtime in shows:
+        pricing_engine.price_table(None, showtime, seat_map)
+    cold = (time.perf_counter() - started) / showtimes
+
+    def run(count):
+        timings = []
+        for _ in range(count):
+            seats = random.sample(seat_map.labels, 4)
+            started = time.perf_counter()
+            quote_seats(None, random.choice(shows), seat_map, seats, random.randrange(seat_map.total_seats))
+            timings.append(time.perf_counter() - started)
+        return timings
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        timings = sorted(t for batch in pool.map(run, [quotes // threads] * threads) for t in batch)
+    elapsed = time.perf_counter() - started
+
+    print(f"Price table build: {cold * 1e6:.1f} us per showtime ({seat_map.total_seats} seats, {len(pricing_engine.rules)} rules)")
+    print(f"Tables cached: {len(pricing_engine.tables)} of {showtimes} showtimes (pricing_max_tables={get_settings().pricing_max_tables})")
+    print(f"Quotes: {len(timings)} from {threads} threads in {elapsed:.2f}s, {len(timings) / elapsed:.0f}/s")
+    print(f"Latency: p50 {timings[len(timings) // 2] * 1e6:.1f} us, p99 {timings[int(len(timings) * 0.99)] * 1e6:.1f} us")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pricing engine")
+    parser.add_argument("command", choices=["bench"])
+    parser.add_argument("--showtimes", type=int, default=5000)
+    parser.add_argument("--threads", type=int, default=32)
+    parser.add_argument("--quotes", type=int, default=200000)
+    args = parser.parse_args()
+    bench(args.showtimes, args.threads, args.quotes)
+
+
+if __name__ == "__main__":
+    main()
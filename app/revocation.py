@@ -0,0 +1,133 @@
+"""Revoked access tokens, checked without a database query per request.
+
+Revoked token ids (``jti``) are kept in the ``revoked_tokens`` table and
+mirrored into an in-process Bloom filter. A token missing from the filter
+is certainly not revoked, which is almost every request. Only a filter hit
+is confirmed against the table. Each process pulls new revocations every
+``revocation_sync_seconds``. It rebuilds the filter from the unexpired rows
+every ``revocation_rebuild_seconds``, because a Bloom filter can't forget.
+
+``python -m app.revocation bench`` measures the per-request cost of the check.
+"""
+import argparse
+import hashlib
+import math
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+from sqlalchemy.orm import Session
+from . import models
+from .config import get_settings
+
+
+class BloomFilter:
+    def __init__(self, capacity: int, error_rate: float):
+        self.size = max(8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, item: str):
+        # Double hashing: k positions from the two halves of one digest
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], "little")
+        second = int.from_bytes(digest[8:], "little") | 1
+        return [(first + i * second) % self.size for i in range(self.hashes)]
+
+    def add(self, item: str):
+        for position in self._positions(item):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, item: str) -> bool:
+        bits = self.bits
+        return all(bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+
+class RevocationList:
+    def __init__(self):
+        self.filter = self._new_filter()
+        self.synced_at = None
+        self.rebuilt_at = None
+        self.watermark = None  # revoked_at of the newest row pulled so far
+        self.lock = threading.Lock()
+
+    def _new_filter(self) -> BloomFilter:
+        settings = get_settings()
+        return BloomFilter(settings.revocation_filter_capacity, settings.revocation_filter_error_rate)
+
+    def add(self, jti: str):
+        # This process sees its own revocations at once; others on their next sync
+        self.filter.add(jti)
+
+    def sync(self, db: Session):
+        settings = get_settings()
+        now = time.monotonic()
+        if self.synced_at is not None and now - self.synced_at < settings.revocation_sync_seconds:
+            return
+        with self.lock:
+            if self.synced_at is not None and time.monotonic() - self.synced_at < settings.revocation_sync_seconds:
+                return
+            rebuild = (
+                self.rebuilt_at is None
+                or now - self.rebuilt_at >= settings.revocation_rebuild_seconds
+                or self.filter.count >= settings.revocation_filter_capacity
+            )
+            query = db.query(models.RevokedToken.jti, models.RevokedToken.revoked_at)
+            if rebuild:
+                query = query.filter(models.RevokedToken.expires_at > datetime.utcnow())
+            else:
+                # Overlap the last pull: a row can commit after newer ones
+                since = self.watermark - timedelta(seconds=2 * settings.revocation_sync_seconds)
+                query = query.filter(models.RevokedToken.revoked_at >= since)
+            rows = query.all()
+
+            bloom = self._new_filter() if rebuild else self.filter
+            for jti, _ in rows:
+                bloom.add(jti)
+            newest = max((revoked_at for _, revoked_at in rows), default=None)
+            if rebuild:
+                self.watermark = newest or datetime.utcnow()
+                self.filter = bloom
+                self.rebuilt_at = now
+            elif newest is not None:
+                self.watermark = max(self.watermark, newest)
+            self.synced_at = now
+
+    def is_revoked(self, db: Session, jti: str) -> bool:
+        self.sync(db)
+        if jti not in self.filter:
+            return False
+        return db.query(models.RevokedToken.jti).filter(models.RevokedToken.jti == jti).first() is not None
+
+
+revocation_list = RevocationList()
+
+
+def bench(revoked: int, checks: int):
+    bloom = BloomFilter(get_settings().revocation_filter_capacity, get_settings().revocation_filter_error_rate)
+    for _ in range(revoked):
+        bloom.add(uuid.uuid4().hex)
+    tokens = [uuid.uuid4().hex for _ in range(checks)]
+
+    started = time.perf_counter()
+    hits = sum(1 for jti in tokens if jti in bloom)
+    elapsed = time.perf_counter() - started
+
+    print(f"Filter: {len(bloom.bits) / 1024:.0f} KiB, {bloom.hashes} hashes, {revoked} revoked ids")
+    print(f"Check: {elapsed / checks * 1e6:.2f} us per request")
+    print(f"False positives (each costs one indexed lookup): {hits / checks:.4%}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Token revocation filter")
+    parser.add_argument("command", choices=["bench"])
+    parser.add_argument("--revoked", type=int, default=get_settings().revocation_filter_capacity)
+    parser.add_argument("--checks", type=int, default=100000)
+    args = parser.parse_args()
+    bench(args.revoked, args.checks)
+
+
+if __name__ == "__main__":
+    main()
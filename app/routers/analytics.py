@@ -0,0 +1,109 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from typing import List
+from datetime import datetime
+from .. import schemas, models
+from ..analytics import COUNTERS
+from ..database import get_db
+from ..dependencies import get_current_admin_user
+
+router = APIRouter(tags=["Analytics"])
+
+
+def _parse_date(value: str):
+    try:
+        return datetime.strptime(value, "%Y-%m-%d")
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD")
+
+
+def _filter(query, time_column, model, start_date, end_date, movie_id, theater_id):
+    if start_date:
+        query = query.filter(time_column >= _parse_date(start_date))
+    if end_date:
+        query = query.filter(time_column < _parse_date(end_date))
+    if movie_id:
+        query = query.filter(model.movie_id == movie_id)
+    if theater_id:
+        query = query.filter(model.theater_id == theater_id)
+    return query
+
+
+def _grouped(db: Session, group_column, start_date, end_date, movie_id, theater_id, skip, limit):
+    # Summing hourly buckets touches one row per movie, theater and hour,
+    # however many bookings they cover
+    model = models.HourlyRollup
+    query = db.query(
+        group_column.label("key"),
+        *[func.coalesce(func.sum(getattr(model, name)), 0).label(name) for name in COUNTERS]
+    )
+    query = _filter(query, model.hour, model, start_date, end_date, movie_id, theater_id)
+    rows = query.group_by(group_column).order_by(group_column).offset(skip).limit(limit).all()
+    return [row._asdict() for row in rows]
+
+# Admin endpoints
+@router.get("/showtimes", response_model=List[schemas.ShowtimeStats])
+def get_showtime_stats(
+    start_date: str = None,
+    end_date: str = None,
+    movie_id: int = None,
+    theater_id: int = None,
+    skip: int = 0,
+    limit: int = 100,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_admin_user)
+):
+    model = models.ShowtimeRollup
+    query = _filter(db.query(model), model.start_time, model, start_date, end_date, movie_id, theater_id)
+    return query.order_by(model.start_time).offset(skip).limit(limit).all()
+
+@router.get("/showtimes/{showtime_id}", response_model=schemas.ShowtimeStats)
+def get_single_showtime_stats(
+    showtime_id: int,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_admin_user)
+):
+    rollup = db.get(models.ShowtimeRollup, showtime_id)
+    if not rollup:
+        raise HTTPException(status_code=404, detail="No analytics for this showtime")
+    return rollup
+
+@router.get("/movies", response_model=List[schemas.GroupStats])
+def get_movie_stats(
+    start_date: str = None,
+    end_date: str = None,
+    theater_id: int = None,
+    skip: int = 0,
+    limit: int = 100,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_admin_user)
+):
+    return _grouped(db, models.HourlyRollup.movie_id, start_date, end_date, None, theater_id, skip, limit)
+
+@router.get("/theaters", response_model=List[schemas.GroupStats])
+def get_theater_stats(
+    start_date: str = None,
+    end_date: str = None,
+    movie_id: int = None,
+    skip: int = 0,
+    limit: int = 100,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_admin_user)
+):
+    return _grouped(db, models.HourlyRollup.theater_id, start_date, end_date, movie_id, None, skip, limit)
+
+@router.get("/hourly", response_model=List[schemas.HourlyStats])
+def get_hourly_stats(
+    start_date: str = None,
+    end_date: str = None,
+    movie_id: int = None,
+    theater_id: int = None,
+    skip: int = 0,
+    limit: int = 100,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_admin_user)
+):
+    model = models.HourlyRollup
+    query = _filter(db.query(model), model.hour, model, start_date, end_date, movie_id, theater_id)
+    return query.order_by(model.hour).offset(skip).limit(limit).all()
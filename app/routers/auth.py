@@ -1,11 +1,16 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
-from datetime import timedelta
+from datetime import datetime
+import jwt
 from .. import schemas, models
 from ..database import get_db
-from ..auth import verify_password, get_password_hash, create_access_token, ACCESS_TOKEN_EXPIRE_MINUTES
-from ..dependencies import get_current_active_user 
+from ..auth import (
+    verify_password, get_password_hash, decode_token, issue_tokens, revoke_access_token, revoke_user_tokens
+)
+from ..dependencies import (
+    credentials_exception, get_current_active_user, get_current_admin_user, get_token_payload
+)
 
 router = APIRouter(tags=["Authentication"])
 
@@ -42,11 +47,99 @@ def login_for_access_token(
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-    access_token = create_access_token(
-        data={"sub": user.email}, expires_delta=access_token_expires
+    tokens = issue_tokens(db, user)
+    db.commit()
+    return tokens
+
+@router.post("/refresh", response_model=schemas.Token)
+def refresh_access_token(request: schemas.RefreshRequest, db: Session = Depends(get_db)):
+    """Trade a refresh token for a new access token and refresh token; each refresh token works once."""
+    try:
+        payload = decode_token(request.refresh_token, "refresh")
+    except jwt.InvalidTokenError:
+        raise credentials_exception()
+
+    stored = db.query(models.RefreshToken).filter(
+        models.RefreshToken.jti == payload["jti"]
+    ).with_for_update().first()
+    if stored is None or stored.expires_at <= datetime.utcnow():
+        raise credentials_exception()
+    if stored.revoked:
+        # A used refresh token presented again was probably stolen: end every session
+        revoke_user_tokens(db, stored.user)
+        db.commit()
+        raise credentials_exception()
+    if payload.get("gen") != stored.user.token_generation:
+        raise credentials_exception()
+
+    stored.revoked = True
+    tokens = issue_tokens(db, stored.user)
+    db.commit()
+    return tokens
+
+@router.post("/logout", status_code=status.HTTP_204_NO_CONTENT)
+def logout(
+    request: schemas.LogoutRequest = None,
+    db: Session = Depends(get_db),
+    payload: dict = Depends(get_token_payload)
+):
+    """Revoke the access token used for this call and, if given, its refresh token."""
+    revoke_access_token(db, payload)
+    if request and request.refresh_token:
+        try:
+            refresh = decode_token(request.refresh_token, "refresh")
+        except jwt.InvalidTokenError:
+            refresh = None
+        if refresh and refresh["sub"] == payload["sub"]:
+            db.query(models.RefreshToken).filter(
+                models.RefreshToken.jti == refresh["jti"]
+            ).update({"revoked": True}, synchronize_session=False)
+    db.commit()
+
+@router.post("/logout-all", status_code=status.HTTP_204_NO_CONTENT)
+def logout_everywhere(
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_active_user)
+):
+    revoke_user_tokens(db, current_user)
+    db.commit()
+
+# Admin endpoints
+@router.post("/gate-accounts", response_model=schemas.User)
+def create_gate_account(
+    account: schemas.UserCreate,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_admin_user)
+):
+    """Create a login for a scanner device; it can only use the gate endpoints."""
+    if db.query(models.User).filter(models.User.email == account.email).first():
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Email already registered"
+        )
+    gate = models.User(
+        name=account.name,
+        email=account.email,
+        password_hash=get_password_hash(account.password),
+        role=models.UserRole.GATE
     )
-    return {"access_token": access_token, "token_type": "bearer"}
+    db.add(gate)
+    db.commit()
+    db.refresh(gate)
+    return gate
+
+@router.post("/users/{user_id}/revoke-tokens", status_code=status.HTTP_204_NO_CONTENT)
+def revoke_tokens_for_user(
+    user_id: int,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_admin_user)
+):
+    user = db.query(models.User).filter(models.User.id == user_id).first()
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+    revoke_user_tokens(db, user)
+    db.commit()
+
 @router.get("/me", response_model=schemas.User)
 async def read_users_me(current_user: models.User = Depends(get_current_active_user)):
     return current_user
\ No newline at end of file
@@ -5,6 +5,10 @@ import json
 from .. import schemas, models
 from ..database import get_db
 from ..dependencies import get_current_active_user
+from ..seating import bump_seat_version, get_booked_seats, hold_seats, parse_seats, record_seat_changes
+from ..seat_map import get_seat_map
+from ..analytics import record_cancellation
+from ..tickets import revoke_ticket
 
 router = APIRouter(prefix="/bookings", tags=["Bookings"])
 
@@ -15,10 +19,17 @@ def get_user_bookings(
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_active_user)
 ):
-    bookings = db.query(models.Booking).filter(
-        models.Booking.user_id == current_user.id
-    ).offset(skip).limit(limit).all()
-    return bookings
+    # Current bookings first, then archived ones from past shows
+    hot = db.query(models.Booking).filter(models.Booking.user_id == current_user.id)
+    bookings = hot.order_by(models.Booking.id).offset(skip).limit(limit).all()
+    if len(bookings) == limit:
+        return bookings
+    
+    hot_count = skip + len(bookings) if bookings else hot.count()
+    archived = db.query(models.ArchivedBooking).filter(
+        models.ArchivedBooking.user_id == current_user.id
+    ).order_by(models.ArchivedBooking.id).offset(max(skip - hot_count, 0)).limit(limit - len(bookings)).all()
+    return bookings + archived
 
 @router.get("/{booking_id}", response_model=schemas.BookingWithDetails)
 def get_booking(
@@ -31,6 +42,12 @@ def get_booking(
         models.Booking.user_id == current_user.id
     ).first()
     
+    if not booking:
+        booking = db.query(models.ArchivedBooking).filter(
+            models.ArchivedBooking.id == booking_id,
+            models.ArchivedBooking.user_id == current_user.id
+        ).first()
+    
     if not booking:
         raise HTTPException(status_code=404, detail="Booking not found")
     
@@ -49,20 +66,18 @@ def create_booking(
     
     # Parse requested seats
     try:
-        requested_seats = json.loads(booking.seats_booked)
-        if not isinstance(requested_seats, list) or not requested_seats:
-            raise ValueError("Seats must be a non-empty list")
+        requested_seats = parse_seats(booking.seats_booked)
     except (json.JSONDecodeError, ValueError) as e:
         raise HTTPException(status_code=400, detail=f"Invalid seats format: {str(e)}")
     
-    # Get all booked seats for this showtime
-    booked_seats = []
-    for existing_booking in showtime.bookings:
-        if existing_booking.status != models.BookingStatus.CANCELLED:
-            try:
-                booked_seats.extend(json.loads(existing_booking.seats_booked))
-            except json.JSONDecodeError:
-                continue
+    seat_map = get_seat_map(showtime.screen)
+    for seat in requested_seats:
+        if seat not in seat_map.index:
+            raise HTTPException(status_code=400, detail=f"Seat {seat} does not exist")
+    
+    # Lock the showtime row, then get all booked seats for this showtime
+    seat_version = bump_seat_version(db, showtime.id)
+    booked_seats = set(get_booked_seats(db, showtime.id))
     
     # Check if all requested seats are available
     for seat in requested_seats:
@@ -72,19 +87,10 @@ def create_booking(
                 detail=f"Seat {seat} is not available"
             )
     
-    # Calculate total price
-    total_price = len(requested_seats) * showtime.price_per_seat
-    
     # Create booking
-    db_booking = models.Booking(
-        user_id=current_user.id,
-        showtime_id=booking.showtime_id,
-        seats_booked=booking.seats_booked,
-        total_price=total_price,
-        status=models.BookingStatus.PENDING
+    db_booking = hold_seats(
+        db, showtime, seat_map, current_user.id, requested_seats, seat_version, len(booked_seats)
     )
-    
-    db.add(db_booking)
     db.commit()
     db.refresh(db_booking)
     
@@ -104,15 +110,27 @@ def cancel_booking(
     if not booking:
         raise HTTPException(status_code=404, detail="Booking not found")
     
+    # Take the showtime lock before touching any rollup row, in the same
+    # order as the booking paths, then re-read the booking under it
+    seat_version = bump_seat_version(db, booking.showtime_id)
+    db.refresh(booking)
     if booking.status == models.BookingStatus.CANCELLED:
         raise HTTPException(status_code=400, detail="Booking is already cancelled")
     
     # Check if payment was made and handle refund logic if needed
+    refunded_amount = None
     if booking.payment and booking.payment.payment_status == models.PaymentStatus.SUCCESS:
         # In a real application, you would integrate with a payment gateway for refunds
         booking.payment.payment_status = models.PaymentStatus.PENDING  # Mark for refund
+        refunded_amount = booking.payment.amount
     
+    record_cancellation(db, booking, refunded_amount)
+    revoke_ticket(booking)
     booking.status = models.BookingStatus.CANCELLED
+    try:
+        record_seat_changes(db, booking.showtime_id, seat_version, json.loads(booking.seats_booked), booked=False)
+    except json.JSONDecodeError:
+        pass
     db.commit()
     
     return {"message": "Booking cancelled successfully"}
\ No newline at end of file
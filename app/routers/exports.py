@@ -0,0 +1,163 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy import or_, select
+from sqlalchemy.orm import Session
+from datetime import datetime
+from decimal import Decimal
+import csv
+import enum
+import heapq
+import io
+import json
+from .. import models
+from ..database import get_db
+from ..dependencies import get_current_admin_user
+
+router = APIRouter(tags=["Exports"])
+
+EXPORT_BATCH_SIZE = 2000
+
+MEDIA_TYPES = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+}
+
+
+def _booking_rows(booking, showtime):
+    return select(
+        booking.id.label("booking_id"),
+        booking.created_at,
+        booking.user_id,
+        booking.showtime_id,
+        models.Screen.theater_id,
+        showtime.start_time,
+        booking.seats_booked,
+        booking.total_price,
+        booking.status,
+    ).select_from(booking).join(showtime, showtime.id == booking.showtime_id).join(
+        models.Screen, models.Screen.id == showtime.screen_id
+    )
+
+
+def _payment_rows(payment, booking, showtime):
+    return select(
+        payment.id.label("payment_id"),
+        payment.created_at,
+        payment.booking_id,
+        booking.user_id,
+        booking.showtime_id,
+        models.Screen.theater_id,
+        payment.amount,
+        payment.payment_status,
+    ).select_from(payment).join(booking, booking.id == payment.booking_id).join(
+        showtime, showtime.id == booking.showtime_id
+    ).join(models.Screen, models.Screen.id == showtime.screen_id)
+
+
+def _plain(value):
+    if isinstance(value, enum.Enum):
+        return value.value
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    return value
+
+
+def _pages(statement, db: Session):
+    # Keyset pagination in (created_at, id) order: each page is a short query
+    # that starts from the created_at index where the last one stopped, so no
+    # sort or cursor outlives a page. Runs on the request's own session, which
+    # FastAPI closes only after the response is sent.
+    columns = statement.selected_columns
+    created_at, key = columns.created_at, columns[0]
+    statement = statement.order_by(created_at, key).limit(EXPORT_BATCH_SIZE)
+    page = db.execute(statement).all()
+    while page:
+        yield from page
+        if len(page) < EXPORT_BATCH_SIZE:
+            return
+        last = page[-1]
+        page = db.execute(statement.where(
+            created_at >= last.created_at,
+            or_(created_at > last.created_at, key > last[0])
+        )).all()
+
+
+def _stream(rows, names, export_format):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if export_format == "csv":
+        writer.writerow(names)
+    for count, row in enumerate(rows, 1):
+        values = [_plain(value) for value in row]
+        if export_format == "csv":
+            writer.writerow(values)
+        else:
+            buffer.write(json.dumps(dict(zip(names, values))))
+            buffer.write("\n")
+        if count % EXPORT_BATCH_SIZE == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def _export(name, statements, export_format, start_date, end_date, theater_id, db):
+    # One statement for the hot tables and one for the archive (see app.archive),
+    # each read in created_at order and merged, rather than sorting their union
+    if export_format not in MEDIA_TYPES:
+        raise HTTPException(status_code=400, detail="Invalid format. Use csv or ndjson")
+    parts = []
+    for statement in statements:
+        columns = statement.selected_columns
+        try:
+            if start_date:
+                statement = statement.where(columns.created_at >= datetime.strptime(start_date, "%Y-%m-%d"))
+            if end_date:
+                statement = statement.where(columns.created_at < datetime.strptime(end_date, "%Y-%m-%d"))
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD")
+        if theater_id:
+            statement = statement.where(columns.theater_id == theater_id)
+        parts.append(statement)
+
+    rows = heapq.merge(*(_pages(part, db) for part in parts), key=lambda row: (row.created_at, row[0]))
+    filename = f"{name}-{start_date or 'all'}-{end_date or 'all'}.{export_format}"
+    return StreamingResponse(
+        _stream(rows, list(parts[0].selected_columns.keys()), export_format),
+        media_type=MEDIA_TYPES[export_format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+# Admin endpoints
+@router.get("/bookings")
+def export_bookings(
+    export_format: str = Query("csv", alias="format"),
+    start_date: str = None,
+    end_date: str = None,
+    theater_id: int = None,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_admin_user)
+):
+    statements = [
+        _booking_rows(models.Booking, models.Showtime),
+        _booking_rows(models.ArchivedBooking, models.ArchivedShowtime),
+    ]
+    return _export("bookings", statements, export_format, start_date, end_date, theater_id, db)
+
+@router.get("/payments")
+def export_payments(
+    export_format: str = Query("csv", alias="format"),
+    start_date: str = None,
+    end_date: str = None,
+    theater_id: int = None,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_admin_user)
+):
+    statements = [
+        _payment_rows(models.Payment, models.Booking, models.Showtime),
+        _payment_rows(models.ArchivedPayment, models.ArchivedBooking, models.ArchivedShowtime),
+    ]
+    return _export("payments", statements, export_format, start_date, end_date, theater_id, db)
@@ -0,0 +1,33 @@
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from sqlalchemy.orm import Session
+from datetime import datetime
+from .. import schemas
+from ..caching import CACHE_CONTROL, etag_matches, not_modified
+from ..database import get_db
+from ..feed import now_showing
+from ..sharding import session_chain
+
+router = APIRouter(tags=["Feed"])
+
+# Public endpoints
+@router.get("/now-showing", response_model=schemas.NowShowing)
+def get_now_showing(
+    request: Request,
+    city: str,
+    date: str = None,
+    db: Session = Depends(get_db)
+):
+    """Movies showing in ``city`` on ``date`` (default today), with upcoming showtimes by theater."""
+    try:
+        day = datetime.strptime(date, "%Y-%m-%d").date() if date else datetime.utcnow().date()
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD")
+
+    snapshot = now_showing.get(db, session_chain(db), city, day)
+    if etag_matches(request, snapshot.etag):
+        return not_modified(snapshot.etag)
+    return Response(
+        content=snapshot.body,
+        media_type="application/json",
+        headers={"ETag": snapshot.etag, "Cache-Control": CACHE_CONTROL}
+    )
@@ -3,6 +3,7 @@ from sqlalchemy.orm import Session
 from typing import List
 from .. import schemas, models
 from ..database import get_db
+from ..feed import now_showing
 from ..dependencies import get_current_admin_user
 
 router = APIRouter(prefix="/movies", tags=["Movies"])
@@ -56,6 +57,7 @@ def update_movie(
         setattr(db_movie, key, value)
     
     db.commit()
+    now_showing.clear()
     db.refresh(db_movie)
     return db_movie
 
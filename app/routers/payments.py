@@ -3,6 +3,10 @@ from sqlalchemy.orm import Session
 from .. import schemas, models
 from ..database import get_db
 from ..dependencies import get_current_active_user
+from ..analytics import record_sale
+from ..jobs import enqueue
+from ..seating import bump_seat_version
+from ..tickets import issue_ticket
 
 router = APIRouter(prefix="/payments", tags=["Payments"])
 
@@ -69,9 +73,22 @@ def confirm_payment(
     if payment.booking.user_id != current_user.id:
         raise HTTPException(status_code=403, detail="Not authorized to access this payment")
     
+    # Take the showtime lock, as cancel_booking does, before reading the
+    # booking status: a concurrent cancel or confirm then waits for this one
+    bump_seat_version(db, payment.booking.showtime_id)
+    db.refresh(payment)
+    db.refresh(payment.booking)
+    if payment.booking.status == models.BookingStatus.CANCELLED:
+        raise HTTPException(status_code=400, detail="Cannot confirm payment for a cancelled booking")
+    
     # In a real application, you would verify the payment with your payment gateway
     # For demo purposes, we'll just mark it as successful
     
+    if payment.booking.status != models.BookingStatus.CONFIRMED:
+        record_sale(db, payment.booking, payment.amount)
+        issue_ticket(db, payment.booking)
+        enqueue(db, "send_booking_confirmation", {"booking_id": payment.booking_id, "chain": payment.booking.chain})
+    
     payment.payment_status = models.PaymentStatus.SUCCESS
     payment.booking.status = models.BookingStatus.CONFIRMED
     
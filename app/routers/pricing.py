@@ -0,0 +1,79 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from typing import List
+from .. import schemas, models
+from ..database import get_db
+from ..dependencies import get_current_admin_user
+from ..pricing import pricing_engine, quote_seats
+from ..seat_map import get_seat_map
+from ..seating import parse_seats
+
+router = APIRouter(tags=["Pricing"])
+
+# Public endpoints
+@router.post("/quote", response_model=schemas.Quote)
+def get_quote(quote: schemas.BookingCreate, db: Session = Depends(get_db)):
+    # Occupancy comes from the showtime's rollup in the same query, rather
+    # than from loading and parsing every booking
+    taken = func.coalesce(models.ShowtimeRollup.seats_held + models.ShowtimeRollup.seats_sold, 0)
+    row = db.query(models.Showtime, taken).outerjoin(
+        models.ShowtimeRollup, models.ShowtimeRollup.showtime_id == models.Showtime.id
+    ).filter(models.Showtime.id == quote.showtime_id).first()
+    if not row:
+        raise HTTPException(status_code=404, detail="Showtime not found")
+    showtime, booked_count = row
+    
+    try:
+        seats = parse_seats(quote.seats_booked)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid seats format: {str(e)}")
+    
+    seat_map = get_seat_map(showtime.screen)
+    for seat in seats:
+        if seat not in seat_map.index:
+            raise HTTPException(status_code=400, detail=f"Seat {seat} does not exist")
+    
+    tier, quoted = quote_seats(db, showtime, seat_map, seats, booked_count)
+    return {
+        "showtime_id": showtime.id,
+        "demand_tier": tier,
+        "seats": [{"seat": seat, "category": category, "price": price} for seat, category, price in quoted],
+        "total_price": sum(price for _, _, price in quoted)
+    }
+
+# Admin endpoints
+@router.get("/rules", response_model=List[schemas.PricingRule])
+def get_pricing_rules(
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_admin_user)
+):
+    return db.query(models.PricingRule).order_by(models.PricingRule.id).all()
+
+@router.post("/rules", response_model=schemas.PricingRule)
+def create_pricing_rule(
+    rule: schemas.PricingRuleCreate,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_admin_user)
+):
+    db_rule = models.PricingRule(**rule.dict())
+    db.add(db_rule)
+    db.commit()
+    db.refresh(db_rule)
+    pricing_engine.invalidate()
+    return db_rule
+
+@router.delete("/rules/{rule_id}")
+def delete_pricing_rule(
+    rule_id: int,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_admin_user)
+):
+    rule = db.query(models.PricingRule).filter(models.PricingRule.id == rule_id).first()
+    if not rule:
+        raise HTTPException(status_code=404, detail="Pricing rule not found")
+    
+    db.delete(rule)
+    db.commit()
+    pricing_engine.invalidate()
+    return {"message": "Pricing rule deleted successfully"}
@@ -0,0 +1,77 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy import func, select, union_all
+from sqlalchemy.orm import Session
+from typing import List
+from datetime import datetime
+from .. import schemas, models
+from ..database import get_db
+from ..dependencies import get_current_admin_user
+
+router = APIRouter(tags=["Reports"])
+
+REVENUE_DIMENSIONS = {
+    "showtime": lambda paid: paid.c.showtime_id,
+    "theater": lambda paid: paid.c.theater_id,
+    "day": lambda paid: func.date(paid.c.start_time),
+}
+
+
+def _paid(payment, booking, showtime):
+    """Successful payments with what they are grouped and filtered by."""
+    return select(
+        showtime.id.label("showtime_id"),
+        models.Screen.theater_id,
+        showtime.start_time,
+        payment.amount,
+    ).select_from(payment).join(booking, booking.id == payment.booking_id).join(
+        showtime, showtime.id == booking.showtime_id
+    ).join(models.Screen, models.Screen.id == showtime.screen_id).where(
+        payment.payment_status == models.PaymentStatus.SUCCESS
+    )
+
+# Admin endpoints
+@router.get("/revenue", response_model=List[schemas.RevenueRow])
+def get_revenue(
+    group_by: str = "day",
+    start_date: str = None,
+    end_date: str = None,
+    theater_id: int = None,
+    skip: int = 0,
+    limit: int = 100,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_admin_user)
+):
+    """Successful payment totals per showtime, theater or show day, summed by the database.
+
+    Archived showtimes (see app.archive) are counted along with the hot tables.
+    """
+    if group_by not in REVENUE_DIMENSIONS:
+        raise HTTPException(status_code=400, detail="Invalid group_by. Use showtime, theater or day")
+    
+    parts = []
+    for payment, booking, showtime in (
+        (models.Payment, models.Booking, models.Showtime),
+        (models.ArchivedPayment, models.ArchivedBooking, models.ArchivedShowtime),
+    ):
+        query = _paid(payment, booking, showtime)
+        try:
+            if start_date:
+                query = query.where(showtime.start_time >= datetime.strptime(start_date, "%Y-%m-%d"))
+            if end_date:
+                query = query.where(showtime.start_time < datetime.strptime(end_date, "%Y-%m-%d"))
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD")
+        if theater_id:
+            query = query.where(models.Screen.theater_id == theater_id)
+        parts.append(query)
+    
+    paid = union_all(*parts).subquery("paid")
+    dimension = REVENUE_DIMENSIONS[group_by](paid)
+    rows = db.execute(
+        select(dimension.label("key"), func.count(), func.coalesce(func.sum(paid.c.amount), 0))
+        .group_by(dimension).order_by(dimension).offset(skip).limit(limit)
+    ).all()
+    return [
+        {"key": str(key), "payments": payments, "revenue": revenue}
+        for key, payments, revenue in rows
+    ]
@@ -1,16 +1,27 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from sqlalchemy.orm import Session
 from typing import List
 from datetime import datetime
+import base64
 from .. import schemas, models
 from ..database import get_db
-from ..dependencies import get_current_admin_user
+from ..dependencies import get_current_active_user, get_current_admin_user
+from ..caching import CACHE_CONTROL, conditional_json, etag_matches, make_etag, not_modified
+from ..seating import (
+    bump_seat_version, encode_occupancy, get_booked_seats, get_seat_changes, hold_seats
+)
+from ..allocation import find_best_seats
+from ..seat_map import get_seat_map
+from ..analytics import record_showtime_change
 
 router = APIRouter(prefix="/showtimes", tags=["Showtimes"])
 
+SEAT_BITMAP_MEDIA_TYPE = "application/vnd.seatmap.bitmap"
+
 # Public endpoints
 @router.get("/", response_model=List[schemas.ShowtimeWithDetails])
 def get_showtimes(
+    request: Request,
     skip: int = 0, 
     limit: int = 100, 
     movie_id: int = None,
@@ -34,49 +45,136 @@ def get_showtimes(
             raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD")
     
     showtimes = query.offset(skip).limit(limit).all()
-    return showtimes
+    content = [schemas.ShowtimeWithDetails.model_validate(showtime) for showtime in showtimes]
+    return conditional_json(request, content)
 
 @router.get("/{showtime_id}", response_model=schemas.ShowtimeWithDetails)
-def get_showtime(showtime_id: int, db: Session = Depends(get_db)):
+def get_showtime(showtime_id: int, request: Request, db: Session = Depends(get_db)):
     showtime = db.query(models.Showtime).filter(models.Showtime.id == showtime_id).first()
     if not showtime:
         raise HTTPException(status_code=404, detail="Showtime not found")
-    return showtime
+    return conditional_json(request, schemas.ShowtimeWithDetails.model_validate(showtime))
 
 @router.get("/{showtime_id}/available-seats")
-def get_available_seats(showtime_id: int, db: Session = Depends(get_db)):
+def get_available_seats(
+    showtime_id: int,
+    request: Request,
+    seat_format: str = Query("json", alias="format"),
+    since: int = None,
+    db: Session = Depends(get_db)
+):
+    if seat_format not in ("json", "bitmap"):
+        raise HTTPException(status_code=400, detail="Invalid format. Use json or bitmap")
+    
     showtime = db.query(models.Showtime).filter(models.Showtime.id == showtime_id).first()
     if not showtime:
         raise HTTPException(status_code=404, detail="Showtime not found")
     
-    # Get all booked seats for this showtime
-    booked_seats = []
-    for booking in showtime.bookings:
-        if booking.status != models.BookingStatus.CANCELLED:
-            # Assuming seats_booked is a JSON string like '["A1", "A2", "B3"]'
-            import json
-            try:
-                booked_seats.extend(json.loads(booking.seats_booked))
-            except json.JSONDecodeError:
-                continue
-    
-    # Get all possible seats from screen layout
-    import json
-    try:
-        all_seats = json.loads(showtime.screen.seat_layout)
-    except json.JSONDecodeError:
-        all_seats = []
+    # Raw bitmap bodies are negotiated through the Accept header
+    if since is not None:
+        mode = "delta"
+    elif SEAT_BITMAP_MEDIA_TYPE in request.headers.get("accept", ""):
+        mode = "binary"
+    else:
+        mode = seat_format
+    
+    # Unchanged seat map: answer from the version counters alone
+    screen = showtime.screen
+    etag = make_etag(
+        showtime_id, showtime.seat_version, screen.layout_version, mode, since if since is not None else ""
+    )
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    
+    seat_map = get_seat_map(screen)
+    layout = seat_map.layout_id
+    
+    if mode == "delta":
+        booked_seats, released_seats = get_seat_changes(db, showtime_id, since)
+        return conditional_json(request, {
+            "showtime_id": showtime_id,
+            "version": showtime.seat_version,
+            "since": since,
+            "layout": layout,
+            "booked_seats": booked_seats,
+            "released_seats": released_seats
+        }, etag=etag)
+    
+    booked_seats = get_booked_seats(db, showtime_id)
     
     # Calculate available seats
-    available_seats = [seat for seat in all_seats if seat not in booked_seats]
+    booked_set = set(booked_seats)
+    available_seats = [seat for seat in seat_map.labels if seat not in booked_set]
+    
+    if mode == "json":
+        return conditional_json(request, {
+            "showtime_id": showtime_id,
+            "total_seats": seat_map.total_seats,
+            "booked_seats": booked_seats,
+            "available_seats": available_seats,
+            "available_count": len(available_seats)
+        }, etag=etag)
+    
+    occupancy = encode_occupancy(seat_map, booked_set)
+    if mode == "binary":
+        return Response(
+            content=occupancy,
+            media_type=SEAT_BITMAP_MEDIA_TYPE,
+            headers={
+                "ETag": etag,
+                "Cache-Control": CACHE_CONTROL,
+                "X-Seat-Version": str(showtime.seat_version),
+                "X-Seat-Layout": layout,
+                "X-Total-Seats": str(seat_map.total_seats)
+            }
+        )
     
-    return {
+    return conditional_json(request, {
         "showtime_id": showtime_id,
-        "total_seats": len(all_seats),
-        "booked_seats": booked_seats,
-        "available_seats": available_seats,
-        "available_count": len(available_seats)
+        "version": showtime.seat_version,
+        "layout": layout,
+        "total_seats": seat_map.total_seats,
+        "available_count": len(available_seats),
+        "occupancy": base64.b64encode(occupancy).decode()
+    }, etag=etag)
+
+@router.post("/{showtime_id}/best-available", response_model=schemas.Booking)
+def hold_best_available(
+    showtime_id: int,
+    seat_request: schemas.BestAvailableRequest,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_active_user)
+):
+    showtime = db.query(models.Showtime).filter(models.Showtime.id == showtime_id).first()
+    if not showtime:
+        raise HTTPException(status_code=404, detail="Showtime not found")
+    
+    seat_map = get_seat_map(showtime.screen)
+    if seat_request.category is not None and seat_request.category not in seat_map.multipliers:
+        raise HTTPException(status_code=400, detail=f"Unknown seat category {seat_request.category}")
+    
+    # Search and hold under the showtime lock so the chosen seats can't be taken meanwhile
+    seat_version = bump_seat_version(db, showtime_id)
+    booked = {
+        seat_map.index[seat] for seat in get_booked_seats(db, showtime_id) if seat in seat_map.index
     }
+    seat_indexes = find_best_seats(
+        seat_map,
+        booked,
+        seat_request.party_size,
+        together=seat_request.together,
+        prefer_center=seat_request.prefer_center,
+        category=seat_request.category,
+        accessible=seat_request.accessible
+    )
+    if seat_indexes is None:
+        raise HTTPException(status_code=409, detail="Not enough seats available for this request")
+    
+    seats = [seat_map.labels[index] for index in seat_indexes]
+    db_booking = hold_seats(db, showtime, seat_map, current_user.id, seats, seat_version, len(booked))
+    db.commit()
+    db.refresh(db_booking)
+    return db_booking
 
 # Admin endpoints
 @router.post("/", response_model=schemas.Showtime)
@@ -107,7 +205,7 @@ def create_showtime(
             detail="Another showtime is already scheduled for this screen at the same time"
         )
     
-    db_showtime = models.Showtime(**showtime.dict())
+    db_showtime = models.Showtime(**showtime.dict(), chain=screen.chain)
     db.add(db_showtime)
     db.commit()
     db.refresh(db_showtime)
@@ -124,9 +222,11 @@ def update_showtime(
     if not db_showtime:
         raise HTTPException(status_code=404, detail="Showtime not found")
     
+    # Lock the showtime before its rollups, in the same order as bookings do
+    bump_seat_version(db, showtime_id)
     for key, value in showtime.dict().items():
         setattr(db_showtime, key, value)
-    
+    record_showtime_change(db, db_showtime)
     db.commit()
     db.refresh(db_showtime)
     return db_showtime
@@ -3,7 +3,9 @@ from sqlalchemy.orm import Session
 from typing import List
 from .. import schemas, models
 from ..database import get_db
+from ..feed import now_showing
 from ..dependencies import get_current_admin_user
+from ..sharding import session_chain
 
 router = APIRouter(prefix="/theaters", tags=["Theaters"])
 
@@ -43,7 +45,7 @@ def create_theater(
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_admin_user)
 ):
-    db_theater = models.Theater(**theater.dict())
+    db_theater = models.Theater(**theater.dict(), chain=session_chain(db))
     db.add(db_theater)
     db.commit()
     db.refresh(db_theater)
@@ -73,12 +75,50 @@ def create_screen(
             detail=f"Screen number {screen.screen_number} already exists in this theater"
         )
     
-    db_screen = models.Screen(**screen.dict(), theater_id=theater_id)
+    db_screen = models.Screen(**screen.dict(exclude={"theater_id"}), theater_id=theater_id, chain=theater.chain)
     db.add(db_screen)
     db.commit()
     db.refresh(db_screen)
     return db_screen
 
+@router.put("/{theater_id}/screens/{screen_id}", response_model=schemas.Screen)
+def update_screen(
+    theater_id: int,
+    screen_id: int,
+    screen: schemas.ScreenCreate,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_admin_user)
+):
+    db_screen = db.query(models.Screen).filter(
+        models.Screen.id == screen_id,
+        models.Screen.theater_id == theater_id
+    ).first()
+    if not db_screen:
+        raise HTTPException(status_code=404, detail="Screen not found")
+    
+    existing_screen = db.query(models.Screen).filter(
+        models.Screen.theater_id == theater_id,
+        models.Screen.screen_number == screen.screen_number,
+        models.Screen.id != screen_id
+    ).first()
+    
+    if existing_screen:
+        raise HTTPException(
+            status_code=400, 
+            detail=f"Screen number {screen.screen_number} already exists in this theater"
+        )
+    
+    # A new layout version makes every worker recompile its cached seat map
+    if screen.seat_layout != db_screen.seat_layout:
+        db_screen.layout_version = models.Screen.layout_version + 1
+    db_screen.screen_number = screen.screen_number
+    db_screen.seat_layout = screen.seat_layout
+    
+    db.commit()
+    now_showing.clear()
+    db.refresh(db_screen)
+    return db_screen
+
 @router.put("/{theater_id}", response_model=schemas.Theater)
 def update_theater(
     theater_id: int,
@@ -94,6 +134,7 @@ def update_theater(
         setattr(db_theater, key, value)
     
     db.commit()
+    now_showing.clear()
     db.refresh(db_theater)
     return db_theater
 
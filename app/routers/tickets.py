@@ -0,0 +1,120 @@
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from sqlalchemy import case, update
+from sqlalchemy.orm import Session
+import base64
+from .. import schemas, models
+from ..caching import conditional_json
+from ..database import get_db
+from ..dependencies import get_current_active_user, get_current_gate_user
+from ..tickets import render_qr, showtime_public_key
+
+router = APIRouter(tags=["Tickets"])
+
+
+def _get_own_ticket(booking_id: int, db: Session, current_user: models.User):
+    ticket = db.query(models.Ticket).join(models.Ticket.booking).filter(
+        models.Ticket.booking_id == booking_id,
+        models.Booking.user_id == current_user.id
+    ).first()
+    if not ticket:
+        raise HTTPException(status_code=404, detail="Ticket not found")
+    return ticket
+
+@router.get("/{booking_id}", response_model=schemas.Ticket)
+def get_ticket(
+    booking_id: int,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_active_user)
+):
+    return _get_own_ticket(booking_id, db, current_user)
+
+@router.get("/{booking_id}/qr")
+def get_ticket_qr(
+    booking_id: int,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_active_user)
+):
+    ticket = _get_own_ticket(booking_id, db, current_user)
+    if ticket.revoked:
+        raise HTTPException(status_code=410, detail="Ticket has been revoked")
+    try:
+        image = render_qr(ticket.token)
+    except RuntimeError as e:
+        raise HTTPException(status_code=501, detail=str(e))
+    return Response(content=image, media_type="image/png", headers={"Cache-Control": "private, max-age=86400"})
+
+# Gate endpoints (gate accounts and admins)
+@router.get("/showtimes/{showtime_id}/bundle", response_model=schemas.GateBundle)
+def get_gate_bundle(
+    showtime_id: int,
+    request: Request,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_gate_user)
+):
+    showtime = db.query(models.Showtime).filter(models.Showtime.id == showtime_id).first()
+    if not showtime:
+        raise HTTPException(status_code=404, detail="Showtime not found")
+    
+    rows = db.query(models.Ticket.booking_id, models.Ticket.revoked, models.Ticket.checked_in_at).filter(
+        models.Ticket.showtime_id == showtime_id
+    ).all()
+    bundle = schemas.GateBundle(
+        showtime_id=showtime_id,
+        key=base64.urlsafe_b64encode(showtime_public_key(showtime_id)).decode(),
+        tickets_issued=len(rows),
+        revoked=[booking_id for booking_id, revoked, _ in rows if revoked],
+        checked_in=[booking_id for booking_id, _, checked_in_at in rows if checked_in_at is not None]
+    )
+    # Gates poll this; unchanged revocations and check-ins come back as 304
+    return conditional_json(request, bundle)
+
+@router.post("/showtimes/{showtime_id}/check-ins", response_model=schemas.CheckInResult)
+def sync_check_ins(
+    showtime_id: int,
+    batch: schemas.CheckInBatch,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_gate_user)
+):
+    # A ticket scanned more than once in the batch counts from its first scan
+    check_ins = sorted(batch.check_ins, key=lambda check_in: check_in.scanned_at)
+    first_scans = {}
+    for check_in in check_ins:
+        first_scans.setdefault(check_in.booking_id, check_in.scanned_at)
+    if not first_scans:
+        return {"accepted": [], "duplicates": [], "rejected": []}
+    
+    # Claim the tickets in one conditional UPDATE: two gates syncing the same
+    # ticket at once can't both accept it, and a ticket revoked meanwhile is
+    # never checked in
+    claimed = set(db.execute(
+        update(models.Ticket).where(
+            models.Ticket.showtime_id == showtime_id,
+            models.Ticket.booking_id.in_(first_scans),
+            models.Ticket.checked_in_at.is_(None),
+            models.Ticket.revoked.is_(False)
+        ).values(
+            checked_in_at=case(first_scans, value=models.Ticket.booking_id),
+            checked_in_gate=batch.gate
+        ).returning(models.Ticket.booking_id).execution_options(synchronize_session=False)
+    ).scalars())
+    valid = {
+        booking_id for (booking_id,) in db.query(models.Ticket.booking_id).filter(
+            models.Ticket.showtime_id == showtime_id,
+            models.Ticket.booking_id.in_(first_scans),
+            models.Ticket.revoked.is_(False)
+        )
+    }
+    
+    accepted, duplicates, rejected = [], [], []
+    for check_in in check_ins:
+        booking_id = check_in.booking_id
+        if booking_id not in valid:
+            rejected.append(booking_id)
+        elif booking_id in claimed:
+            accepted.append(booking_id)
+            claimed.discard(booking_id)  # later scans in the batch are duplicates
+        else:
+            duplicates.append(booking_id)
+    
+    db.commit()
+    return {"accepted": accepted, "duplicates": duplicates, "rejected": rejected}
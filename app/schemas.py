@@ -1,7 +1,16 @@
-from pydantic import BaseModel, EmailStr
+from pydantic import BaseModel, EmailStr, Field, PlainSerializer, computed_field, field_validator, model_validator
 from datetime import datetime
-from typing import List, Optional
-from .models import UserRole, BookingStatus, PaymentStatus
+from decimal import Decimal
+from typing import Annotated, Dict, List, Optional
+import json
+from .models import UserRole, BookingStatus, PaymentStatus, PricingRuleKind
+
+# Exact amount in major units; still rendered as a JSON number for existing clients
+Money = Annotated[
+    Decimal,
+    Field(max_digits=10, decimal_places=2),
+    PlainSerializer(float, return_type=float, when_used="json")
+]
 
 # Authentication schemas
 class UserBase(BaseModel):
@@ -20,8 +29,15 @@ class User(UserBase):
 
 class Token(BaseModel):
     access_token: str
+    refresh_token: Optional[str] = None
     token_type: str
 
+class RefreshRequest(BaseModel):
+    refresh_token: str
+
+class LogoutRequest(BaseModel):
+    refresh_token: Optional[str] = None
+
 class TokenData(BaseModel):
     email: Optional[str] = None
 
@@ -53,21 +69,72 @@ class TheaterCreate(TheaterBase):
 
 class Theater(TheaterBase):
     id: int
+    chain: str
 
     class Config:
         from_attributes = True
 
+# Seat layout schemas
+class LayoutSeat(BaseModel):
+    number: int
+    category: str = "standard"
+    accessible: bool = False
+
+class LayoutRow(BaseModel):
+    label: str
+    seats: List[Optional[LayoutSeat]]  # null marks an aisle gap
+
+class SeatLayout(BaseModel):
+    categories: Dict[str, float] = {"standard": 1.0}  # category -> price multiplier
+    rows: List[LayoutRow]
+
+    @model_validator(mode="after")
+    def check_layout(self):
+        if not self.rows:
+            raise ValueError("Layout must have at least one row")
+        for category, multiplier in self.categories.items():
+            if multiplier <= 0:
+                raise ValueError(f"Price multiplier for category {category} must be positive")
+
+        row_labels = set()
+        seat_labels = set()
+        for row in self.rows:
+            if not row.label or row.label in row_labels:
+                raise ValueError(f"Row label {row.label!r} is empty or duplicated")
+            row_labels.add(row.label)
+            seats = [seat for seat in row.seats if seat is not None]
+            if not seats:
+                raise ValueError(f"Row {row.label} has no seats")
+            for seat in seats:
+                label = f"{row.label}{seat.number}"
+                if label in seat_labels:
+                    raise ValueError(f"Seat {label} is duplicated")
+                if seat.category not in self.categories:
+                    raise ValueError(f"Seat {label} uses unknown category {seat.category}")
+                seat_labels.add(label)
+        return self
+
 # Screen schemas
 class ScreenBase(BaseModel):
     theater_id: int
     screen_number: int
-    seat_layout: str
+    seat_layout: str  # JSON SeatLayout, or a legacy flat list of seat labels
 
 class ScreenCreate(ScreenBase):
-    pass
+    @field_validator("seat_layout")
+    @classmethod
+    def validate_seat_layout(cls, value):
+        data = json.loads(value)
+        if isinstance(data, list):
+            if not data or not all(isinstance(seat, str) for seat in data) or len(set(data)) != len(data):
+                raise ValueError("Seat list must be a non-empty list of unique seat labels")
+        else:
+            SeatLayout.model_validate(data)
+        return value
 
 class Screen(ScreenBase):
     id: int
+    layout_version: int
 
     class Config:
         from_attributes = True
@@ -77,7 +144,7 @@ class ShowtimeBase(BaseModel):
     movie_id: int
     screen_id: int
     start_time: datetime
-    price_per_seat: float
+    price_per_seat: Money
 
 class ShowtimeCreate(ShowtimeBase):
     pass
@@ -97,6 +164,14 @@ class ShowtimeWithDetails(Showtime):
     class Config:
         from_attributes = True
 
+# Seat allocation schemas
+class BestAvailableRequest(BaseModel):
+    party_size: int = Field(gt=0, le=20)
+    together: bool = True
+    prefer_center: bool = True
+    category: Optional[str] = None
+    accessible: bool = False  # at least one accessible seat in the block
+
 # Booking schemas
 class BookingBase(BaseModel):
     showtime_id: int
@@ -108,7 +183,7 @@ class BookingCreate(BookingBase):
 class Booking(BookingBase):
     id: int
     user_id: int
-    total_price: float
+    total_price: Money
     status: BookingStatus
 
     class Config:
@@ -125,7 +200,7 @@ class BookingWithDetails(Booking):
 # Payment schemas
 class PaymentBase(BaseModel):
     booking_id: int
-    amount: float
+    amount: Money
 
 class Payment(PaymentBase):
     id: int
@@ -139,4 +214,150 @@ class PaymentWithDetails(Payment):
     booking: Optional[Booking] = None
     
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+
+# Pricing schemas
+class PricingRuleBase(BaseModel):
+    name: str
+    kind: PricingRuleKind
+    category: Optional[str] = None
+    start_hour: Optional[int] = Field(default=None, ge=0, le=24)
+    end_hour: Optional[int] = Field(default=None, ge=0, le=24)
+    min_occupancy: Optional[float] = Field(default=None, ge=0, le=1)
+    multiplier: float = Field(gt=0)
+
+    @model_validator(mode="after")
+    def check_rule(self):
+        if self.kind == PricingRuleKind.TIME_OF_DAY and (self.start_hour is None or self.end_hour is None):
+            raise ValueError("Time of day rules need start_hour and end_hour")
+        if self.kind == PricingRuleKind.DEMAND and self.min_occupancy is None:
+            raise ValueError("Demand rules need min_occupancy")
+        return self
+
+class PricingRuleCreate(PricingRuleBase):
+    @model_validator(mode="after")
+    def check_hours(self):
+        # An empty window would never match; a whole day is 0 to 24
+        if self.start_hour is not None and self.start_hour == self.end_hour:
+            raise ValueError("start_hour and end_hour must differ")
+        return self
+
+class PricingRule(PricingRuleBase):
+    id: int
+
+    class Config:
+        from_attributes = True
+
+class SeatPrice(BaseModel):
+    seat: str
+    category: str
+    price: Money
+
+class Quote(BaseModel):
+    showtime_id: int
+    demand_tier: int
+    seats: List[SeatPrice]
+    total_price: Money
+
+
+# Report schemas
+class RevenueRow(BaseModel):
+    key: str
+    payments: int
+    revenue: Money
+
+
+# Analytics schemas
+class RollupStats(BaseModel):
+    capacity: int
+    seats_held: int
+    seats_sold: int
+    bookings_confirmed: int
+    bookings_cancelled: int
+    revenue: Money
+
+    @computed_field
+    @property
+    def occupancy(self) -> float:
+        return (self.seats_sold + self.seats_held) / self.capacity if self.capacity else 0.0
+
+    @computed_field
+    @property
+    def sell_through(self) -> float:
+        return self.seats_sold / self.capacity if self.capacity else 0.0
+
+class ShowtimeStats(RollupStats):
+    showtime_id: int
+    movie_id: int
+    theater_id: int
+    start_time: datetime
+
+    class Config:
+        from_attributes = True
+
+class HourlyStats(RollupStats):
+    hour: datetime
+    movie_id: int
+    theater_id: int
+
+    class Config:
+        from_attributes = True
+
+class GroupStats(RollupStats):
+    key: int
+
+
+# Ticket schemas
+class Ticket(BaseModel):
+    booking_id: int
+    showtime_id: int
+    token: str
+    issued_at: datetime
+    revoked: bool
+    checked_in_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+class GateBundle(BaseModel):
+    showtime_id: int
+    key: str  # base64url Ed25519 public key that verifies this showtime's tickets
+    tickets_issued: int
+    revoked: List[int]  # booking ids
+    checked_in: List[int]  # booking ids
+
+class CheckIn(BaseModel):
+    booking_id: int
+    scanned_at: datetime
+
+class CheckInBatch(BaseModel):
+    gate: str
+    check_ins: List[CheckIn]
+
+class CheckInResult(BaseModel):
+    accepted: List[int]
+    duplicates: List[int]  # already checked in, by this or another gate
+    rejected: List[int]  # unknown or revoked
+
+# Home screen feed schemas
+class FeedShowtime(BaseModel):
+    id: int
+    start_time: datetime
+    screen_number: int
+    price_per_seat: Money
+    seats_left: int
+
+class FeedTheater(BaseModel):
+    theater: Theater
+    showtimes: List[FeedShowtime]
+
+class FeedMovie(BaseModel):
+    movie: Movie
+    theaters: List[FeedTheater]
+
+class NowShowing(BaseModel):
+    city: str
+    date: str
+    version: str  # changes whenever anything in the feed does
+    movies: List[FeedMovie]
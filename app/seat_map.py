@@ -0,0 +1,105 @@
+import json
+import re
+import threading
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import FrozenSet, Mapping, Optional, Tuple
+from . import models, schemas
+
+LEGACY_LABEL = re.compile(r"^([A-Za-z]*)")
+
+
+@dataclass(frozen=True)
+class SeatMap:
+    """Compiled, immutable view of a screen layout. Seats are addressed by index."""
+    screen_id: int
+    layout_version: int
+    labels: Tuple[str, ...]                      # seat index -> label
+    index: Mapping[str, int]                     # label -> seat index
+    row_labels: Tuple[str, ...]
+    rows: Tuple[Tuple[Optional[int], ...], ...]  # seat indexes left to right, None for aisles
+    categories: Tuple[str, ...]                  # seat index -> category
+    multipliers: Mapping[str, float]             # category -> price multiplier
+    accessible: FrozenSet[int]
+
+    @property
+    def layout_id(self) -> str:
+        return f"{self.screen_id}.{self.layout_version}"
+
+    @property
+    def total_seats(self) -> int:
+        return len(self.labels)
+
+    def multiplier(self, seat_index: int) -> float:
+        return self.multipliers[self.categories[seat_index]]
+
+
+def compile_layout(screen_id: int, layout_version: int, seat_layout: str) -> SeatMap:
+    try:
+        data = json.loads(seat_layout)
+    except (json.JSONDecodeError, TypeError):
+        data = []
+
+    labels, categories, accessible = [], [], set()
+    row_labels, rows = [], []
+
+    if isinstance(data, list):
+        # Legacy flat list: group seats into rows by their letter prefix
+        multipliers = {"standard": 1.0}
+        row_positions = {}
+        for label in data:
+            row_label = LEGACY_LABEL.match(str(label)).group(1)
+            if row_label not in row_positions:
+                row_positions[row_label] = len(rows)
+                row_labels.append(row_label)
+                rows.append([])
+            rows[row_positions[row_label]].append(len(labels))
+            labels.append(str(label))
+            categories.append("standard")
+    else:
+        layout = schemas.SeatLayout.model_validate(data)
+        multipliers = dict(layout.categories)
+        for row in layout.rows:
+            row_labels.append(row.label)
+            positions = []
+            for seat in row.seats:
+                if seat is None:
+                    positions.append(None)
+                    continue
+                if seat.accessible:
+                    accessible.add(len(labels))
+                positions.append(len(labels))
+                labels.append(f"{row.label}{seat.number}")
+                categories.append(seat.category)
+            rows.append(positions)
+
+    return SeatMap(
+        screen_id=screen_id,
+        layout_version=layout_version,
+        labels=tuple(labels),
+        index=MappingProxyType({label: i for i, label in enumerate(labels)}),
+        row_labels=tuple(row_labels),
+        rows=tuple(tuple(row) for row in rows),
+        categories=tuple(categories),
+        multipliers=MappingProxyType(multipliers),
+        accessible=frozenset(accessible),
+    )
+
+
+# screen id -> most recently compiled seat map
+_seat_maps = {}
+_lock = threading.Lock()
+
+
+def get_seat_map(screen: models.Screen) -> SeatMap:
+    """Return the compiled seat map for ``screen``, compiling it at most once per layout version."""
+    seat_map = _seat_maps.get(screen.id)
+    if seat_map is not None and seat_map.layout_version == screen.layout_version:
+        return seat_map
+
+    seat_map = compile_layout(screen.id, screen.layout_version, screen.seat_layout)
+    with _lock:
+        current = _seat_maps.get(screen.id)
+        if current is None or current.layout_version <= seat_map.layout_version:
+            _seat_maps[screen.id] = seat_map
+    return seat_map
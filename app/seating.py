@@ -0,0 +1,183 @@
+"""Seat holds, the per-showtime seat version and the encodings of available seats.
+
+``python -m app.seating bench`` compares the payload size and server CPU of
+the JSON, bitmap and delta seat formats.
+"""
+import argparse
+import base64
+import gzip
+import json
+import random
+import time
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+from . import models
+from .seat_map import SeatMap, compile_layout
+from .pricing import quote_seats
+from .analytics import record_hold
+
+
+def bump_seat_version(db: Session, showtime_id: int) -> int:
+    """Increment the showtime's seat version and return the new value.
+
+    The UPDATE takes a row lock on the showtime, so concurrent bookings for
+    the same showtime are serialised until the surrounding transaction ends.
+    """
+    return db.execute(
+        update(models.Showtime)
+        .where(models.Showtime.id == showtime_id)
+        .values(seat_version=models.Showtime.seat_version + 1)
+        .returning(models.Showtime.seat_version)
+    ).scalar_one()
+
+
+def get_booked_seats(db: Session, showtime_id: int) -> list:
+    rows = db.query(models.Booking.seats_booked).filter(
+        models.Booking.showtime_id == showtime_id,
+        models.Booking.status != models.BookingStatus.CANCELLED
+    )
+
+    booked_seats = []
+    for (seats_booked,) in rows:
+        try:
+            booked_seats.extend(json.loads(seats_booked))
+        except json.JSONDecodeError:
+            continue
+    return booked_seats
+
+
+def record_seat_changes(db: Session, showtime_id: int, version: int, seats: list, booked: bool):
+    db.add_all([
+        models.SeatChange(showtime_id=showtime_id, version=version, seat=seat, booked=booked)
+        for seat in seats
+    ])
+
+
+def get_seat_changes(db: Session, showtime_id: int, since: int):
+    """Net seat changes after version ``since`` as (booked, released) label lists."""
+    rows = db.query(models.SeatChange.seat, models.SeatChange.booked).filter(
+        models.SeatChange.showtime_id == showtime_id,
+        models.SeatChange.version > since
+    ).order_by(models.SeatChange.version, models.SeatChange.id)
+
+    latest = {}
+    for seat, booked in rows:
+        latest[seat] = booked
+    booked_seats = [seat for seat, booked in latest.items() if booked]
+    released_seats = [seat for seat, booked in latest.items() if not booked]
+    return booked_seats, released_seats
+
+
+def encode_occupancy(seat_map: SeatMap, booked_seats) -> bytes:
+    """Pack occupancy into a bitmap, one bit per layout seat (MSB first, 1 = booked)."""
+    bitmap = bytearray((seat_map.total_seats + 7) // 8)
+    for seat in booked_seats:
+        index = seat_map.index.get(seat)
+        if index is not None:
+            bitmap[index >> 3] |= 0x80 >> (index & 7)
+    return bytes(bitmap)
+
+
+def parse_seats(seats_booked: str) -> list:
+    """Decode a JSON list of seat labels, raising ValueError when malformed."""
+    seats = json.loads(seats_booked)
+    if not isinstance(seats, list) or not seats:
+        raise ValueError("Seats must be a non-empty list")
+    if not all(isinstance(seat, str) for seat in seats) or len(set(seats)) != len(seats):
+        raise ValueError("Seats must be unique seat labels")
+    return seats
+
+
+def hold_seats(
+    db: Session,
+    showtime: models.Showtime,
+    seat_map: SeatMap,
+    user_id: int,
+    seats: list,
+    seat_version: int,
+    booked_count: int
+) -> models.Booking:
+    """Add a pending booking for ``seats``, priced at the current demand tier.
+
+    The caller must already hold the showtime lock (see ``bump_seat_version``)
+    and have checked the seats are free.
+    """
+    _, quoted = quote_seats(db, showtime, seat_map, seats, booked_count)
+    booking = models.Booking(
+        user_id=user_id,
+        showtime_id=showtime.id,
+        seats_booked=json.dumps(seats),
+        total_price=sum(price for _, _, price in quoted),
+        status=models.BookingStatus.PENDING,
+        chain=showtime.chain
+    )
+    db.add(booking)
+    record_seat_changes(db, showtime.id, seat_version, seats, booked=True)
+    record_hold(db, showtime, len(seats))
+    return booking
+
+
+def _render(content: dict) -> bytes:
+    return JSONResponse(content=jsonable_encoder(content)).body
+
+
+def bench(rows: int, seats_per_row: int, occupancy: float, changes: int, repeat: int):
+    row_labels = [chr(65 + row % 26) * (row // 26 + 1) for row in range(rows)]  # A..Z, AA..ZZ, ...
+    labels = [f"{row}{number}" for row in row_labels for number in range(1, seats_per_row + 1)]
+    seat_map = compile_layout(1, 1, json.dumps(labels))
+    booked = random.sample(labels, int(len(labels) * occupancy))
+    changed = random.sample(labels, changes)
+
+    # Each builds the body exactly as get_available_seats does for its mode
+    def as_json():
+        booked_set = set(booked)
+        available = [seat for seat in seat_map.labels if seat not in booked_set]
+        return _render({
+            "showtime_id": 1, "total_seats": seat_map.total_seats, "booked_seats": booked,
+            "available_seats": available, "available_count": len(available)
+        })
+
+    def as_bitmap():
+        booked_set = set(booked)
+        available_count = sum(1 for seat in seat_map.labels if seat not in booked_set)
+        return _render({
+            "showtime_id": 1, "version": 1, "layout": seat_map.layout_id, "total_seats": seat_map.total_seats,
+            "available_count": available_count, "occupancy": base64.b64encode(encode_occupancy(seat_map, booked_set)).decode()
+        })
+
+    def as_binary():
+        return encode_occupancy(seat_map, set(booked))
+
+    def as_delta():
+        return _render({
+            "showtime_id": 1, "version": 2, "since": 1, "layout": seat_map.layout_id,
+            "booked_seats": changed[::2], "released_seats": changed[1::2]
+        })
+
+    print(f"{seat_map.total_seats} seats, {len(booked)} booked, {changes} changed since the client's version")
+    print(f"{'format':<10}{'bytes':>8}{'gzipped':>10}{'CPU/response':>16}")
+    for name, render in (("json", as_json), ("bitmap", as_bitmap), ("binary", as_binary), ("delta", as_delta)):
+        body = render()
+        started = time.process_time()
+        for _ in range(repeat):
+            render()
+        cpu = (time.process_time() - started) / repeat
+        print(f"{name:<10}{len(body):>8}{len(gzip.compress(body)):>10}{cpu * 1e6:>13.1f} us")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Seat map encodings")
+    parser.add_argument("command", choices=["bench"])
+    parser.add_argument("--rows", type=int, default=20)
+    parser.add_argument("--seats-per-row", type=int, default=25)
+    parser.add_argument("--occupancy", type=float, default=0.5)
+    parser.add_argument("--changes", type=int, default=4)
+    parser.add_argument("--repeat", type=int, default=2000)
+    args = parser.parse_args()
+    bench(args.rows, args.seats_per_row, args.occupancy, args.changes, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
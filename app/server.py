@@ -0,0 +1,111 @@
+"""Production launcher: ``python -m app.server --port 8000``.
+
+Runs one uvicorn worker process per available CPU (or ``web_concurrency``),
+all serving one socket bound here. On SIGTERM or SIGINT the launcher passes
+SIGTERM on to every worker. Each worker first fails its readiness probe for
+``drain_seconds`` so the load balancer stops routing to it, then shuts down
+gracefully, finishing in-flight requests for up to
+``graceful_timeout_seconds``. A worker that dies on its own is replaced.
+"""
+import argparse
+import logging
+import multiprocessing
+import os
+import signal
+import threading
+import uvicorn
+from .config import get_settings
+from .lifecycle import state
+
+logger = logging.getLogger(__name__)
+
+
+def default_workers() -> int:
+    settings = get_settings()
+    if settings.web_concurrency:
+        return settings.web_concurrency
+    try:
+        return len(os.sched_getaffinity(0))  # respects container CPU pinning
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+class DrainingServer(uvicorn.Server):
+    def handle_exit(self, sig, frame):
+        settings = get_settings()
+        if state.draining or not settings.drain_seconds:
+            super().handle_exit(sig, frame)
+            return
+        state.draining = True
+        threading.Timer(settings.drain_seconds, super().handle_exit, args=(sig, frame)).start()
+
+
+def serve(config: uvicorn.Config, sockets: list):
+    # Runs in each worker process, so every worker drains on its own SIGTERM.
+    # Its own process group keeps a terminal's Ctrl-C from reaching it
+    # directly; the launcher passes every stop on exactly once.
+    os.setpgrp()
+    config.configure_logging()
+    DrainingServer(config).run(sockets=sockets)
+
+
+def supervise(config: uvicorn.Config, workers: int):
+    # Workers are spawned rather than forked so none inherits the parent's
+    # engine or caches; the bound socket is passed to them
+    multiprocessing.allow_connection_pickling()
+    spawn = multiprocessing.get_context("spawn")
+    sockets = [config.bind_socket()]
+    stopping = threading.Event()
+
+    def start():
+        process = spawn.Process(target=serve, args=(config, sockets))
+        process.start()
+        return process
+
+    def shutdown(*_):
+        if stopping.is_set():
+            return
+        stopping.set()
+        for process in processes:
+            if process.is_alive():
+                os.kill(process.pid, signal.SIGTERM)
+
+    processes = [start() for _ in range(workers)]
+    signal.signal(signal.SIGTERM, shutdown)
+    signal.signal(signal.SIGINT, shutdown)
+    while not stopping.wait(0.5):
+        for index, process in enumerate(processes):
+            if not process.is_alive() and not stopping.is_set():
+                logger.warning("Worker %s exited with %s; starting a new one", process.pid, process.exitcode)
+                processes[index] = start()
+    for process in processes:
+        process.join()
+    for sock in sockets:
+        sock.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the API")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=default_workers())
+    parser.add_argument("--app", default="app.main:create_app", help="application factory to serve")
+    args = parser.parse_args()
+
+    config = uvicorn.Config(
+        args.app,
+        factory=True,
+        host=args.host,
+        port=args.port,
+        lifespan="on",
+        proxy_headers=True,
+        timeout_graceful_shutdown=get_settings().graceful_timeout_seconds,
+    )
+    if args.workers == 1:
+        DrainingServer(config).run()
+        return
+    supervise(config, args.workers)
+
+
+if __name__ == "__main__":
+    main()
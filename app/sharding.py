@@ -0,0 +1,475 @@
+"""Route each cinema chain's data to its shard.
+
+A shard is a database URL from ``shard_urls``, and the ``default`` shard is
+the main database. The ``chain_shards`` table in the main database says
+which shard holds each chain. Every shard must also see the shared tables
+(users, movies, pricing rules, revoked tokens and jobs). Usually that means
+the shard is a schema of the main database reached through ``search_path``,
+for example ``postgresql://.../cinema?options=-csearch_path%3Dchain_a,public``.
+Create one with ``python -m app.sharding init <shard> --id-start N``. Row ids
+must not overlap between shards, so give each shard its own range. Only
+Postgres sequences can start at N: SQLite always continues from a table's
+largest id.
+
+A shard in a separate database instead gets copies of the shared reference
+tables (``SHARED_TABLES``) at init and on every move. Refresh them with
+``python -m app.sharding sync <shard>``. Jobs enqueued there only run on a
+worker pointed at that database.
+
+Requests name their chain in the ``X-Chain`` header. Once ``shard_urls`` is
+set, routes that read or write a chain's data refuse requests without it, and
+every chain must be in the shard map, so a missing or mistyped header can't
+silently read the default shard. Register a new chain with
+``python -m app.sharding add <chain> [shard]``. Chains listed in the shard map
+or in ``chain_session_limits`` get their own cap on concurrent sessions. One
+chain's on-sale spike then queues behind its own limit instead of taking
+every pooled connection.
+
+``python -m app.sharding move <chain> <shard>`` moves a chain while it keeps
+serving. It copies the chain's rows, then pauses the chain while the last
+changes are copied. Finally it points the chain at the new shard and
+deletes the rows from the old one.
+"""
+import argparse
+import threading
+import time
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import Optional
+from sqlalchemy import delete, inspect, not_, select, text, true, tuple_
+from sqlalchemy.engine import make_url
+from sqlalchemy.orm import Session, sessionmaker
+from . import models
+from .config import get_settings
+from .database import WRITE_OPTIONS, Base, build_engine, get_database_url, get_engine, get_sessionmaker, sessionLocal
+
+DEFAULT_SHARD = "default"
+
+
+def _bookings(chain):
+    return select(models.Booking.id).where(models.Booking.chain == chain)
+
+def _archived_showtimes(chain):
+    return select(models.ArchivedShowtime.id).where(models.ArchivedShowtime.screen_id.in_(
+        select(models.Screen.id).where(models.Screen.chain == chain)
+    ))
+
+def _archived_bookings(chain):
+    return select(models.ArchivedBooking.id).where(models.ArchivedBooking.chain == chain)
+
+
+# Tables holding a chain's data, parents before children, with the condition
+# selecting the chain's rows
+CHAIN_TABLES = (
+    (models.Theater, lambda chain: models.Theater.chain == chain),
+    (models.Screen, lambda chain: models.Screen.chain == chain),
+    (models.Showtime, lambda chain: models.Showtime.chain == chain),
+    (models.Booking, lambda chain: models.Booking.chain == chain),
+    (models.Payment, lambda chain: models.Payment.booking_id.in_(_bookings(chain))),
+    (models.Ticket, lambda chain: models.Ticket.chain == chain),
+    (models.SeatChange, lambda chain: models.SeatChange.showtime_id.in_(
+        select(models.Showtime.id).where(models.Showtime.chain == chain)
+    )),
+    (models.ShowtimeRollup, lambda chain: models.ShowtimeRollup.chain == chain),
+    (models.HourlyRollup, lambda chain: models.HourlyRollup.chain == chain),
+    (models.ArchivedShowtime, lambda chain: models.ArchivedShowtime.id.in_(_archived_showtimes(chain))),
+    (models.ArchivedBooking, lambda chain: models.ArchivedBooking.chain == chain),
+    (models.ArchivedPayment, lambda chain: models.ArchivedPayment.booking_id.in_(_archived_bookings(chain))),
+)
+
+# Shared tables that chain rows refer to or requests read through a chain's
+# session; copied to shards that are separate databases
+SHARED_TABLES = (models.User, models.Movie, models.PricingRule, models.RevokedToken)
+
+
+class ChainUnavailable(Exception):
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class RebalanceError(Exception):
+    pass
+
+
+class UnknownChain(Exception):
+    pass
+
+
+@lru_cache
+def get_shard_engine(shard: str):
+    if shard == DEFAULT_SHARD:
+        return get_engine()
+    settings = get_settings()
+    url = settings.shard_urls.get(shard)
+    if url is None:
+        raise LookupError(f"No URL configured for shard {shard}")
+    # Each shard has its own pool, so a busy shard can't exhaust the others
+    return build_engine(url, settings.shard_pool_size, settings.shard_max_overflow)
+
+
+@lru_cache
+def get_shard_sessionmaker(shard: str, write: bool = False):
+    if shard == DEFAULT_SHARD:
+        return get_sessionmaker(write)
+    engine = get_shard_engine(shard)
+    return sessionmaker(autocommit=False, autoflush=False, bind=engine.execution_options(**WRITE_OPTIONS) if write else engine)
+
+
+class ShardDirectory:
+    """Caches the chain -> (shard, moving) map from the main database.
+
+    The map is reloaded at most every ``shard_map_ttl_seconds``, which is also
+    how long a move waits for every process to notice a chain is paused.
+    """
+
+    def __init__(self):
+        self.entries = {}
+        self.loaded_at = None
+        self.lock = threading.Lock()
+
+    def invalidate(self):
+        self.loaded_at = None
+
+    def _fresh(self) -> bool:
+        return self.loaded_at is not None and time.monotonic() - self.loaded_at < get_settings().shard_map_ttl_seconds
+
+    def current(self) -> dict:
+        # Nothing to look up until a second shard is configured
+        if not get_settings().shard_urls:
+            return {}
+        if self._fresh():
+            return self.entries
+        with self.lock:
+            if not self._fresh():
+                db = sessionLocal()
+                try:
+                    rows = db.query(models.ChainShard.chain, models.ChainShard.shard, models.ChainShard.moving).all()
+                finally:
+                    db.close()
+                self.entries = {chain: (shard, moving) for chain, shard, moving in rows}
+                self.loaded_at = time.monotonic()
+        return self.entries
+
+
+directory = ShardDirectory()
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def _limiter(chain: str, entries: dict) -> threading.BoundedSemaphore:
+    # Chains nobody has configured share the default chain's slots, so an
+    # arbitrary X-Chain header can't mint new ones
+    settings = get_settings()
+    if chain not in entries and chain not in settings.chain_session_limits:
+        chain = models.DEFAULT_CHAIN
+    with _limiters_lock:
+        limiter = _limiters.get(chain)
+        if limiter is None:
+            limit = settings.chain_session_limits.get(chain, settings.chain_max_sessions)
+            limiter = _limiters[chain] = threading.BoundedSemaphore(limit)
+    return limiter
+
+
+def open_chain_session(chain: Optional[str], write: bool = False):
+    """Return a session on ``chain``'s shard and a callback that frees its slot.
+
+    ``write`` sessions take SQLite's write lock when they begin.
+
+    Raises ``ChainUnavailable`` while the chain is being moved or when it
+    already has ``chain_max_sessions`` sessions open, and ``UnknownChain`` for
+    a chain missing from the shard map once there is more than one shard.
+    """
+    chain = chain or models.DEFAULT_CHAIN
+    entries = directory.current()
+    if get_settings().shard_urls and chain not in entries and chain != models.DEFAULT_CHAIN:
+        raise UnknownChain(f"Unknown chain {chain}")
+    shard, moving = entries.get(chain, (DEFAULT_SHARD, False))
+    if moving:
+        raise ChainUnavailable(f"Chain {chain} is moving to another shard", retry_after=5)
+
+    settings = get_settings()
+    limiter = _limiter(chain, entries)
+    if not limiter.acquire(timeout=settings.chain_session_wait_seconds):
+        raise ChainUnavailable(f"Too many concurrent requests for chain {chain}", retry_after=1)
+    try:
+        db = get_shard_sessionmaker(shard, write)()
+    except Exception:
+        limiter.release()
+        raise
+    db.info["chain"] = chain
+    return db, limiter.release
+
+
+@contextmanager
+def chain_session(chain: Optional[str]):
+    db, release = open_chain_session(chain)
+    try:
+        yield db
+    finally:
+        db.close()
+        release()
+
+
+def session_chain(db: Session) -> str:
+    """The chain a session was opened for; new theaters are created in it."""
+    return db.info.get("chain", models.DEFAULT_CHAIN)
+
+
+def separate_database(shard: str) -> bool:
+    """Whether ``shard`` is its own database rather than a schema of the main one."""
+    if shard == DEFAULT_SHARD:
+        return False
+    main, url = make_url(get_database_url()), get_shard_engine(shard).url
+    return (main.get_backend_name(), main.host, main.port, main.database) != (
+        url.get_backend_name(), url.host, url.port, url.database
+    )
+
+
+def sync_shared(shard: str, batch_size: int = 1000) -> int:
+    """Copy the shared reference tables from the main database to ``shard``; returns rows written."""
+    if not separate_database(shard):
+        return 0
+    main = sessionLocal()
+    target = get_shard_sessionmaker(shard, write=True)()
+    try:
+        written = 0
+        for model in SHARED_TABLES:
+            _, count = _copy_table(main, target, model.__table__, true(), batch_size)
+            written += count
+        main.rollback()
+        return written
+    finally:
+        main.close()
+        target.close()
+
+
+def init_shard(shard: str, id_start: int = None):
+    """Create the chain tables on a shard, starting its ids at ``id_start``."""
+    tables = [model.__table__ for model, _ in CHAIN_TABLES]
+    engine = get_shard_engine(shard)
+    if id_start and engine.dialect.name != "postgresql":
+        raise RebalanceError(f"--id-start needs Postgres sequences; {engine.dialect.name} can't start ids at {id_start}")
+    if separate_database(shard):
+        # A separate database needs the shared tables as well, with the rows
+        # that the chain tables' foreign keys point at
+        Base.metadata.create_all(engine)
+        sync_shared(shard)
+    else:
+        with engine.begin() as connection:
+            # Create the tables in the schema first on the search_path; foreign
+            # keys to the shared tables resolve to the public schema
+            schema = connection.execute(text("SELECT current_schema()")).scalar()
+            existing = set(inspect(connection).get_table_names(schema=schema))
+            Base.metadata.create_all(connection, tables=[table for table in tables if table.name not in existing], checkfirst=False)
+    if id_start:
+        with engine.begin() as connection:
+            for table in tables:
+                if "id" in table.c and table.c.id.autoincrement is not False:
+                    connection.execute(
+                        text("SELECT setval(pg_get_serial_sequence(:table, 'id'), :start, false)"),
+                        {"table": table.name, "start": id_start}
+                    )
+
+
+def _key(primary_key, row) -> tuple:
+    return tuple(row[column.name] for column in primary_key)
+
+
+def _key_filter(primary_key, keys):
+    if len(primary_key) == 1:
+        return primary_key[0].in_([key[0] for key in keys])
+    return tuple_(*primary_key).in_(keys)
+
+
+def _upsert(db: Session, table, primary_key, rows):
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        raise RebalanceError(f"Upserts aren't supported on {dialect}")
+    statement = insert(table)
+    statement = statement.on_conflict_do_update(
+        index_elements=primary_key,
+        set_={column.name: statement.excluded[column.name] for column in table.columns if not column.primary_key}
+    )
+    db.execute(statement, rows)
+
+
+def _copy_table(source: Session, target: Session, table, condition, batch_size: int):
+    """Upsert the rows selected by ``condition`` that differ on the target.
+
+    Returns the keys seen on the source and how many rows were written.
+    """
+    primary_key = list(table.primary_key.columns)
+    seen = set()
+    written = 0
+    result = source.execute(
+        select(table).where(condition).order_by(*primary_key).execution_options(yield_per=batch_size)
+    )
+    for rows in result.mappings().partitions():
+        rows = [dict(row) for row in rows]
+        keys = [_key(primary_key, row) for row in rows]
+        seen.update(keys)
+        # Ids taken on the target by rows that aren't this chain's would be overwritten
+        foreign = target.execute(select(*primary_key).where(_key_filter(primary_key, keys), not_(condition)).limit(5)).all()
+        if foreign:
+            raise RebalanceError(
+                f"{table.name} keys {[tuple(row) for row in foreign]} are already used on the target shard"
+            )
+        existing = {
+            _key(primary_key, row): dict(row)
+            for row in target.execute(select(table).where(_key_filter(primary_key, keys))).mappings()
+        }
+        changed = [row for row, key in zip(rows, keys) if existing.get(key) != row]
+        if changed:
+            _upsert(target, table, primary_key, changed)
+            written += len(changed)
+        target.commit()
+    return seen, written
+
+
+def _copy_chain(source: Session, target: Session, chain: str, batch_size: int, prune: bool) -> int:
+    written = 0
+    seen = {}
+    for model, condition in CHAIN_TABLES:
+        table = model.__table__
+        seen[table], count = _copy_table(source, target, table, condition(chain), batch_size)
+        written += count
+    if prune:
+        # Rows deleted on the source since the first pass; children first
+        for model, condition in reversed(CHAIN_TABLES):
+            table = model.__table__
+            primary_key = list(table.primary_key.columns)
+            stale = [
+                tuple(row) for row in target.execute(select(*primary_key).where(condition(chain)))
+                if tuple(row) not in seen[table]
+            ]
+            for start in range(0, len(stale), batch_size):
+                target.execute(delete(table).where(_key_filter(primary_key, stale[start:start + batch_size])))
+            written += len(stale)
+        target.commit()
+    return written
+
+
+def _set_chain_shard(chain: str, **values) -> models.ChainShard:
+    # One short transaction per change, so the main database's write lock
+    # isn't held while rows are copied
+    db = sessionLocal(write=True)
+    try:
+        entry = db.get(models.ChainShard, chain)
+        if entry is None:
+            entry = models.ChainShard(chain=chain, shard=DEFAULT_SHARD, moving=False)
+            db.add(entry)
+        for name, value in values.items():
+            setattr(entry, name, value)
+        db.commit()
+        db.refresh(entry)
+        return entry
+    finally:
+        db.close()
+
+
+def add_chain(chain: str, shard: str = DEFAULT_SHARD):
+    """Put a new chain in the shard map so requests for it are accepted."""
+    get_shard_engine(shard)  # fails early for an unconfigured shard
+    db = sessionLocal()
+    try:
+        if db.get(models.ChainShard, chain) is not None:
+            raise RebalanceError(f"Chain {chain} is already in the shard map; use move")
+    finally:
+        db.close()
+    _set_chain_shard(chain, shard=shard)
+    directory.invalidate()
+
+
+def move_chain(chain: str, shard: str, batch_size: int, settle_seconds: float):
+    get_shard_engine(shard)  # fails early for an unconfigured shard
+    source_shard = _set_chain_shard(chain).shard
+    if source_shard == shard:
+        print(f"Chain {chain} is already on shard {shard}")
+        return
+
+    # Copies read the source in plain sessions: a writing one would take
+    # SQLite's write lock and stall the chain while it is still serving
+    source = get_shard_sessionmaker(source_shard)()
+    target = get_shard_sessionmaker(shard, write=True)()
+    try:
+        try:
+            sync_shared(shard, batch_size)
+            written = _copy_chain(source, target, chain, batch_size, prune=False)
+            source.rollback()
+            print(f"Copied {written} rows of chain {chain} to shard {shard} while serving")
+
+            _set_chain_shard(chain, moving=True)
+            # Wait until every process has reloaded the map and requests
+            # that started before the pause have finished
+            wait = get_settings().shard_map_ttl_seconds + settle_seconds
+            print(f"Paused chain {chain}; waiting {wait:.0f}s for in-flight requests")
+            time.sleep(wait)
+
+            sync_shared(shard, batch_size)
+            written = _copy_chain(source, target, chain, batch_size, prune=True)
+            source.rollback()
+            _set_chain_shard(chain, shard=shard, moving=False)
+            directory.invalidate()
+            print(f"Copied the last {written} changed rows and moved chain {chain} to shard {shard}")
+        except Exception:
+            _set_chain_shard(chain, moving=False)
+            raise
+    finally:
+        source.close()
+        target.close()
+
+    # Nothing routes to the old shard any more: drop its copy, children first
+    source = get_shard_sessionmaker(source_shard, write=True)()
+    try:
+        for model, condition in reversed(CHAIN_TABLES):
+            source.execute(delete(model.__table__).where(condition(chain)))
+        source.commit()
+    finally:
+        source.close()
+    print(f"Deleted chain {chain} from shard {source_shard}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Manage chain shards")
+    commands = parser.add_subparsers(dest="command", required=True)
+    init = commands.add_parser("init", help="create the chain tables on a shard")
+    init.add_argument("shard")
+    init.add_argument("--id-start", type=int, help="first id for rows created on the shard")
+    sync = commands.add_parser("sync", help="refresh the shared tables on a shard in a separate database")
+    sync.add_argument("shard")
+    add = commands.add_parser("add", help="put a new chain in the shard map")
+    add.add_argument("chain")
+    add.add_argument("shard", nargs="?", default=DEFAULT_SHARD)
+    move = commands.add_parser("move", help="move a chain to another shard while it keeps serving")
+    move.add_argument("chain")
+    move.add_argument("shard")
+    move.add_argument("--batch-size", type=int, default=1000)
+    move.add_argument("--settle-seconds", type=float, default=get_settings().graceful_timeout_seconds)
+    args = parser.parse_args()
+
+    if args.command == "init":
+        try:
+            init_shard(args.shard, args.id_start)
+        except RebalanceError as e:
+            parser.error(str(e))
+        print(f"Initialised shard {args.shard}")
+    elif args.command == "sync":
+        print(f"Copied {sync_shared(args.shard)} changed shared rows to shard {args.shard}")
+    elif args.command == "add":
+        try:
+            add_chain(args.chain, args.shard)
+        except RebalanceError as e:
+            parser.error(str(e))
+        print(f"Added chain {args.chain} on shard {args.shard}")
+    else:
+        move_chain(args.chain, args.shard, args.batch_size, args.settle_seconds)
+
+
+if __name__ == "__main__":
+    main()
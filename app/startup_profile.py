@@ -0,0 +1,104 @@
+"""Import-time profile and cold-start budget check.
+
+    python -m app.startup_profile --budget-ms 1500
+
+Builds the app in fresh interpreters and prints the slowest imports from
+``python -X importtime``. Building the app must not create the engine, so no
+database is needed. Exits non-zero when the median cold start is over
+budget; ``tests/test_startup.py`` enforces the same budget.
+
+Routers are imported by ``create_app``, not by importing ``app.main``. Most
+of a cold start is FastAPI, SQLAlchemy and Pydantic themselves; routers are
+a fifth of it, and a worker warms up before it reports ready anyway.
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
+# Enough configuration to build the app; real values in the environment win
+PLACEHOLDER_ENV = {
+    "DATABASE_HOSTNAME": "localhost",
+    "DATABASE_PORT": "5432",
+    "DATABASE_PASSWORD": "unused",
+    "DATABASE_NAME": "unused",
+    "DATABASE_USERNAME": "unused",
+    "SECRET_KEY": "startup-profile",
+    "ALGORITHM": "HS256",
+    "ACCESS_TOKEN_EXPIRE_MINUTES": "30",
+}
+
+# Median import + create_app, in milliseconds
+COLD_START_BUDGET_MS = 2000
+
+BUILD_APP = (
+    "import time; started = time.perf_counter(); "
+    "from app.main import create_app; create_app(); "
+    "elapsed = (time.perf_counter() - started) * 1000; "
+    "from app.database import get_engine; "
+    "assert not get_engine.cache_info().currsize, 'building the app created the engine'; "
+    "print(elapsed)"
+)
+
+
+def build_app_in_subprocess(importtime: bool = False, env: dict = None):
+    """Return (in-process build ms, whole-process ms, stderr) for one cold start."""
+    command = [sys.executable]
+    if importtime:
+        command += ["-X", "importtime"]
+    command += ["-c", BUILD_APP]
+    started = time.perf_counter()
+    result = subprocess.run(
+        command,
+        cwd=PROJECT_ROOT,
+        env={**PLACEHOLDER_ENV, **(os.environ if env is None else env)},
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        sys.exit(f"Building the app failed:\n{result.stderr}")
+    process_ms = (time.perf_counter() - started) * 1000
+    return float(result.stdout.strip().splitlines()[-1]), process_ms, result.stderr
+
+
+def slowest_imports(importtime_output: str, top: int):
+    # Lines look like: "import time:   self [us] |  cumulative | imported package"
+    imports = []
+    for line in importtime_output.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        imports.append((int(cumulative_us), int(self_us), name.rstrip()))
+    top_level = [entry for entry in imports if not entry[2].startswith("  ")]
+    return sorted(top_level, reverse=True)[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Profile application cold start")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, default=COLD_START_BUDGET_MS)
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+
+    runs = [build_app_in_subprocess() for _ in range(args.runs)]
+    build_ms = statistics.median(build for build, _, _ in runs)
+    process_ms = statistics.median(process for _, process, _ in runs)
+
+    _, _, importtime_output = build_app_in_subprocess(importtime=True)
+    print(f"{'cumulative ms':>14} {'self ms':>9}  module")
+    for cumulative_us, self_us, name in slowest_imports(importtime_output, args.top):
+        print(f"{cumulative_us / 1000:14.1f} {self_us / 1000:9.1f}  {name.strip()}")
+
+    print(f"\nimport + create_app: {build_ms:.0f} ms (median of {args.runs}), whole process: {process_ms:.0f} ms")
+    if build_ms > args.budget_ms:
+        print(f"Over the cold-start budget of {args.budget_ms:.0f} ms")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
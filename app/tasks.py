@@ -0,0 +1,46 @@
+import logging
+from datetime import datetime, timedelta
+from sqlalchemy.orm import Session
+from . import models
+from .jobs import task
+from .sharding import chain_session
+
+logger = logging.getLogger(__name__)
+
+# Recurring jobs every worker makes sure exist: name -> interval in seconds
+SCHEDULED = {
+    "cleanup_jobs": 24 * 60 * 60,
+    "cleanup_tokens": 60 * 60,
+}
+
+FINISHED_JOB_RETENTION = timedelta(days=7)
+
+
+@task("send_booking_confirmation")
+def send_booking_confirmation(db: Session, payload: dict):
+    # The booking lives on its chain's shard, not necessarily the worker's database
+    with chain_session(payload.get("chain")) as chain_db:
+        booking = chain_db.query(models.Booking).filter(models.Booking.id == payload["booking_id"]).first()
+        if not booking or booking.status != models.BookingStatus.CONFIRMED:
+            return
+        # Integrate with your email provider here in a real application
+        logger.info(
+            "Booking %s confirmed for %s: seats %s", booking.id, booking.user.email, booking.seats_booked
+        )
+
+
+@task("cleanup_jobs")
+def cleanup_jobs(db: Session, payload: dict):
+    cutoff = datetime.utcnow() - FINISHED_JOB_RETENTION
+    db.query(models.Job).filter(
+        models.Job.status == models.JobStatus.DONE,
+        models.Job.created_at < cutoff
+    ).delete(synchronize_session=False)
+
+
+@task("cleanup_tokens")
+def cleanup_tokens(db: Session, payload: dict):
+    # Expired tokens are rejected by their exp claim; their rows are no longer needed
+    now = datetime.utcnow()
+    db.query(models.RevokedToken).filter(models.RevokedToken.expires_at < now).delete(synchronize_session=False)
+    db.query(models.RefreshToken).filter(models.RefreshToken.expires_at < now).delete(synchronize_session=False)
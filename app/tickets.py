@@ -0,0 +1,159 @@
+"""Signed ticket tokens that gate devices can check offline.
+
+A token is ``base64url(payload) + "." + base64url(signature)`` where the payload
+packs the booking id, showtime id and seat labels, and the signature is Ed25519
+under a key pair derived for that one showtime. A gate downloads only the
+showtime's public key with its validation bundle, so it can verify any ticket
+for that show without calling the API, but neither a gate nor a leaked bundle
+can sign new tickets.
+
+Tickets signed by an older token version are re-signed with
+``python -m app.tickets reissue``.
+"""
+import argparse
+import base64
+import hashlib
+import hmac
+import io
+import json
+import struct
+from datetime import datetime
+from typing import Optional
+from sqlalchemy.orm import Session
+from . import models
+from .config import get_settings
+from .database import sessionLocal
+
+TOKEN_VERSION = 2
+HEADER = struct.Struct(">BII")  # version, booking id, showtime id
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode()
+
+
+def _b64decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+
+def showtime_signing_key(showtime_id: int):
+    """Return the showtime's ``Ed25519PrivateKey``."""
+    # cryptography is imported on first use so building the app stays cheap
+    from cryptography.hazmat.primitives.asymmetric.ed25519 import Ed25519PrivateKey
+    # Each showtime's private key is derived from the master key, never stored
+    settings = get_settings()
+    master = (settings.ticket_signing_key or settings.secret_key).encode()
+    seed = hmac.new(master, f"showtime:{showtime_id}".encode(), hashlib.sha256).digest()
+    return Ed25519PrivateKey.from_private_bytes(seed)
+
+
+def showtime_public_key(showtime_id: int) -> bytes:
+    from cryptography.hazmat.primitives.serialization import Encoding, PublicFormat
+    return showtime_signing_key(showtime_id).public_key().public_bytes(Encoding.Raw, PublicFormat.Raw)
+
+
+def sign_ticket(booking_id: int, showtime_id: int, seats: list) -> str:
+    payload = HEADER.pack(TOKEN_VERSION, booking_id, showtime_id) + ",".join(seats).encode()
+    signature = showtime_signing_key(showtime_id).sign(payload)
+    return f"{_b64encode(payload)}.{_b64encode(signature)}"
+
+
+def verify_ticket(token: str, public_key: bytes) -> Optional[dict]:
+    """Decode ``token`` if it is signed by the showtime that owns ``public_key``, else return None."""
+    from cryptography.exceptions import InvalidSignature
+    from cryptography.hazmat.primitives.asymmetric.ed25519 import Ed25519PublicKey
+    try:
+        encoded_payload, encoded_signature = token.split(".")
+        payload, signature = _b64decode(encoded_payload), _b64decode(encoded_signature)
+        version, booking_id, showtime_id = HEADER.unpack_from(payload)
+        if version != TOKEN_VERSION:
+            return None
+        Ed25519PublicKey.from_public_bytes(public_key).verify(signature, payload)
+    except (ValueError, struct.error, InvalidSignature):
+        return None
+    seats = payload[HEADER.size:].decode()
+    return {"booking_id": booking_id, "showtime_id": showtime_id, "seats": seats.split(",") if seats else []}
+
+
+def _seats(booking: models.Booking) -> list:
+    try:
+        return json.loads(booking.seats_booked)
+    except json.JSONDecodeError:
+        return []
+
+
+def issue_ticket(db: Session, booking: models.Booking) -> models.Ticket:
+    if booking.ticket is not None:
+        booking.ticket.revoked = False
+        return booking.ticket
+    ticket = models.Ticket(
+        booking_id=booking.id,
+        showtime_id=booking.showtime_id,
+        chain=booking.chain,
+        token=sign_ticket(booking.id, booking.showtime_id, _seats(booking)),
+        issued_at=datetime.utcnow(),
+        revoked=False
+    )
+    db.add(ticket)
+    return ticket
+
+
+def revoke_ticket(booking: models.Booking):
+    if booking.ticket is not None:
+        booking.ticket.revoked = True
+
+
+def render_qr(token: str) -> bytes:
+    """Render ``token`` as a PNG QR code. Needs the optional ``qrcode`` package."""
+    try:
+        import qrcode  # optional dependency, imported only when an image is requested
+    except ImportError:
+        raise RuntimeError("QR rendering requires the qrcode package")
+    image = qrcode.make(token, error_correction=qrcode.constants.ERROR_CORRECT_M)
+    buffer = io.BytesIO()
+    image.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def _token_version(token: str) -> Optional[int]:
+    try:
+        return HEADER.unpack_from(_b64decode(token.split(".")[0]))[0]
+    except (ValueError, struct.error):
+        return None
+
+
+def reissue(db: Session, batch_size: int) -> int:
+    """Re-sign unrevoked tickets for upcoming showtimes whose token is out of date."""
+    reissued = 0
+    last_id = 0
+    while True:
+        tickets = db.query(models.Ticket).join(models.Ticket.booking).join(models.Booking.showtime).filter(
+            models.Ticket.id > last_id,
+            models.Ticket.revoked.is_(False),
+            models.Showtime.start_time >= datetime.utcnow()
+        ).order_by(models.Ticket.id).limit(batch_size).all()
+        if not tickets:
+            return reissued
+        for ticket in tickets:
+            if _token_version(ticket.token) != TOKEN_VERSION:
+                ticket.token = sign_ticket(ticket.booking_id, ticket.showtime_id, _seats(ticket.booking))
+                reissued += 1
+        db.commit()
+        last_id = tickets[-1].id
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Signed tickets")
+    parser.add_argument("command", choices=["reissue"])
+    parser.add_argument("--batch-size", type=int, default=500)
+    args = parser.parse_args()
+
+    db = sessionLocal(write=True)
+    try:
+        print(f"Re-signed {reissue(db, args.batch_size)} tickets")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""Run background job workers: ``python -m app.worker --processes 4``.
+
+``python -m app.worker bench`` measures how many jobs per second a number of
+worker processes get through on one queue.
+"""
+import argparse
+import logging
+import multiprocessing
+import os
+import signal
+import socket
+import tempfile
+import time
+from datetime import datetime
+from sqlalchemy import insert
+from sqlalchemy.orm import sessionmaker
+from . import models, tasks
+from .database import WRITE_OPTIONS, Base, build_engine, sessionLocal
+from .jobs import claim_batch, release, run_job, schedule, task
+
+logger = logging.getLogger(__name__)
+
+
+def work(batch_size: int, poll_interval: float, stop):
+    worker_id = f"{socket.gethostname()}:{os.getpid()}"
+    # Let the parent decide when to stop; finish the current job first
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+
+    db = sessionLocal(write=True)
+    try:
+        for name, interval_seconds in tasks.SCHEDULED.items():
+            schedule(db, name, interval_seconds)
+
+        processed = 0
+        started = time.monotonic()
+        while not stop.is_set():
+            jobs = claim_batch(db, worker_id, batch_size)
+            if not jobs:
+                stop.wait(poll_interval)
+                continue
+            for index, job in enumerate(jobs):
+                if stop.is_set():
+                    # Don't sit on the rest of the batch until the lock times out
+                    release(db, worker_id, jobs[index:])
+                    break
+                run_job(db, job)
+                processed += 1
+        elapsed = time.monotonic() - started
+        logger.info("Worker %s processed %s jobs (%.1f jobs/s)", worker_id, processed, processed / elapsed if elapsed else 0)
+    finally:
+        db.close()
+
+
+@task("bench_noop")
+def bench_noop(db, payload: dict):
+    pass
+
+
+def _drain(url: str, batch_size: int, results):
+    engine = build_engine(url, pool_size=1, max_overflow=0)
+    db = sessionmaker(bind=engine.execution_options(**WRITE_OPTIONS))()
+    worker_id = f"bench:{os.getpid()}"
+    processed = 0
+    try:
+        while True:
+            jobs = claim_batch(db, worker_id, batch_size)
+            if not jobs:
+                break
+            for job in jobs:
+                run_job(db, job)
+            processed += len(jobs)
+    finally:
+        db.close()
+        engine.dispose()
+    results.put(processed)
+
+
+def bench(url: str, jobs: int, processes: int, batch_size: int):
+    with tempfile.TemporaryDirectory() as directory:
+        url = url or f"sqlite:///{os.path.join(directory, 'jobs.db')}"
+        engine = build_engine(url, pool_size=1, max_overflow=0)
+        Base.metadata.create_all(engine)
+        now = datetime.utcnow()
+        with engine.begin() as connection:
+            for start in range(0, jobs, 10000):
+                connection.execute(insert(models.Job), [
+                    {"name": "bench_noop", "payload": "{}", "status": models.JobStatus.QUEUED, "run_at": now}
+                    for _ in range(start, min(start + 10000, jobs))
+                ])
+        engine.dispose()
+
+        results = multiprocessing.Queue()
+        workers = [multiprocessing.Process(target=_drain, args=(url, batch_size, results)) for _ in range(processes)]
+        started = time.perf_counter()
+        for worker in workers:
+            worker.start()
+        counts = [results.get() for _ in workers]
+        elapsed = time.perf_counter() - started
+        for worker in workers:
+            worker.join()
+
+    print(f"{processes} workers, batch size {batch_size}: {sum(counts)} jobs in {elapsed:.2f}s "
+          f"({sum(counts) / elapsed:.0f} jobs/s)")
+    print(f"Jobs per worker: {', '.join(str(count) for count in counts)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run background job workers")
+    parser.add_argument("command", nargs="?", choices=["run", "bench"], default="run")
+    parser.add_argument("--processes", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--batch-size", type=int, default=20)
+    parser.add_argument("--poll-interval", type=float, default=1.0)
+    parser.add_argument("--url", help="bench: an empty database to fill with jobs (default: a temporary SQLite file)")
+    parser.add_argument("--jobs", type=int, default=20000, help="bench: jobs to queue")
+    args = parser.parse_args()
+
+    if args.command == "bench":
+        bench(args.url, args.jobs, args.processes, args.batch_size)
+        return
+
+    logging.basicConfig(level=logging.INFO)
+
+    stop = multiprocessing.Event()
+    workers = [
+        multiprocessing.Process(target=work, args=(args.batch_size, args.poll_interval, stop))
+        for _ in range(args.processes)
+    ]
+    for worker in workers:
+        worker.start()
+
+    def shutdown(*_):
+        stop.set()
+
+    signal.signal(signal.SIGINT, shutdown)
+    signal.signal(signal.SIGTERM, shutdown)
+    for worker in workers:
+        worker.join()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""Runs the API against every configured backend.
+
+SQLite in memory and SQLite in a WAL file always run. Set TEST_POSTGRES_URL
+to an empty, disposable database to run the same tests on Postgres.
+"""
+import json
+import os
+from datetime import datetime, timedelta
+import pytest
+from fastapi.testclient import TestClient
+
+BACKENDS = ["sqlite-memory", "sqlite-file"]
+if os.environ.get("TEST_POSTGRES_URL"):
+    BACKENDS.append("postgres")
+
+
+def reset_process_state():
+    """Forget every cached engine, setting and in-process cache between backends."""
+    from app import feed, lifecycle, pricing, revocation, seat_map, sharding
+    from app.config import get_settings
+    from app.database import get_engine, get_sessionmaker
+
+    if get_engine.cache_info().currsize:
+        get_engine().dispose()
+    for cached in (get_settings, get_engine, get_sessionmaker, sharding.get_shard_engine, sharding.get_shard_sessionmaker):
+        cached.cache_clear()
+    seat_map._seat_maps.clear()
+    pricing.pricing_engine.__init__()
+    feed.now_showing.clear()
+    revocation.revocation_list.__init__()
+    sharding.directory.__init__()
+    sharding._limiters.clear()
+    lifecycle.state.__init__()
+
+
+@pytest.fixture(params=BACKENDS)
+def backend(request, tmp_path, monkeypatch):
+    urls = {
+        "sqlite-memory": "sqlite://",
+        "sqlite-file": f"sqlite:///{tmp_path / 'test.db'}",
+        "postgres": os.environ.get("TEST_POSTGRES_URL"),
+    }
+    monkeypatch.setenv("DATABASE_URL", urls[request.param])
+    monkeypatch.setenv("DATABASE_CREATE_ALL", "true")
+    monkeypatch.setenv("SECRET_KEY", "test-secret")
+    monkeypatch.setenv("ALGORITHM", "HS256")
+    monkeypatch.setenv("ACCESS_TOKEN_EXPIRE_MINUTES", "15")
+    reset_process_state()
+    yield request.param
+    if request.param == "postgres":
+        from app.database import Base, get_engine
+        Base.metadata.drop_all(get_engine())
+    reset_process_state()
+
+
+@pytest.fixture
+def client(backend):
+    from app.main import create_app
+    with TestClient(create_app()) as client:
+        yield client
+
+
+def login(client, email, admin=False):
+    from app import models
+    from app.database import sessionLocal
+
+    client.post("/auth/register", json={"name": email.split("@")[0], "email": email, "password": "secret"})
+    if admin:
+        db = sessionLocal(write=True)
+        try:
+            db.query(models.User).filter(models.User.email == email).update({"role": models.UserRole.ADMIN})
+            db.commit()
+        finally:
+            db.close()
+    response = client.post("/auth/login", data={"username": email, "password": "secret"})
+    assert response.status_code == 200, response.text
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+@pytest.fixture
+def admin(client):
+    return login(client, "admin@example.com", admin=True)
+
+
+@pytest.fixture
+def showtime(client, admin):
+    def create(path, body):
+        response = client.post(path, headers=admin, json=body)
+        assert response.status_code == 200, response.text
+        return response.json()
+
+    movie = create("/movies/movies/", {"title": "Heat", "genre": "Crime", "language": "English", "duration": 170})
+    theater = create("/theaters/theaters/", {"name": "Odeon", "location": "Leeds"})
+    seats = [f"{row}{number}" for row in "AB" for number in range(1, 11)]
+    screen = create(f"/theaters/theaters/{theater['id']}/screens", {
+        "theater_id": theater["id"], "screen_number": 1, "seat_layout": json.dumps(seats)
+    })
+    response = client.post("/showtimes/showtimes/", headers=admin, json={
+        "movie_id": movie["id"],
+        "screen_id": screen["id"],
+        "start_time": (datetime.utcnow() + timedelta(days=1)).replace(microsecond=0).isoformat(),
+        "price_per_seat": 10,
+    })
+    assert response.status_code == 200, response.text
+    return response.json()
+
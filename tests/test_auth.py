@@ -0,0 +1,69 @@
+import time
+
+
+def _tokens(client, email):
+    client.post("/auth/register", json={"name": email.split("@")[0], "email": email, "password": "secret"})
+    response = client.post("/auth/login", data={"username": email, "password": "secret"})
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def _me(client, tokens):
+    return client.get("/auth/me", headers={"Authorization": f"Bearer {tokens['access_token']}"}).status_code
+
+
+def _refresh(client, tokens):
+    return client.post("/auth/refresh", json={"refresh_token": tokens["refresh_token"]})
+
+
+def _logout(client, tokens):
+    response = client.post(
+        "/auth/logout",
+        headers={"Authorization": f"Bearer {tokens['access_token']}"},
+        json={"refresh_token": tokens["refresh_token"]}
+    )
+    assert response.status_code == 204, response.text
+
+
+def test_logout_revokes_the_access_and_refresh_tokens(client):
+    tokens = _tokens(client, "ana@example.com")
+    other = _tokens(client, "ana@example.com")
+    assert _me(client, tokens) == 200
+    _logout(client, tokens)
+
+    assert _me(client, tokens) == 401
+    # Only that session ended
+    assert _me(client, other) == 200
+    assert _refresh(client, tokens).status_code == 401
+
+
+def test_reusing_a_rotated_refresh_token_ends_every_session(client):
+    tokens = _tokens(client, "ana@example.com")
+    rotated = _refresh(client, tokens)
+    assert rotated.status_code == 200, rotated.text
+    rotated = rotated.json()
+    assert _me(client, rotated) == 200
+
+    assert _refresh(client, tokens).status_code == 401
+    # The replay looks like a stolen token, so the rotated pair is revoked too
+    assert _me(client, rotated) == 401
+    assert _refresh(client, rotated).status_code == 401
+
+
+def test_revoked_token_is_rejected_after_a_filter_rebuild(client):
+    from app.revocation import revocation_list  # reads the settings on import
+
+    tokens = _tokens(client, "ana@example.com")
+    _logout(client, tokens)
+    assert _me(client, tokens) == 401
+
+    # Due for its periodic rebuild: the filter is replaced by one read back from the table
+    stale = revocation_list.filter
+    revocation_list.synced_at = revocation_list.rebuilt_at = time.monotonic() - 86400
+    assert _me(client, tokens) == 401
+    assert revocation_list.filter is not stale
+
+    # A process that starts after the logout only knows it from the table
+    revocation_list.__init__()
+    assert _me(client, tokens) == 401
+    assert _me(client, _tokens(client, "ana@example.com")) == 200
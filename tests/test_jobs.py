@@ -0,0 +1,53 @@
+import threading
+from datetime import datetime, timedelta
+from app import models, worker
+from app.database import create_schema, sessionLocal
+from app.jobs import claim_batch, enqueue, task
+
+
+def test_stale_job_out_of_attempts_fails(backend):
+    create_schema()
+    db = sessionLocal(write=True)
+    try:
+        enqueue(db, "lost", max_attempts=2)
+        enqueue(db, "retried", max_attempts=2)
+        db.commit()
+        claim_batch(db, "dead-worker", 2)
+        db.query(models.Job).filter(models.Job.name == "lost").update({"attempts": 2})
+        db.query(models.Job).update({"locked_at": datetime.utcnow() - timedelta(days=1)})
+        db.commit()
+
+        claimed = claim_batch(db, "worker", 2)
+        assert [job.name for job in claimed] == ["retried"]
+        lost = db.query(models.Job).filter(models.Job.name == "lost").one()
+        assert lost.status == models.JobStatus.FAILED
+        assert lost.locked_by is None
+    finally:
+        db.close()
+
+
+def test_stopped_worker_requeues_the_rest_of_its_batch(backend, monkeypatch):
+    create_schema()
+    stop = threading.Event()
+    ran = []
+
+    @task("stop_after_one")
+    def stop_after_one(db, payload):
+        ran.append(payload["n"])
+        stop.set()
+
+    monkeypatch.setattr(worker.signal, "signal", lambda *args: None)
+    monkeypatch.setattr(worker.tasks, "SCHEDULED", {})
+    db = sessionLocal(write=True)
+    try:
+        for n in range(5):
+            enqueue(db, "stop_after_one", {"n": n})
+        db.commit()
+        worker.work(batch_size=5, poll_interval=0, stop=stop)
+
+        assert ran == [0]
+        jobs = db.query(models.Job).order_by(models.Job.id).all()
+        assert [job.status for job in jobs] == [models.JobStatus.DONE] + [models.JobStatus.QUEUED] * 4
+        assert all(job.locked_by is None and job.attempts == 0 for job in jobs[1:])
+    finally:
+        db.close()
@@ -0,0 +1,411 @@
+import asyncio
+import base64
+import csv
+import io
+import json
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from decimal import Decimal
+import pytest
+from sqlalchemy import insert
+from app import lifecycle
+from app.archive import archive_showtimes
+from app.database import sessionLocal
+from app.tickets import verify_ticket
+from .conftest import login
+
+
+def book_and_pay(client, headers, showtime, seats):
+    booking = client.post("/bookings/bookings/", headers=headers, json={
+        "showtime_id": showtime["id"], "seats_booked": json.dumps(seats)
+    })
+    assert booking.status_code == 200, booking.text
+    booking = booking.json()
+    payment = client.post(f"/payments/payments/{booking['id']}/initiate", headers=headers).json()
+    confirmed = client.post(f"/payments/payments/{payment['payment_id']}/confirm", headers=headers)
+    assert confirmed.status_code == 200, confirmed.text
+    return booking
+
+
+def test_register_login_and_me(client):
+    headers = login(client, "ana@example.com")
+    response = client.get("/auth/me", headers=headers)
+    assert response.status_code == 200
+    assert response.json()["email"] == "ana@example.com"
+
+
+def test_booking_payment_and_revenue(client, admin, showtime):
+    booking = book_and_pay(client, login(client, "ana@example.com"), showtime, ["A1", "A2"])
+    assert booking["total_price"] == 20.0
+
+    revenue = client.get("/reports/revenue", headers=admin, params={"group_by": "showtime"}).json()
+    assert revenue == [{"key": str(showtime["id"]), "payments": 1, "revenue": 20.0}]
+
+
+def test_revenue_includes_archived_showtimes(client, admin, showtime):
+    book_and_pay(client, login(client, "ana@example.com"), showtime, ["A1", "A2"])
+    db = sessionLocal(write=True)
+    try:
+        assert archive_showtimes(db, datetime.utcnow() + timedelta(days=2), batch_size=10) == 1
+    finally:
+        db.close()
+
+    revenue = client.get("/reports/revenue", headers=admin, params={"group_by": "showtime"}).json()
+    assert revenue == [{"key": str(showtime["id"]), "payments": 1, "revenue": 20.0}]
+
+
+def test_taken_seats_are_rejected(client, showtime):
+    first = login(client, "ana@example.com")
+    second = login(client, "ben@example.com")
+    seats = {"showtime_id": showtime["id"], "seats_booked": json.dumps(["B5"])}
+    assert client.post("/bookings/bookings/", headers=first, json=seats).status_code == 200
+    assert client.post("/bookings/bookings/", headers=second, json=seats).status_code == 400
+
+
+def test_cancel_releases_seats(client, showtime):
+    headers = login(client, "ana@example.com")
+    seats = {"showtime_id": showtime["id"], "seats_booked": json.dumps(["A3"])}
+    booking = client.post("/bookings/bookings/", headers=headers, json=seats).json()
+    assert client.post(f"/bookings/bookings/{booking['id']}/cancel", headers=headers).status_code == 200
+    assert client.post(f"/bookings/bookings/{booking['id']}/cancel", headers=headers).status_code == 400
+    assert client.post("/bookings/bookings/", headers=headers, json=seats).status_code == 200
+
+
+def test_concurrent_reads(client):
+    headers = login(client, "ana@example.com")
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        responses = list(pool.map(lambda _: client.get("/auth/me", headers=headers), range(16)))
+    assert [response.status_code for response in responses] == [200] * 16
+
+
+def test_concurrent_bookings_for_one_seat(client, showtime):
+    users = [login(client, f"user{n}@example.com") for n in range(8)]
+    seats = {"showtime_id": showtime["id"], "seats_booked": json.dumps(["A7"])}
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        responses = list(pool.map(lambda headers: client.post("/bookings/bookings/", headers=headers, json=seats), users))
+    assert sorted(response.status_code for response in responses) == [200] + [400] * 7
+
+
+def test_concurrent_confirms_count_one_sale(client, admin, showtime):
+    headers = login(client, "ana@example.com")
+    booking = client.post("/bookings/bookings/", headers=headers, json={
+        "showtime_id": showtime["id"], "seats_booked": json.dumps(["A1", "A2"])
+    }).json()
+    payment = client.post(f"/payments/payments/{booking['id']}/initiate", headers=headers).json()
+    confirm = lambda _: client.post(f"/payments/payments/{payment['payment_id']}/confirm", headers=headers)
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        assert [response.status_code for response in pool.map(confirm, range(4))] == [200] * 4
+
+    stats = client.get(f"/analytics/showtimes/{showtime['id']}", headers=admin).json()
+    assert (stats["seats_held"], stats["seats_sold"], stats["bookings_confirmed"]) == (0, 2, 1)
+    assert stats["revenue"] == 20.0
+
+
+def test_confirm_racing_cancel(client, admin, showtime):
+    headers = login(client, "ana@example.com")
+    booking = client.post("/bookings/bookings/", headers=headers, json={
+        "showtime_id": showtime["id"], "seats_booked": json.dumps(["A1", "A2"])
+    }).json()
+    payment = client.post(f"/payments/payments/{booking['id']}/initiate", headers=headers).json()
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        confirm = pool.submit(client.post, f"/payments/payments/{payment['payment_id']}/confirm", headers=headers)
+        cancel = pool.submit(client.post, f"/bookings/bookings/{booking['id']}/cancel", headers=headers)
+    assert cancel.result().status_code == 200, cancel.result().text
+
+    stats = client.get(f"/analytics/showtimes/{showtime['id']}", headers=admin).json()
+    assert (stats["seats_held"], stats["seats_sold"], stats["bookings_cancelled"]) == (0, 0, 1)
+    status = client.get(f"/payments/payments/{payment['payment_id']}", headers=headers).json()["payment_status"]
+    if confirm.result().status_code == 200:
+        assert status == "pending"  # confirmed first, so the cancel marked it for refund
+    else:
+        assert confirm.result().status_code == 400
+
+
+def test_export_streams_from_the_request_session(client, admin, showtime):
+    headers = login(client, "ana@example.com")
+    book_and_pay(client, headers, showtime, ["A1"])
+    response = client.get("/exports/bookings", headers=admin)
+    assert response.status_code == 200, response.text
+    lines = response.text.strip().splitlines()
+    assert lines[0].startswith("booking_id,")
+    assert len(lines) == 2
+
+
+def _seed_exports(showtime, rows):
+    """``rows`` bookings a minute apart, alternating between archived and hot showtimes."""
+    from app import models
+
+    db = sessionLocal(write=True)
+    try:
+        user_id = db.query(models.User.id).scalar()
+        now = datetime.utcnow()
+        starts = [now - timedelta(days=days) for days in range(1, 6)] + [now + timedelta(days=days) for days in range(1, 6)]
+        db.execute(insert(models.Showtime), [
+            {"movie_id": showtime["movie_id"], "screen_id": showtime["screen_id"], "start_time": start, "price_per_seat": Decimal("10.00")}
+            for start in starts
+        ])
+        showtime_ids = [showtime_id for (showtime_id,) in db.query(models.Showtime.id).filter(
+            models.Showtime.start_time.in_(starts)
+        ).order_by(models.Showtime.start_time)]
+        first = datetime(2030, 1, 1)
+        db.execute(insert(models.Booking), [
+            {
+                "user_id": user_id, "showtime_id": showtime_ids[(n % 2) * 5 + n % 5], "seats_booked": '["A1"]',
+                "total_price": Decimal("10.00"), "status": models.BookingStatus.CONFIRMED,
+                "created_at": first + timedelta(minutes=n),
+            }
+            for n in range(rows)
+        ])
+        db.commit()
+        assert archive_showtimes(db, now, batch_size=2) == 5
+    finally:
+        db.close()
+
+
+def _export_through_asgi(app, headers, query):
+    """Run one export through the app, keeping only a row count and the created_at order."""
+    seen = {"rows": 0, "last": "", "ordered": True, "status": None}
+    requests = [{"type": "http.request", "body": b"", "more_body": False}]
+
+    async def receive():
+        if requests:
+            return requests.pop()
+        await asyncio.Event().wait()  # the client never disconnects
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            seen["status"] = message["status"]
+        elif message["type"] == "http.response.body" and message.get("body"):
+            for row in csv.reader(io.StringIO(message["body"].decode())):
+                if row[0] == "booking_id":
+                    continue
+                seen["ordered"] &= row[1] >= seen["last"]
+                seen["rows"] += 1
+                seen["last"] = row[1]
+
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET", "scheme": "http",
+        "path": "/exports/bookings", "raw_path": b"/exports/bookings", "root_path": "",
+        "query_string": query.encode(), "client": ("testclient", 50000), "server": ("testserver", 80),
+        "headers": [(b"host", b"testserver")] + [(name.lower().encode(), value.encode()) for name, value in headers.items()],
+    }
+    tracemalloc.start()
+    try:
+        asyncio.run(app(scope, receive, send))
+        return seen, tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def test_export_merges_hot_and_archived_rows_in_flat_memory(client, admin, showtime, monkeypatch):
+    from app.routers import exports
+
+    monkeypatch.setattr(exports, "EXPORT_BATCH_SIZE", 100)
+    _seed_exports(showtime, 10000)
+    # The first day holds 1440 of the rows, the whole export seven times that
+    small, small_peak = _export_through_asgi(client.app, admin, "start_date=2030-01-01&end_date=2030-01-02")
+    large, large_peak = _export_through_asgi(client.app, admin, "")
+    assert (small["status"], small["rows"], small["ordered"]) == (200, 1440, True)
+    assert (large["status"], large["rows"], large["ordered"]) == (200, 10000, True)
+    assert large_peak < 1.5 * small_peak
+
+
+def test_warm_up_does_not_wait_on_the_database(backend):
+    started = time.monotonic()
+    lifecycle.warm_database_pool()
+    assert time.monotonic() - started < 5
+
+
+def test_check_ins_are_accepted_once(client, admin, showtime):
+    booking = book_and_pay(client, login(client, "ana@example.com"), showtime, ["A1"])
+    path = f"/tickets/showtimes/{showtime['id']}/check-ins"
+    scans = [
+        {"booking_id": booking["id"], "scanned_at": "2030-01-01T19:00:00"},
+        {"booking_id": booking["id"], "scanned_at": "2030-01-01T19:01:00"},
+        {"booking_id": 999, "scanned_at": "2030-01-01T19:00:00"},
+    ]
+    first = client.post(path, headers=admin, json={"gate": "north", "check_ins": scans}).json()
+    assert first == {"accepted": [booking["id"]], "duplicates": [booking["id"]], "rejected": [999]}
+    second = client.post(path, headers=admin, json={"gate": "south", "check_ins": scans[:1]}).json()
+    assert second == {"accepted": [], "duplicates": [booking["id"]], "rejected": []}
+
+
+def test_gate_bundle_verifies_but_cannot_sign(client, admin, showtime):
+    headers = login(client, "ana@example.com")
+    booking = book_and_pay(client, headers, showtime, ["A1", "A2"])
+    token = client.get(f"/tickets/{booking['id']}", headers=headers).json()["token"]
+    bundle = client.get(f"/tickets/showtimes/{showtime['id']}/bundle", headers=admin).json()
+    key = base64.urlsafe_b64decode(bundle["key"])
+
+    assert verify_ticket(token, key) == {"booking_id": booking["id"], "showtime_id": showtime["id"], "seats": ["A1", "A2"]}
+    payload, signature = token.split(".")
+    assert verify_ticket(f"{payload}.{signature[:-2]}AA", key) is None
+    assert len(key) == 32  # an Ed25519 public key, nothing that can sign
+
+
+def test_gate_account_is_scoped_to_gate_endpoints(client, admin, showtime):
+    headers = login(client, "ana@example.com")
+    booking = book_and_pay(client, headers, showtime, ["A1"])
+    created = client.post("/auth/gate-accounts", headers=admin, json={
+        "name": "Gate 1", "email": "gate1@example.com", "password": "secret"
+    })
+    assert created.status_code == 200, created.text
+    assert created.json()["role"] == "gate"
+    assert client.post("/auth/gate-accounts", headers=headers, json={
+        "name": "Gate 2", "email": "gate2@example.com", "password": "secret"
+    }).status_code == 403
+
+    response = client.post("/auth/login", data={"username": "gate1@example.com", "password": "secret"})
+    gate = {"Authorization": f"Bearer {response.json()['access_token']}"}
+    assert client.get(f"/tickets/showtimes/{showtime['id']}/bundle", headers=gate).status_code == 200
+    synced = client.post(f"/tickets/showtimes/{showtime['id']}/check-ins", headers=gate, json={
+        "gate": "north", "check_ins": [{"booking_id": booking["id"], "scanned_at": datetime.utcnow().isoformat()}]
+    })
+    assert synced.json()["accepted"] == [booking["id"]]
+
+    assert client.get(f"/tickets/showtimes/{showtime['id']}/bundle", headers=headers).status_code == 403
+    assert client.get("/bookings/bookings/", headers=gate).status_code == 403
+    assert client.get("/reports/revenue", headers=gate).status_code == 403
+
+
+def test_id_start_needs_postgres(backend, monkeypatch):
+    from app import sharding
+
+    if backend == "postgres":
+        pytest.skip("Postgres sequences can start anywhere")
+    monkeypatch.setenv("SHARD_URLS", json.dumps({"chain_a": "sqlite://"}))
+    sharding.get_settings.cache_clear()
+    with pytest.raises(sharding.RebalanceError):
+        sharding.init_shard("chain_a", id_start=1000000)
+
+
+def test_rescheduling_moves_the_rollups(client, admin, showtime):
+    headers = login(client, "ana@example.com")
+    booking = book_and_pay(client, headers, showtime, ["A1", "A2"])
+    later = (datetime.fromisoformat(showtime["start_time"]) + timedelta(hours=3)).isoformat()
+    moved = client.put(f"/showtimes/showtimes/{showtime['id']}", headers=admin, json={
+        "movie_id": showtime["movie_id"], "screen_id": showtime["screen_id"],
+        "start_time": later, "price_per_seat": 10,
+    })
+    assert moved.status_code == 200, moved.text
+    assert client.post(f"/bookings/bookings/{booking['id']}/cancel", headers=headers).status_code == 200
+
+    hours = client.get("/analytics/hourly", headers=admin).json()
+    assert [(row["hour"], row["seats_sold"], row["bookings_cancelled"]) for row in hours] == [
+        (later[:13] + ":00:00", 0, 1)
+    ]
+
+
+def test_quote_uses_rollup_occupancy(client, admin, showtime):
+    rule = client.post("/pricing/rules", headers=admin, json={
+        "name": "busy", "kind": "demand", "min_occupancy": 0.1, "multiplier": 2
+    })
+    assert rule.status_code == 200, rule.text
+    quote = {"showtime_id": showtime["id"], "seats_booked": json.dumps(["B1"])}
+    assert client.post("/pricing/quote", json=quote).json()["total_price"] == 10.0
+
+    book_and_pay(client, login(client, "ana@example.com"), showtime, ["A1", "A2"])
+    quoted = client.post("/pricing/quote", json=quote).json()
+    assert (quoted["demand_tier"], quoted["total_price"]) == (1, 20.0)
+
+
+def test_time_rule_with_empty_window_is_rejected(client, admin):
+    response = client.post("/pricing/rules", headers=admin, json={
+        "name": "never", "kind": "time_of_day", "start_hour": 18, "end_hour": 18, "multiplier": 2
+    })
+    assert response.status_code == 422
+
+
+def test_available_seats_bitmap_and_delta(client, showtime):
+    headers = login(client, "ana@example.com")
+    path = f"/showtimes/showtimes/{showtime['id']}/available-seats"
+    first = client.post("/bookings/bookings/", headers=headers, json={
+        "showtime_id": showtime["id"], "seats_booked": json.dumps(["A1", "A2"])
+    }).json()
+
+    bitmap = client.get(path, params={"format": "bitmap"}).json()
+    assert (bitmap["total_seats"], bitmap["available_count"]) == (20, 18)
+    assert base64.b64decode(bitmap["occupancy"]) == bytes([0b11000000, 0, 0])
+
+    binary = client.get(path, headers={"Accept": "application/vnd.seatmap.bitmap"})
+    assert binary.headers["content-type"] == "application/vnd.seatmap.bitmap"
+    assert binary.content == bytes([0b11000000, 0, 0])
+    assert binary.headers["X-Seat-Version"] == str(bitmap["version"])
+
+    client.post("/bookings/bookings/", headers=headers, json={
+        "showtime_id": showtime["id"], "seats_booked": json.dumps(["B1"])
+    })
+    assert client.post(f"/bookings/bookings/{first['id']}/cancel", headers=headers).status_code == 200
+    delta = client.get(path, params={"since": bitmap["version"]}).json()
+    assert delta["booked_seats"] == ["B1"]
+    assert sorted(delta["released_seats"]) == ["A1", "A2"]
+    assert delta["version"] == bitmap["version"] + 2
+    assert client.get(path, params={"since": delta["version"]}).json()["released_seats"] == []
+
+
+def test_now_showing_matches_the_city_exactly(client, admin, showtime):
+    def create(path, body):
+        response = client.post(path, headers=admin, json=body)
+        assert response.status_code == 200, response.text
+        return response.json()
+
+    for location in ("York", "New York"):
+        theater = create("/theaters/theaters/", {"name": f"{location} Picturehouse", "location": location})
+        screen = create(f"/theaters/theaters/{theater['id']}/screens", {
+            "theater_id": theater["id"], "screen_number": 1, "seat_layout": json.dumps(["A1", "A2"])
+        })
+        create("/showtimes/showtimes/", {
+            "movie_id": showtime["movie_id"], "screen_id": screen["id"],
+            "start_time": showtime["start_time"], "price_per_seat": 10,
+        })
+
+    def locations(city):
+        response = client.get("/feed/now-showing", params={"city": city, "date": showtime["start_time"][:10]})
+        assert response.status_code == 200, response.text
+        return sorted(
+            theater["theater"]["location"] for movie in response.json()["movies"] for theater in movie["theaters"]
+        )
+
+    assert locations("york") == ["York"]
+    assert locations(" NEW YORK ") == ["New York"]
+    assert locations("%") == []
+    assert locations("Y_rk") == []
+
+
+def test_best_available_holds_a_contiguous_block(client, admin, showtime):
+    def create(path, body):
+        response = client.post(path, headers=admin, json=body)
+        assert response.status_code == 200, response.text
+        return response.json()
+
+    def seat(number, accessible=False):
+        return {"number": number, "accessible": accessible}
+
+    layout = {"rows": [
+        {"label": "A", "seats": [seat(1), seat(2), seat(3), seat(4), None, seat(5), seat(6), seat(7), seat(8)]},
+        {"label": "B", "seats": [seat(1, accessible=True)] + [seat(number) for number in range(2, 9)]},
+    ]}
+    theater = create("/theaters/theaters/", {"name": "Vue", "location": "Leeds"})
+    screen = create(f"/theaters/theaters/{theater['id']}/screens", {
+        "theater_id": theater["id"], "screen_number": 1, "seat_layout": json.dumps(layout)
+    })
+    hall = create("/showtimes/showtimes/", {
+        "movie_id": showtime["movie_id"], "screen_id": screen["id"],
+        "start_time": showtime["start_time"], "price_per_seat": 10,
+    })
+    headers = login(client, "ana@example.com")
+
+    def best(**body):
+        return client.post(f"/showtimes/showtimes/{hall['id']}/best-available", headers=headers, json=body)
+
+    # Row A's aisle splits it into runs of four, so the middle of row B is closest to the centre
+    assert json.loads(best(party_size=3).json()["seats_booked"]) == ["B3", "B4", "B5"]
+    assert json.loads(best(party_size=2, accessible=True).json()["seats_booked"]) == ["B1", "B2"]
+    # No run of five is left anywhere, and the only accessible seat is taken
+    assert best(party_size=5).status_code == 409
+    assert best(party_size=1, accessible=True).status_code == 409
+    scattered = best(party_size=5, together=False)
+    assert scattered.status_code == 200, scattered.text
+    assert len(json.loads(scattered.json()["seats_booked"])) == 5
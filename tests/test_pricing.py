@@ -0,0 +1,30 @@
+import json
+from datetime import datetime
+from decimal import Decimal
+from app import models
+from app.config import get_settings
+from app.pricing import PricingEngine
+from app.seat_map import compile_layout
+
+
+def test_price_tables_are_bounded_lru(monkeypatch):
+    monkeypatch.setenv("SECRET_KEY", "test-secret")
+    monkeypatch.setenv("ALGORITHM", "HS256")
+    monkeypatch.setenv("ACCESS_TOKEN_EXPIRE_MINUTES", "15")
+    monkeypatch.setenv("PRICING_MAX_TABLES", "2")
+    get_settings.cache_clear()
+    engine = PricingEngine()
+    engine.loaded_at = float("inf")  # no rules, and no database to reload them from
+    seat_map = compile_layout(1, 1, json.dumps(["A1", "A2"]))
+    shows = [
+        models.Showtime(id=i, price_per_seat=Decimal("10.00"), start_time=datetime(2030, 1, 1, 20))
+        for i in range(3)
+    ]
+    try:
+        engine.price_table(None, shows[0], seat_map)
+        engine.price_table(None, shows[1], seat_map)
+        engine.price_table(None, shows[0], seat_map)  # now the most recently quoted
+        engine.price_table(None, shows[2], seat_map)
+        assert list(engine.tables) == [0, 2]
+    finally:
+        get_settings.cache_clear()
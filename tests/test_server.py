@@ -0,0 +1,76 @@
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+import httpx
+from sqlalchemy import create_engine
+
+
+def create_slow_app():
+    import asyncio
+    from app.main import create_app
+
+    app = create_app()
+
+    @app.get("/slow")
+    async def slow(seconds: float):
+        await asyncio.sleep(seconds)
+        return {"slept": seconds}
+
+    return app
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def test_workers_drain_and_finish_in_flight_requests(tmp_path):
+    from app import models  # noqa: F401 - registers the tables
+    from app.database import Base
+
+    url = f"sqlite:///{tmp_path / 'server.db'}"
+    engine = create_engine(url)
+    Base.metadata.create_all(engine)
+    engine.dispose()
+
+    port = free_port()
+    base = f"http://127.0.0.1:{port}"
+    env = dict(
+        os.environ, DATABASE_URL=url, SECRET_KEY="test-secret", ALGORITHM="HS256",
+        ACCESS_TOKEN_EXPIRE_MINUTES="15", DRAIN_SECONDS="1", GRACEFUL_TIMEOUT_SECONDS="10"
+    )
+    launcher = subprocess.Popen(
+        [sys.executable, "-m", "app.server", "--workers", "2", "--host", "127.0.0.1", "--port", str(port),
+         "--app", "tests.test_server:create_slow_app"],
+        env=env, cwd=os.path.dirname(os.path.dirname(__file__))
+    )
+    try:
+        deadline = time.monotonic() + 60
+        ready = False
+        while not ready and time.monotonic() < deadline:
+            try:
+                ready = httpx.get(f"{base}/health/ready").status_code == 200
+            except httpx.TransportError:
+                time.sleep(0.2)
+        assert ready
+
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            in_flight = [pool.submit(httpx.get, f"{base}/slow", params={"seconds": 3}, timeout=30) for _ in range(4)]
+            time.sleep(0.5)
+            launcher.send_signal(signal.SIGTERM)
+            time.sleep(0.3)
+            # Still serving while draining, but no longer ready
+            assert httpx.get(f"{base}/health/ready").status_code == 503
+            assert httpx.get(f"{base}/health/live").status_code == 200
+            assert [future.result().status_code for future in in_flight] == [200] * 4
+
+        assert launcher.wait(timeout=30) == 0
+    finally:
+        if launcher.poll() is None:
+            launcher.kill()
+            launcher.wait()
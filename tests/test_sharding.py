@@ -0,0 +1,97 @@
+import json
+from datetime import datetime, timedelta
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import func, select
+from tests.conftest import login, reset_process_state
+
+
+@pytest.fixture
+def sharded(backend, tmp_path, monkeypatch):
+    if backend != "sqlite-file":
+        pytest.skip("moves between SQLite files; an in-memory main database can't be read twice at once")
+    monkeypatch.setenv("SHARD_URLS", json.dumps({"east": f"sqlite:///{tmp_path / 'east.db'}"}))
+    monkeypatch.setenv("SHARD_MAP_TTL_SECONDS", "0")
+    reset_process_state()
+    from app.main import create_app
+    from app.sharding import add_chain
+
+    with TestClient(create_app()) as client:
+        add_chain("east")
+        yield client
+
+
+def _chain_counts(shard):
+    from app.sharding import CHAIN_TABLES, get_shard_sessionmaker
+
+    db = get_shard_sessionmaker(shard)()
+    try:
+        return {
+            model.__tablename__: db.execute(select(func.count()).select_from(model).where(condition("east"))).scalar()
+            for model, condition in CHAIN_TABLES
+        }
+    finally:
+        db.close()
+
+
+def test_move_chain_to_its_own_database(sharded):
+    from app import models
+    from app.archive import archive_showtimes
+    from app.database import sessionLocal
+    from app.sharding import init_shard, move_chain
+
+    client = sharded
+    admin = dict(login(client, "admin@example.com", admin=True), **{"X-Chain": "east"})
+    user = dict(login(client, "ana@example.com"), **{"X-Chain": "east"})
+
+    def create(path, body):
+        response = client.post(path, headers=admin, json=body)
+        assert response.status_code == 200, response.text
+        return response.json()
+
+    movie = create("/movies/movies/", {"title": "Heat", "genre": "Crime", "language": "English", "duration": 170})
+    theater = create("/theaters/theaters/", {"name": "Odeon", "location": "Leeds"})
+    screen = create(f"/theaters/theaters/{theater['id']}/screens", {
+        "theater_id": theater["id"], "screen_number": 1, "seat_layout": json.dumps(["A1", "A2", "A3"])
+    })
+    showtimes = [
+        create("/showtimes/showtimes/", {
+            "movie_id": movie["id"], "screen_id": screen["id"], "price_per_seat": 10,
+            "start_time": (datetime.utcnow() + timedelta(days=days)).replace(microsecond=0).isoformat(),
+        })
+        for days in (1, 5)
+    ]
+    for showtime in showtimes:
+        booking = client.post("/bookings/bookings/", headers=user, json={
+            "showtime_id": showtime["id"], "seats_booked": json.dumps(["A1"])
+        }).json()
+        payment = client.post(f"/payments/payments/{booking['id']}/initiate", headers=user).json()
+        assert client.post(f"/payments/payments/{payment['payment_id']}/confirm", headers=user).status_code == 200
+    db = sessionLocal(write=True)
+    try:
+        assert archive_showtimes(db, datetime.utcnow() + timedelta(days=2), batch_size=10) == 1
+        assert db.execute(select(models.ArchivedBooking.chain)).scalars().all() == ["east"]
+    finally:
+        db.close()
+
+    before = _chain_counts("default")
+    assert all(before.values()), before
+    init_shard("east")
+    move_chain("east", "east", batch_size=2, settle_seconds=0)
+    assert _chain_counts("east") == before
+    assert not any(_chain_counts("default").values())
+
+    bookings = {booking["showtime_id"]: booking for booking in client.get("/bookings/bookings/", headers=user).json()}
+    assert sorted(bookings) == [showtime["id"] for showtime in showtimes]
+    assert client.get(f"/tickets/{bookings[showtimes[1]['id']]['id']}", headers=user).status_code == 200
+    revenue = client.get("/reports/revenue", headers=admin, params={"group_by": "showtime"}).json()
+    assert sorted(row["key"] for row in revenue) == sorted(str(showtime["id"]) for showtime in showtimes)
+    # Users and movies were copied, so new bookings satisfy the shard's foreign keys
+    assert client.post("/bookings/bookings/", headers=user, json={
+        "showtime_id": showtimes[1]["id"], "seats_booked": json.dumps(["A2"])
+    }).status_code == 200
+
+    unscoped = {"Authorization": user["Authorization"]}
+    assert client.get("/bookings/bookings/", headers=unscoped).status_code == 400
+    assert client.get("/bookings/bookings/", headers=dict(unscoped, **{"X-Chain": "west"})).status_code == 400
+    assert client.get("/movies/movies/", headers=unscoped).status_code == 200
@@ -0,0 +1,10 @@
+import os
+import statistics
+from app.startup_profile import COLD_START_BUDGET_MS, build_app_in_subprocess
+
+
+def test_cold_start_within_budget():
+    # Only the placeholder settings: no database is configured or reachable
+    env = {name: value for name, value in os.environ.items() if not name.startswith("DATABASE_")}
+    runs = [build_app_in_subprocess(env=env)[0] for _ in range(3)]
+    assert statistics.median(runs) < COLD_START_BUDGET_MS